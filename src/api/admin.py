@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Currency
+from .models import Currency, HistoricalRates
 
 
 admin.site.register(Currency)
+admin.site.register(HistoricalRates)
@@ -0,0 +1,274 @@
+# ==================================================================================================
+#   `api` admission control (rate limiting and load shedding)
+# ==================================================================================================
+
+import functools
+import inspect
+import math
+import threading
+from dataclasses import dataclass
+from typing import Callable
+
+import rest_framework.status as status
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.http import HttpResponseBase, JsonResponse, StreamingHttpResponse
+from redis.exceptions import RedisError
+
+from .metrics import admission_rejections
+
+
+CLIENT_BUCKET_CACHE_KEY = 'api_admission_client_bucket'
+GLOBAL_BUCKET_CACHE_KEY = 'api_admission_global_bucket'
+
+# Token buckets refilled at `rate` tokens per second up to `burst` tokens, each request taking
+# one token of every bucket (KEYS) or none if any of them is empty. The Redis clock is used, so the
+# workers clocks don't matter. Returns the admission, the seconds until the request would be
+# admitted (as a string, Lua numbers are returned as integers) and the (1 based) empty bucket.
+TOKEN_BUCKETS_SCRIPT = '''
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local tokens = {}
+local retry_after = 0
+local empty_bucket = 0
+
+for index, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[index * 2 - 1])
+    local burst = tonumber(ARGV[index * 2])
+    local bucket = redis.call('HMGET', key, 'tokens', 'updated')
+    local elapsed = math.max(now - (tonumber(bucket[2]) or now), 0)
+    tokens[index] = math.min((tonumber(bucket[1]) or burst) + elapsed * rate, burst)
+    if tokens[index] < 1 and (1 - tokens[index]) / rate > retry_after then
+        retry_after = (1 - tokens[index]) / rate
+        empty_bucket = index
+    end
+end
+
+if empty_bucket > 0 then
+    return {0, tostring(retry_after), empty_bucket}
+end
+
+for index, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[index * 2 - 1])
+    local burst = tonumber(ARGV[index * 2])
+    redis.call('HSET', key, 'tokens', tokens[index] - 1, 'updated', now)
+    redis.call('EXPIRE', key, math.ceil(burst / rate) + 1)
+end
+return {1, '0', 0}
+'''
+
+_scripts: dict[int, Callable] = {}
+
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+
+@dataclass
+class Admission:
+    """Admission decision of a request (with the rejection response details)."""
+    admitted: bool
+    reason: str = ''
+    status_code: int = status.HTTP_200_OK
+    retry_after: float = 0
+
+
+ADMITTED = Admission(admitted=True)
+OVERLOADED = Admission(
+    admitted=False,
+    reason='concurrency',
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    retry_after=1,
+)
+
+
+# --------------------------------------------------------------------------------------------------
+#   Token buckets
+# --------------------------------------------------------------------------------------------------
+def _client_id(request) -> str:
+    """Client identification (its address, or the configured proxy header)."""
+    return request.META.get(settings.ADMISSION_CLIENT_META_KEY, '')
+
+
+def _token_buckets_script(cache: RedisCache) -> Callable:
+    """Token buckets script registered on the cache Redis client (one per cache)."""
+    script = _scripts.get(id(cache))
+    if script is None:
+        client = cache._cache.get_client(write=True)
+        script = _scripts[id(cache)] = client.register_script(TOKEN_BUCKETS_SCRIPT)
+    return script
+
+
+def take_tokens(client_id: str) -> Admission:
+    """Take a token of the client and of the global buckets, in a single Redis round trip.
+
+    Without Redis (e.g. local memory cache) or if it fails, requests are admitted.
+    """
+    cache = caches['default']
+    if not isinstance(cache, RedisCache):
+        return ADMITTED
+
+    try:
+        admitted, retry_after, empty_bucket = _token_buckets_script(cache=cache)(
+            keys=[
+                cache.make_and_validate_key(key=f'{CLIENT_BUCKET_CACHE_KEY}:{client_id}'),
+                cache.make_and_validate_key(key=GLOBAL_BUCKET_CACHE_KEY),
+            ],
+            args=[
+                settings.ADMISSION_CLIENT_RATE,
+                settings.ADMISSION_CLIENT_BURST,
+                settings.ADMISSION_GLOBAL_RATE,
+                settings.ADMISSION_GLOBAL_BURST,
+            ],
+        )
+    except RedisError:
+        return ADMITTED
+
+    return _admission(admitted=admitted, retry_after=retry_after, empty_bucket=empty_bucket)
+
+
+async def atake_tokens(client_id: str) -> Admission:
+    """Async version of `take_tokens()`."""
+    if not isinstance(caches['default'], RedisCache):
+        return ADMITTED
+    return await sync_to_async(take_tokens)(client_id=client_id)
+
+
+def _admission(admitted: int, retry_after: bytes, empty_bucket: int) -> Admission:
+    """Admission decision of the token buckets script result."""
+    if admitted:
+        return ADMITTED
+    if empty_bucket == 1:
+        return Admission(
+            admitted=False,
+            reason='client_rate',
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            retry_after=float(retry_after),
+        )
+    return Admission(
+        admitted=False,
+        reason='global_rate',
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        retry_after=float(retry_after),
+    )
+
+
+# --------------------------------------------------------------------------------------------------
+#   Admission control
+# --------------------------------------------------------------------------------------------------
+def _enter() -> bool:
+    """Count a request in flight on the process, unless the concurrency limit was reached."""
+    global _in_flight
+    with _in_flight_lock:
+        if _in_flight >= settings.ADMISSION_MAX_CONCURRENCY:
+            return False
+        _in_flight += 1
+        return True
+
+
+def _exit() -> None:
+    """Count a request out of flight."""
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight -= 1
+
+
+class _InFlightContent:
+    """Streaming response content counting its request in flight until it's closed.
+
+    Streaming responses (e.g. the converted files) are produced while they're sent, after the view
+    returns. The server closes the response at the end, even if the client disconnects, which closes
+    its content (and the content is closed as well once it's fully consumed).
+    """
+
+    def __init__(self, content) -> None:
+        self.content = content
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> bytes:
+        try:
+            return next(self.content)
+        except StopIteration:
+            self.close()
+            raise
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> bytes:
+        try:
+            return await anext(self.content)
+        except StopAsyncIteration:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            _exit()
+
+
+def _exit_on_close(response: HttpResponseBase | None) -> None:
+    """Count the request out of flight, once its response is closed if it's a streaming one."""
+    if isinstance(response, StreamingHttpResponse):
+        response.streaming_content = _InFlightContent(content=response.streaming_content)
+    else:
+        _exit()
+
+
+def _rejection_response(admission: Admission) -> JsonResponse:
+    """Fast rejection response (with the seconds to wait before retrying)."""
+    admission_rejections.inc(reason=admission.reason)
+    response = JsonResponse(
+        data={'error': 'Too many requests, try again later.'},
+        status=admission.status_code,
+    )
+    response['Retry-After'] = str(max(math.ceil(admission.retry_after), 1))
+    return response
+
+
+def admission_control(view_method: Callable) -> Callable:
+    """Admit the requests of the decorated (sync or async) view method or reject them fast.
+
+    Requests above the process concurrency limit are shed (`503`), then the client and the global
+    token buckets are checked (`429` or `503`), before any other work. Without `ADMISSION_ENABLED`
+    all the requests are admitted.
+    """
+    if inspect.iscoroutinefunction(view_method):
+        @functools.wraps(view_method)
+        async def async_admitted(self, request, *args, **kwargs):
+            if not settings.ADMISSION_ENABLED:
+                return await view_method(self, request, *args, **kwargs)
+            if not _enter():
+                return _rejection_response(admission=OVERLOADED)
+            response = None
+            try:
+                admission = await atake_tokens(client_id=_client_id(request))
+                if not admission.admitted:
+                    return _rejection_response(admission=admission)
+                response = await view_method(self, request, *args, **kwargs)
+                return response
+            finally:
+                _exit_on_close(response=response)
+        return async_admitted
+
+    @functools.wraps(view_method)
+    def admitted(self, request, *args, **kwargs):
+        if not settings.ADMISSION_ENABLED:
+            return view_method(self, request, *args, **kwargs)
+        if not _enter():
+            return _rejection_response(admission=OVERLOADED)
+        response = None
+        try:
+            admission = take_tokens(client_id=_client_id(request))
+            if not admission.admitted:
+                return _rejection_response(admission=admission)
+            response = view_method(self, request, *args, **kwargs)
+            return response
+        finally:
+            _exit_on_close(response=response)
+    return admitted
@@ -0,0 +1,128 @@
+# ==================================================================================================
+#   `api` HTTP clients
+# ==================================================================================================
+
+import asyncio
+import atexit
+import random
+import threading
+import time
+import weakref
+from typing import AsyncIterator
+
+import httpx
+from django.conf import settings
+
+
+# Responses considered transient (retried as the transport errors).
+RETRY_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+_client: httpx.Client | None = None
+_client_lock = threading.Lock()
+_async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+# --------------------------------------------------------------------------------------------------
+#   Clients configuration
+# --------------------------------------------------------------------------------------------------
+def _client_options() -> dict:
+    """Connection pool, timeouts and protocol options shared by sync and async clients."""
+    return {
+        'timeout': httpx.Timeout(
+            timeout=settings.EXCHANGE_RATES_API_TIMEOUT,
+            connect=settings.EXCHANGE_RATES_API_CONNECT_TIMEOUT,
+            read=settings.EXCHANGE_RATES_API_READ_TIMEOUT,
+        ),
+        'limits': httpx.Limits(
+            max_connections=settings.EXCHANGE_RATES_API_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.EXCHANGE_RATES_API_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.EXCHANGE_RATES_API_KEEPALIVE_EXPIRY,
+        ),
+        'http2': settings.EXCHANGE_RATES_API_HTTP2,
+    }
+
+
+def get_http_client() -> httpx.Client:
+    """Return the process-wide (keep-alive, pooled) HTTP client."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(**_client_options())
+                atexit.register(_client.close)
+    return _client
+
+
+async def _client_lifetime(async_client: httpx.AsyncClient) -> AsyncIterator[httpx.AsyncClient]:
+    """Async generator closing the client when its event loop shuts down its async generators.
+
+    `asyncio.run()` (the uvicorn server loop and each `async_to_sync` loop of a WSGI worker) closes
+    the pending async generators before closing the loop, so the client connections are closed.
+    """
+    try:
+        yield async_client
+    finally:
+        await async_client.aclose()
+
+
+async def aget_http_client() -> httpx.AsyncClient:
+    """Return the async HTTP client of the running event loop.
+
+    An `AsyncClient` connection pool is bound to the event loop where it was used, so there is one
+    client per loop (a single one for the lifetime of an ASGI worker), closed on its shutdown.
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in _async_clients:
+        # The async generator is tracked by the loop once started (and kept alive with the loop).
+        client_lifetime = _client_lifetime(async_client=httpx.AsyncClient(**_client_options()))
+        _async_clients[loop] = (await anext(client_lifetime), client_lifetime)
+    return _async_clients[loop][0]
+
+
+# --------------------------------------------------------------------------------------------------
+#   Retries
+# --------------------------------------------------------------------------------------------------
+def retry_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the retry following `attempt` (0 based)."""
+    backoff = min(
+        settings.EXCHANGE_RATES_API_RETRY_BACKOFF * 2 ** attempt,
+        settings.EXCHANGE_RATES_API_RETRY_BACKOFF_MAX,
+    )
+    return random.uniform(0, backoff)
+
+
+def get_with_retries(url: str, **kwargs) -> httpx.Response:
+    """GET `url` with the process-wide client, retrying transient failures.
+
+    After the last retry the transport error is raised or the (error) response is returned.
+    """
+    client = get_http_client()
+    retries = settings.EXCHANGE_RATES_API_RETRIES
+
+    for attempt in range(retries + 1):
+        try:
+            response = client.get(url=url, **kwargs)
+        except httpx.TransportError:
+            if attempt >= retries:
+                raise
+        else:
+            if attempt >= retries or response.status_code not in RETRY_STATUS_CODES:
+                return response
+        time.sleep(retry_delay(attempt))
+
+
+async def aget_with_retries(url: str, **kwargs) -> httpx.Response:
+    """Async version of `get_with_retries()`."""
+    client = await aget_http_client()
+    retries = settings.EXCHANGE_RATES_API_RETRIES
+
+    for attempt in range(retries + 1):
+        try:
+            response = await client.get(url=url, **kwargs)
+        except httpx.TransportError:
+            if attempt >= retries:
+                raise
+        else:
+            if attempt >= retries or response.status_code not in RETRY_STATUS_CODES:
+                return response
+        await asyncio.sleep(retry_delay(attempt))
@@ -0,0 +1,147 @@
+# ==================================================================================================
+#   `api` requests coalescing
+# ==================================================================================================
+
+import asyncio
+import threading
+import uuid
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+
+# Delete the lock (KEYS[1]) only if it still has the owner token (ARGV[1]), atomically
+RELEASE_LOCK_SCRIPT = '''
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+'''
+
+_scripts: dict[int, Callable] = {}
+
+# Makes the check and delete atomic on the other caches (the local memory one is process-local)
+_fallback_lock = threading.Lock()
+
+
+# --------------------------------------------------------------------------------------------------
+#   In-process single-flight
+# --------------------------------------------------------------------------------------------------
+@dataclass
+class _Call:
+    """In-flight call shared by concurrent callers."""
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Any = None
+    exception: BaseException | None = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into a single execution.
+
+    The first caller (leader) runs the function; callers arriving while it is running wait for it
+    and receive the same result (or exception).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+
+    def do(self, key: str, function: Callable[[], Any]) -> Any:
+        """Run `function` once for all concurrent callers of `key`."""
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+
+        if not is_leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = function()
+            except BaseException as err:
+                call.exception = err
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.exception is not None:
+            raise call.exception
+        return call.result
+
+
+class AsyncSingleFlight:
+    """Async version of `SingleFlight` (calls are coalesced per event loop)."""
+
+    def __init__(self) -> None:
+        self._tasks: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    async def do(self, key: str, function: Callable[[], Awaitable[Any]]) -> Any:
+        """Await `function()` once for all concurrent callers of `key`."""
+        loop_tasks = self._tasks.setdefault(asyncio.get_running_loop(), {})
+        task = loop_tasks.get(key)
+        if task is None:
+            task = loop_tasks[key] = asyncio.ensure_future(function())
+            task.add_done_callback(lambda _: loop_tasks.pop(key, None))
+        return await asyncio.shield(task)
+
+
+# --------------------------------------------------------------------------------------------------
+#   Distributed lock
+# --------------------------------------------------------------------------------------------------
+@dataclass
+class DistributedLock:
+    """Cache backed lock shared by all workers.
+
+    The lock is a cache entry created atomically (`SET NX` on Redis) with a lease, so it is
+    released automatically if its owner dies while holding it. It is released only by its owner,
+    with an atomic check and delete (a Lua script on Redis).
+    """
+    key: str
+    lease: int
+
+    def __post_init__(self):
+        self.token = uuid.uuid4().hex
+
+    def acquire(self) -> bool:
+        """Try to acquire the lock without blocking."""
+        cache = caches['default']
+        if isinstance(cache, RedisCache):
+            return cache.add(key=self.key, value=self.token, timeout=self.lease)
+        with _fallback_lock:
+            return cache.add(key=self.key, value=self.token, timeout=self.lease)
+
+    def release(self) -> None:
+        """Release the lock if it is still owned (the lease may have expired meanwhile)."""
+        cache = caches['default']
+        if isinstance(cache, RedisCache):
+            _release_lock_script(cache=cache)(
+                keys=[cache.make_and_validate_key(key=self.key)],
+                args=[cache._cache._serializer.dumps(self.token)],
+            )
+            return
+        with _fallback_lock:
+            if cache.get(key=self.key) == self.token:
+                cache.delete(key=self.key)
+
+    async def aacquire(self) -> bool:
+        """Async version of `acquire()`."""
+        return await sync_to_async(self.acquire)()
+
+    async def arelease(self) -> None:
+        """Async version of `release()`."""
+        await sync_to_async(self.release)()
+
+
+def _release_lock_script(cache: RedisCache) -> Callable:
+    """Release lock script registered on the cache Redis client (one per cache)."""
+    script = _scripts.get(id(cache))
+    if script is None:
+        client = cache._cache.get_client(write=True)
+        script = _scripts[id(cache)] = client.register_script(RELEASE_LOCK_SCRIPT)
+    return script
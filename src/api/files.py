@@ -0,0 +1,150 @@
+# ==================================================================================================
+#   `api` bulk files conversion
+# ==================================================================================================
+
+import csv
+import io
+import json
+import logging
+from itertools import islice
+from typing import Iterable, Iterator
+
+from .logic import convert_batch
+from .snapshots import RatesSnapshot
+
+
+FILE_FORMATS = ['csv', 'jsonl']
+INPUT_FIELDS = ['from', 'to', 'amount']
+OUTPUT_FIELDS = ['from', 'to', 'amount', 'converted_value', 'error']
+
+logger = logging.getLogger(__name__)
+
+
+# --------------------------------------------------------------------------------------------------
+#   Input
+# --------------------------------------------------------------------------------------------------
+def _read_csv_rows(lines: Iterable[str]) -> Iterator[dict]:
+    """Read CSV rows (with a `from,to,amount` header)."""
+    for row in csv.DictReader(lines):
+        yield {field: row.get(field) for field in INPUT_FIELDS}
+
+
+def _currency_name(value) -> str | None:
+    """Currency name from a JSON value (any JSON type is accepted and fails as unavailable)."""
+    return None if value is None else str(value)
+
+
+def _read_jsonl_rows(lines: Iterable[str]) -> Iterator[dict]:
+    """Read JSON lines rows (`{"from": ..., "to": ..., "amount": ...}` objects)."""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as err:
+            yield {'error': f'Invalid JSON: {err}'}
+            continue
+        if not isinstance(row, dict):
+            yield {'error': 'Invalid row: a JSON object is required.'}
+            continue
+        yield {
+            'from': _currency_name(row.get('from')),
+            'to': _currency_name(row.get('to')),
+            'amount': row.get('amount'),
+        }
+
+
+def read_rows(lines: Iterable[str], file_format: str) -> Iterator[dict]:
+    """Lazily read the conversion rows of a file."""
+    if file_format == 'csv':
+        return _read_csv_rows(lines=lines)
+    return _read_jsonl_rows(lines=lines)
+
+
+# --------------------------------------------------------------------------------------------------
+#   Conversion
+# --------------------------------------------------------------------------------------------------
+def _convert_chunk(chunk: list[dict], snapshot: RatesSnapshot) -> tuple[list, dict[int, str]]:
+    """Converted values and errors (by position) of the chunk rows.
+
+    If the chunk conversion fails, its rows are converted one by one, so the failing ones become
+    error rows instead of cutting the (already streaming) output file off.
+    """
+    try:
+        conversion_status = convert_batch(
+            snapshot=snapshot,
+            from_currencies=[row.get('from') for row in chunk],
+            to_currencies=[row.get('to') for row in chunk],
+            amounts=[row.get('amount') for row in chunk],
+        )
+    except Exception:
+        if len(chunk) == 1:
+            logger.exception('File row conversion failed.')
+            return [None], {0: 'Invalid row: it could not be converted.'}
+        converted_values = []
+        errors = {}
+        for position, row in enumerate(chunk):
+            row_converted_values, row_errors = _convert_chunk(chunk=[row], snapshot=snapshot)
+            converted_values.extend(row_converted_values)
+            if row_errors:
+                errors[position] = row_errors[0]
+        return converted_values, errors
+
+    errors = {error['index']: error['error'] for error in conversion_status.data['errors']}
+    return conversion_status.data['converted_values'], errors
+
+
+def convert_rows(
+    rows: Iterable[dict],
+    snapshot: RatesSnapshot,
+    chunk_size: int,
+) -> Iterator[list[dict]]:
+    """Convert the rows in chunks of `chunk_size`, all of them with the same (pinned) snapshot."""
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        converted_values, errors = _convert_chunk(chunk=chunk, snapshot=snapshot)
+
+        yield [
+            {
+                'from': row.get('from'),
+                'to': row.get('to'),
+                'amount': row.get('amount'),
+                'converted_value': None if 'error' in row else converted_value,
+                'error': row.get('error') or errors.get(position),
+            }
+            for position, (row, converted_value) in enumerate(zip(chunk, converted_values))
+        ]
+
+
+# --------------------------------------------------------------------------------------------------
+#   Output
+# --------------------------------------------------------------------------------------------------
+def write_chunks(chunks: Iterable[list[dict]], file_format: str) -> Iterator[str]:
+    """Serialize the converted rows, one chunk at a time."""
+    if file_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=OUTPUT_FIELDS)
+        writer.writeheader()
+        for chunk in chunks:
+            writer.writerows(chunk)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    else:
+        for chunk in chunks:
+            yield ''.join(json.dumps(row) + '\n' for row in chunk)
+
+
+def convert_file(
+    lines: Iterable[str],
+    snapshot: RatesSnapshot,
+    input_format: str,
+    output_format: str,
+    chunk_size: int,
+) -> Iterator[str]:
+    """Convert a (lazily read) file, generating the output file incrementally."""
+    rows = read_rows(lines=lines, file_format=input_format)
+    chunks = convert_rows(rows=rows, snapshot=snapshot, chunk_size=chunk_size)
+    return write_chunks(chunks=chunks, file_format=output_format)
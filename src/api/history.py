@@ -0,0 +1,147 @@
+# ==================================================================================================
+#   `api` historical rates time series
+# ==================================================================================================
+
+import datetime
+import json
+import re
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterator
+
+import numpy as np
+from django.conf import settings
+
+from .models import HistoricalRates
+
+
+INTERVAL_REGEX = re.compile(r'^(?P<value>[1-9]\d*)(?P<unit>[smhd])$')
+INTERVAL_UNITS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_interval(interval_str: str) -> datetime.timedelta | None:
+    """Parse an interval like `30s`, `15m`, `1h` or `7d` (`None` if invalid)."""
+    match = INTERVAL_REGEX.match(interval_str)
+    if match is None:
+        return None
+    return datetime.timedelta(seconds=int(match['value']) * INTERVAL_UNITS[match['unit']])
+
+
+# --------------------------------------------------------------------------------------------------
+#   Buckets aggregation
+# --------------------------------------------------------------------------------------------------
+@dataclass
+class _Bucket:
+    """Cross rate aggregation of a time interval."""
+    index: int
+    open: float
+    high: float
+    low: float
+    close: float
+    total: float
+    count: int
+
+    def merge(self, other: '_Bucket') -> None:
+        """Merge the aggregation of a later part of the same interval."""
+        self.high = max(self.high, other.high)
+        self.low = min(self.low, other.low)
+        self.close = other.close
+        self.total += other.total
+        self.count += other.count
+
+
+@dataclass
+class RatesTimeSeries:
+    """Cross rate time series (OHLC and mean per interval) of a currencies pair."""
+    from_currency_name: str
+    to_currency_name: str
+    start: datetime.datetime
+    end: datetime.datetime
+    interval: datetime.timedelta
+
+    def _rows(self) -> Iterator[tuple]:
+        """Historical rates of the pair, in time order, fetched from database in chunks."""
+        return (
+            HistoricalRates.objects
+            .filter(last_update__gte=self.start, last_update__lt=self.end)
+            .order_by('last_update')
+            .values_list(
+                'last_update',
+                f'rates__{self.from_currency_name}',
+                f'rates__{self.to_currency_name}',
+            )
+            .iterator(chunk_size=settings.RATES_HISTORY_CHUNK_SIZE)
+        )
+
+    def _chunk_buckets(self, rows: list[tuple]) -> list[_Bucket]:
+        """Aggregate a chunk of rows (vectorized) by interval."""
+        rows = [row for row in rows if row[1] and row[2]]
+        if not rows:
+            return []
+
+        timestamps = np.fromiter(
+            (row[0].timestamp() for row in rows), dtype=np.float64, count=len(rows))
+        cross_rates = np.fromiter(
+            (float(row[2]) / float(row[1]) for row in rows), dtype=np.float64, count=len(rows))
+
+        indexes = ((timestamps - self.start.timestamp()) // self.interval.total_seconds()).astype(
+            np.int64)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(indexes)) + 1))
+        ends = np.concatenate((starts[1:], [len(rows)])) - 1
+
+        return [
+            _Bucket(
+                index=index,
+                open=open_,
+                high=high,
+                low=low,
+                close=close,
+                total=total,
+                count=count,
+            )
+            for index, open_, high, low, close, total, count in zip(
+                indexes[starts].tolist(),
+                cross_rates[starts].tolist(),
+                np.maximum.reduceat(cross_rates, starts).tolist(),
+                np.minimum.reduceat(cross_rates, starts).tolist(),
+                cross_rates[ends].tolist(),
+                np.add.reduceat(cross_rates, starts).tolist(),
+                (ends - starts + 1).tolist(),
+            )
+        ]
+
+    def buckets(self) -> Iterator[dict]:
+        """Generate the aggregated intervals as soon as each one is complete."""
+        rows = self._rows()
+        pending_bucket = None
+
+        while chunk := list(islice(rows, settings.RATES_HISTORY_CHUNK_SIZE)):
+            for bucket in self._chunk_buckets(rows=chunk):
+                if pending_bucket is not None and pending_bucket.index == bucket.index:
+                    pending_bucket.merge(bucket)
+                    continue
+                if pending_bucket is not None:
+                    yield self._bucket_data(bucket=pending_bucket)
+                pending_bucket = bucket
+
+        if pending_bucket is not None:
+            yield self._bucket_data(bucket=pending_bucket)
+
+    def _bucket_data(self, bucket: _Bucket) -> dict:
+        """Output data of an aggregated interval."""
+        return {
+            'start': (self.start + bucket.index * self.interval).isoformat(),
+            'open': bucket.open,
+            'high': bucket.high,
+            'low': bucket.low,
+            'close': bucket.close,
+            'mean': bucket.total / bucket.count,
+            'count': bucket.count,
+        }
+
+    def stream_json(self) -> Iterator[str]:
+        """Stream the time series as a JSON array, one interval at a time."""
+        yield '['
+        for position, bucket_data in enumerate(self.buckets()):
+            yield (',' if position else '') + json.dumps(bucket_data)
+        yield ']'
@@ -0,0 +1,96 @@
+# ==================================================================================================
+#   `api` HTTP caching (validators and freshness of the responses computed with a snapshot)
+# ==================================================================================================
+
+import datetime
+from typing import Iterable
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .snapshots import RatesSnapshot
+
+
+def snapshot_last_modified(snapshot: RatesSnapshot) -> int:
+    """Timestamp of the snapshot rates last update (by the external API)."""
+    return int(datetime.datetime.fromisoformat(snapshot.last_update).timestamp())
+
+
+def snapshot_etag(snapshot: RatesSnapshot, responses_version: int) -> str:
+    """Entity tag of the responses computed with the snapshot.
+
+    The rates last update tells apart the snapshots with the same version (e.g. after a cache
+    clear) and the historical ones (version `0`), and is kept when a snapshot is renewed. The
+    responses cache namespace version changes the tags of all the responses when invalidated.
+    """
+    last_modified = snapshot_last_modified(snapshot=snapshot)
+    return f'"{snapshot.version}.{last_modified}.{responses_version}"'
+
+
+def snapshot_max_age(snapshot: RatesSnapshot, currency_names: Iterable[str] = ()) -> int:
+    """Seconds the responses computed with the snapshot (`currency_names` rates) may be reused.
+
+    Up to the next (expected) refresh of the published snapshot, or a refresh interval for the
+    historical ones (only a new refresh may add nearer historical rates).
+    """
+    refresh_interval = min(
+        settings.EXCHANGE_RATES_REFRESH_INTERVAL, snapshot.timeout(currency_names=currency_names))
+    if snapshot.version == 0:
+        return int(refresh_interval)
+    return max(int(refresh_interval - snapshot.age), 0)
+
+
+def patch_rates_age(response: HttpResponse, snapshot: RatesSnapshot) -> HttpResponse:
+    """Add the seconds since the snapshot rates were fetched (`X-Rates-Age`) to the response.
+
+    E.g. a last known good snapshot may be served while the cache or the external API are down.
+    Historical snapshots (version `0`) have no age.
+    """
+    if snapshot.version != 0:
+        response['X-Rates-Age'] = str(int(snapshot.age))
+    return response
+
+
+def patch_snapshot_cache_headers(
+    response: HttpResponse,
+    snapshot: RatesSnapshot,
+    responses_version: int,
+    currency_names: Iterable[str] = (),
+) -> HttpResponse:
+    """Add the snapshot validators (`ETag`, `Last-Modified`), `Cache-Control` and age."""
+    patch_rates_age(response=response, snapshot=snapshot)
+    response['ETag'] = snapshot_etag(snapshot=snapshot, responses_version=responses_version)
+    response['Last-Modified'] = http_date(snapshot_last_modified(snapshot=snapshot))
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=snapshot_max_age(snapshot=snapshot, currency_names=currency_names),
+    )
+    return response
+
+
+def conditional_response(
+    request: HttpRequest,
+    snapshot: RatesSnapshot,
+    responses_version: int,
+    currency_names: Iterable[str] = (),
+) -> HttpResponse | None:
+    """Response to a conditional request, `None` if the response must be computed.
+
+    E.g. `304 Not Modified` if the client already has the response computed with the snapshot.
+    """
+    response = get_conditional_response(
+        request,
+        etag=snapshot_etag(snapshot=snapshot, responses_version=responses_version),
+        last_modified=snapshot_last_modified(snapshot=snapshot),
+    )
+    if response is not None and response.status_code == 304:
+        patch_snapshot_cache_headers(
+            response=response,
+            snapshot=snapshot,
+            responses_version=responses_version,
+            currency_names=currency_names,
+        )
+    return response
@@ -2,14 +2,57 @@
 #   `api` business logic
 # ==================================================================================================
 
-import httpx
-from dataclasses import dataclass
-from json.decoder import JSONDecodeError
+import asyncio
+import datetime
+import logging
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Iterable
 
+import httpx
+import numpy as np
+import orjson
 from django.conf import settings
+from django.db import DatabaseError, connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from redis.exceptions import RedisError
+
+from .clients import aget_with_retries, get_http_client, get_with_retries
+from .coalescing import AsyncSingleFlight, DistributedLock, SingleFlight
+from .metrics import (
+    cache_requests,
+    count_status,
+    history_write_errors,
+    upstream_fetch_duration,
+    upstream_fetches,
+)
+from .models import Currency, HistoricalRates
+from .namespaces import CACHE_NAMESPACES
+from .providers import Provider, get_providers
+from .registry import currency_registry
+from .serializers import ExchangeApiInputValidator
+from .snapshots import (
+    RatesSnapshot,
+    build_cross_rates,
+    aget_snapshot,
+    aload_last_known_good,
+    apublish_snapshot,
+    arenew_snapshot,
+    asave_last_known_good,
+    discard_last_known_good,
+    get_snapshot,
+    load_last_known_good,
+    publish_snapshot,
+    renew_snapshot,
+    save_last_known_good,
+)
 
-from .models import Currency
-from .serializers import ExchangeApiInputSerializer
+
+logger = logging.getLogger(__name__)
 
 
 # --------------------------------------------------------------------------------------------------
@@ -26,58 +69,865 @@ class OutputStatus:
 # --------------------------------------------------------------------------------------------------
 #   Business logic
 # --------------------------------------------------------------------------------------------------
+# Conditional request headers and the provider response validators they are sent with.
+CONDITIONAL_HEADERS = {'If-None-Match': 'ETag', 'If-Modified-Since': 'Last-Modified'}
+
+
 @dataclass
 class ExchangeApi:
-    """External exchange API access entity."""
+    """External exchange API access entity (over the configured providers).
 
-    url: str = settings.EXCHANGE_RATES_API_URL
-    timeout: int = settings.EXCHANGE_RATES_API_TIMEOUT
+    With the current `snapshot`, its provider is requested conditionally (with the validators of
+    the snapshot response), so an unchanged payload isn't downloaded (`not_modified` status).
+    """
+
+    providers: list[Provider] = field(default_factory=get_providers)
+    snapshot: RatesSnapshot | None = None
 
     def __post_init__(self):
         self.exchange_rates = {}
         self.last_update = None
+        self.provider_name = ''
+        self.validators = {}
 
     def _process_data(self, data) -> None:
-        """Process and validate API data."""
+        """Process the validated API data (only available currencies, in registry order).
+
+        The fetch time of a provider without update time isn't an update when its rates are the
+        ones of the current snapshot, so the snapshot update time is kept.
+        """
         self.last_update = data.get('lastupdate')
         self.last_update_iso = self.last_update.isoformat()
+        self.exchange_rates = data.get('rates')
+
+        provider = next(
+            provider for provider in self.providers if provider.name == data['provider']
+        )
+        if (
+            not provider.has_update_time
+            and self.snapshot is not None
+            and self.snapshot.rates == self.exchange_rates
+        ):
+            self.last_update_iso = self.snapshot.last_update
+            self.last_update = datetime.datetime.fromisoformat(self.last_update_iso)
 
-        self.exchange_rates = {
-            currency_name: float(exchange_rate)
-            for currency_name, exchange_rate in data.get('rates').items()
-            if currency_name in Currency.cached_acronyms_list()
+    def _conditional_headers(self, provider: Provider) -> dict[str, str]:
+        """Conditional request headers for the provider of the current snapshot."""
+        if self.snapshot is None or self.snapshot.provider != provider.name:
+            return {}
+        return {
+            header: self.snapshot.validators[validator]
+            for header, validator in CONDITIONAL_HEADERS.items()
+            if validator in self.snapshot.validators
         }
 
-    def get_exchange_rates(self) -> OutputStatus:
-        """Get the exchange rates with the external API."""
-        try:
-            result = httpx.get(url=self.url, timeout=self.timeout)
+    def _validate_result(
+        self,
+        result: httpx.Response,
+        currency_index: dict[str, int],
+        provider: Provider,
+    ) -> OutputStatus:
+        """Decode, adapt and validate a provider response (validated data on `data`).
 
-            result.raise_for_status()
-        except (httpx.HTTPStatusError, httpx.ConnectError) as err:
-            return OutputStatus(status='api_access_error', error=True, data={'error': str(err)})
+        A `304 Not Modified` response (to a conditional request) isn't decoded, since the rates of
+        the current snapshot are still the provider ones.
+        """
+        validators = {
+            validator: result.headers[validator]
+            for validator in CONDITIONAL_HEADERS.values()
+            if validator in result.headers
+        }
+        if result.status_code == httpx.codes.NOT_MODIFIED:
+            return OutputStatus(
+                status='not_modified',
+                error=False,
+                data={'provider': provider.name, 'validators': validators},
+            )
 
         try:
-            result_data = result.json()
-        except JSONDecodeError as err:
+            result_data = provider.adapt(data=orjson.loads(result.content))
+        except orjson.JSONDecodeError as err:
             return OutputStatus(
                 status='json_data_error',
                 error=True,
                 data={'error': f'Invalid JSON: {err}'},
             )
 
-        exchange_serializer = ExchangeApiInputSerializer(data=result_data)
-        if not exchange_serializer.is_valid():
+        exchange_validator = ExchangeApiInputValidator(data=result_data, currencies=currency_index)
+        if not exchange_validator.is_valid():
             return OutputStatus(
                 status='invalid_api_data_error',
                 error=True,
-                data={'error': {'Invalid API response': exchange_serializer.errors}},
+                data={'error': {'Invalid API response': exchange_validator.errors}},
             )
 
-        self._process_data(data=exchange_serializer.validated_data)
+        return OutputStatus(
+            status='ok',
+            error=False,
+            data={
+                **exchange_validator.validated_data,
+                'provider': provider.name,
+                'validators': validators,
+            },
+        )
+
+    def _exchange_rates_status(self, validation_status: OutputStatus) -> OutputStatus:
+        """Output status with the exchange rates (or the error) of the providers requests."""
+        if validation_status.error:
+            return validation_status
+
+        self.provider_name = validation_status.data['provider']
+        self.validators = validation_status.data['validators']
+        if validation_status.status == 'not_modified':
+            return OutputStatus(
+                status='not_modified',
+                error=False,
+                data={
+                    'exchange_rates': self.snapshot.rates,
+                    'updated': self.snapshot.last_update,
+                },
+            )
 
+        self._process_data(data=validation_status.data)
         return OutputStatus(
             status='ok',
             error=False,
             data={'exchange_rates': self.exchange_rates, 'updated': self.last_update_iso},
         )
+
+    def _fetch_rates(self, provider: Provider, currency_index: dict[str, int]) -> OutputStatus:
+        """Get and validate the exchange rates of a provider."""
+        try:
+            with upstream_fetch_duration.time(provider=provider.name):
+                result = get_with_retries(
+                    url=provider.url, headers=self._conditional_headers(provider=provider))
+
+            if result.status_code != httpx.codes.NOT_MODIFIED:
+                result.raise_for_status()
+        except httpx.HTTPError as err:
+            validation_status = OutputStatus(
+                status='api_access_error', error=True, data={'error': str(err)})
+        else:
+            validation_status = self._validate_result(
+                result=result,
+                currency_index=currency_index,
+                provider=provider,
+            )
+
+        upstream_fetches.inc(provider=provider.name, status=validation_status.status)
+        return validation_status
+
+    async def _afetch_rates(
+        self,
+        provider: Provider,
+        currency_index: dict[str, int],
+    ) -> OutputStatus:
+        """Async version of `_fetch_rates()`."""
+        try:
+            with upstream_fetch_duration.time(provider=provider.name):
+                result = await aget_with_retries(
+                    url=provider.url, headers=self._conditional_headers(provider=provider))
+
+            if result.status_code != httpx.codes.NOT_MODIFIED:
+                result.raise_for_status()
+        except httpx.HTTPError as err:
+            validation_status = OutputStatus(
+                status='api_access_error', error=True, data={'error': str(err)})
+        else:
+            validation_status = self._validate_result(
+                result=result,
+                currency_index=currency_index,
+                provider=provider,
+            )
+
+        upstream_fetches.inc(provider=provider.name, status=validation_status.status)
+        return validation_status
+
+    @count_status(operation='exchange_rates')
+    def get_exchange_rates(self) -> OutputStatus:
+        """Get the exchange rates with the external API providers.
+
+        Providers are requested in preference order: the next one is requested (hedged) when the
+        ones in flight didn't answer in `EXCHANGE_RATES_HEDGE_DELAY` seconds, or right away when
+        they all failed (failover). The first valid response wins, otherwise the error of the
+        preferred provider is returned.
+        """
+        currency_index = currency_registry.index()
+        executor = ThreadPoolExecutor(max_workers=max(len(self.providers), 1))
+        positions: dict[Future, int] = {}
+        errors: dict[int, OutputStatus] = {}
+        pending: set[Future] = set()
+
+        try:
+            for position, provider in enumerate(self.providers):
+                future = executor.submit(
+                    self._fetch_rates, provider=provider, currency_index=currency_index)
+                positions[future] = position
+                pending.add(future)
+
+                while pending:
+                    done, pending = wait(
+                        pending,
+                        timeout=settings.EXCHANGE_RATES_HEDGE_DELAY,
+                        return_when=FIRST_COMPLETED,
+                    )
+                    if not done:
+                        break
+                    for future in done:
+                        validation_status = future.result()
+                        if not validation_status.error:
+                            return self._exchange_rates_status(validation_status)
+                        errors[positions[future]] = validation_status
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    validation_status = future.result()
+                    if not validation_status.error:
+                        return self._exchange_rates_status(validation_status)
+                    errors[positions[future]] = validation_status
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return self._exchange_rates_status(errors[min(errors)])
+
+    @count_status(operation='exchange_rates')
+    async def aget_exchange_rates(self) -> OutputStatus:
+        """Async version of `get_exchange_rates()`."""
+        currency_index = await currency_registry.aindex()
+        positions: dict[asyncio.Task, int] = {}
+        errors: dict[int, OutputStatus] = {}
+        pending: set[asyncio.Task] = set()
+
+        try:
+            for position, provider in enumerate(self.providers):
+                task = asyncio.create_task(
+                    self._afetch_rates(provider=provider, currency_index=currency_index))
+                positions[task] = position
+                pending.add(task)
+
+                while pending:
+                    done, pending = await asyncio.wait(
+                        pending,
+                        timeout=settings.EXCHANGE_RATES_HEDGE_DELAY,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    if not done:
+                        break
+                    for task in done:
+                        validation_status = task.result()
+                        if not validation_status.error:
+                            return self._exchange_rates_status(validation_status)
+                        errors[positions[task]] = validation_status
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    validation_status = task.result()
+                    if not validation_status.error:
+                        return self._exchange_rates_status(validation_status)
+                    errors[positions[task]] = validation_status
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return self._exchange_rates_status(errors[min(errors)])
+
+
+@count_status(operation='conversion')
+def convert_amount(
+    snapshot: RatesSnapshot,
+    from_currency_name: str,
+    to_currency_name: str,
+    amount_str: str,
+) -> OutputStatus:
+    """Convert an amount between two currencies using the snapshot rates."""
+    for currency_name in [from_currency_name, to_currency_name]:
+        if currency_name not in snapshot.currency_index:
+            return OutputStatus(
+                status='currency_not_available_error',
+                error=True,
+                data={'error': f'The currency [{currency_name}] is not available for conversion.'},
+            )
+
+    try:
+        amount = float(amount_str)
+    except ValueError:
+        amount = math.nan
+
+    converted_value = amount * snapshot.cross_rate(
+        from_currency_name=from_currency_name,
+        to_currency_name=to_currency_name,
+    )
+    # Non-finite amounts (`nan`, `inf`) and converted values (overflows) aren't valid JSON numbers
+    if not math.isfinite(converted_value):
+        return OutputStatus(
+            status='invalid_amount_error',
+            error=True,
+            data={'error': f'The amount [{amount_str}] is a invalid value.'},
+        )
+
+    return OutputStatus(
+        status='ok',
+        error=False,
+        data={
+            'from_currency': from_currency_name,
+            'amount': amount,
+            'to_currency': to_currency_name,
+            'converted_value': converted_value,
+            'last_update': snapshot.last_update,
+        },
+    )
+
+
+def _parse_amounts(amounts: list) -> np.ndarray:
+    """Convert the amounts to floats (invalid ones, e.g. nested arrays, become `nan`)."""
+    try:
+        parsed_amounts = np.asarray(amounts, dtype=np.float64)
+        if parsed_amounts.shape == (len(amounts),):
+            return parsed_amounts
+    except (TypeError, ValueError, OverflowError):
+        pass
+
+    parsed_amounts = np.empty(len(amounts), dtype=np.float64)
+    for position, amount in enumerate(amounts):
+        try:
+            parsed_amounts[position] = float(amount)
+        except (TypeError, ValueError, OverflowError):
+            parsed_amounts[position] = np.nan
+    return parsed_amounts
+
+
+def _currency_indexes(currency_names: list, currency_index: dict[str, int]) -> np.ndarray:
+    """Indexes of the currencies (`-1` for the unavailable ones and the non-string values)."""
+    return np.fromiter(
+        (
+            currency_index.get(currency_name, -1) if isinstance(currency_name, str) else -1
+            for currency_name in currency_names
+        ),
+        dtype=np.intp,
+        count=len(currency_names),
+    )
+
+
+@count_status(operation='batch_conversion')
+def convert_batch(
+    snapshot: RatesSnapshot,
+    from_currencies: list[str],
+    to_currencies: list[str],
+    amounts: list,
+) -> OutputStatus:
+    """Convert a batch of amounts at once using the snapshot rates.
+
+    Converted values are returned in the input order, items with unknown currencies or invalid
+    amounts have a `None` converted value and an entry on `errors`.
+    """
+    currency_index = snapshot.currency_index
+    batch_size = len(amounts)
+
+    from_indexes = _currency_indexes(
+        currency_names=from_currencies, currency_index=currency_index)
+    to_indexes = _currency_indexes(currency_names=to_currencies, currency_index=currency_index)
+    amounts_array = _parse_amounts(amounts=amounts)
+
+    valid = (from_indexes >= 0) & (to_indexes >= 0) & np.isfinite(amounts_array)
+    cross_rates = np.full(batch_size, np.nan)
+    cross_rates[valid] = snapshot.cross_rates_matrix[from_indexes[valid], to_indexes[valid]]
+    with np.errstate(over='ignore', invalid='ignore'):
+        converted_array = amounts_array * cross_rates
+    # Overflows aren't valid JSON numbers either
+    valid &= np.isfinite(converted_array)
+    converted_values = converted_array.tolist()
+
+    errors = []
+    for position in np.flatnonzero(~valid).tolist():
+        converted_values[position] = None
+        for currency_name, index in [
+            (from_currencies[position], from_indexes[position]),
+            (to_currencies[position], to_indexes[position]),
+        ]:
+            if index < 0:
+                error = f'The currency [{currency_name}] is not available for conversion.'
+                break
+        else:
+            error = f'The amount [{amounts[position]}] is a invalid value.'
+        errors.append({'index': position, 'error': error})
+
+    return OutputStatus(
+        status='ok',
+        error=False,
+        data={
+            'converted_values': converted_values,
+            'errors': errors,
+            'last_update': snapshot.last_update,
+        },
+    )
+
+
+# --------------------------------------------------------------------------------------------------
+#   Rates snapshot
+# --------------------------------------------------------------------------------------------------
+REFRESH_LOCK_CACHE_KEY = 'api_rates_snapshot_refresh_lock'
+REFRESH_WAIT_POLL_INTERVAL = 0.05
+
+_background_refresh_lock = threading.Lock()
+_background_refresh_tasks: set[asyncio.Task] = set()
+_refresh_flight = SingleFlight()
+_async_refresh_flight = AsyncSingleFlight()
+
+
+def _is_unchanged(exchange_api: ExchangeApi, exchange_rates_status: OutputStatus) -> bool:
+    """Whether the fetched rates are the ones of the current snapshot."""
+    if exchange_rates_status.status == 'not_modified':
+        return True
+    return (
+        exchange_api.snapshot is not None
+        and exchange_api.snapshot.last_update == exchange_api.last_update_iso
+        and exchange_api.snapshot.rates == exchange_api.exchange_rates
+    )
+
+
+def _fetch_and_publish_snapshot() -> OutputStatus:
+    """Fetch the exchange rates with the external API and publish them as a new snapshot.
+
+    Unchanged rates (e.g. a `304 Not Modified` provider response to the conditional request) only
+    renew the current snapshot. The snapshot is also saved as the last known good one.
+    """
+    exchange_api = ExchangeApi(snapshot=get_snapshot())
+    exchange_rates_status = exchange_api.get_exchange_rates()
+
+    if exchange_rates_status.error:
+        return exchange_rates_status
+
+    if _is_unchanged(exchange_api=exchange_api, exchange_rates_status=exchange_rates_status):
+        snapshot = renew_snapshot(
+            snapshot=exchange_api.snapshot,
+            provider=exchange_api.provider_name,
+            validators=exchange_api.validators,
+        )
+        save_last_known_good(snapshot=snapshot)
+        return OutputStatus(status='not_modified', error=False, data={'snapshot': snapshot})
+
+    snapshot = publish_snapshot(
+        last_update=exchange_api.last_update_iso,
+        rates=exchange_api.exchange_rates,
+        provider=exchange_api.provider_name,
+        validators=exchange_api.validators,
+    )
+    save_last_known_good(snapshot=snapshot)
+    try:
+        HistoricalRates.objects.bulk_create(
+            [HistoricalRates(
+                last_update=exchange_api.last_update, rates=exchange_api.exchange_rates)],
+            ignore_conflicts=True,
+        )
+    except DatabaseError:
+        # The snapshot is already published, only the history misses it
+        logger.exception('Historical rates save failed.')
+        history_write_errors.inc()
+    return OutputStatus(status='ok', error=False, data={'snapshot': snapshot})
+
+
+def _wait_for_snapshot() -> OutputStatus:
+    """Wait briefly for the snapshot being published by another worker (or use the previous one)."""
+    previous_snapshot = get_snapshot()
+    deadline = time.monotonic() + settings.EXCHANGE_RATES_REFRESH_LOCK_WAIT
+
+    while time.monotonic() < deadline:
+        time.sleep(REFRESH_WAIT_POLL_INTERVAL)
+        snapshot = get_snapshot()
+        if snapshot is not None and snapshot != previous_snapshot:
+            return OutputStatus(status='ok', error=False, data={'snapshot': snapshot})
+
+    if previous_snapshot is not None:
+        return OutputStatus(status='ok', error=False, data={'snapshot': previous_snapshot})
+
+    return OutputStatus(
+        status='refresh_timeout_error',
+        error=True,
+        data={'error': 'Exchange rates are being refreshed, try again later.'},
+    )
+
+
+def _coalesced_refresh() -> OutputStatus:
+    """Refresh the snapshot unless another worker is already doing it."""
+    refresh_lock = DistributedLock(
+        key=REFRESH_LOCK_CACHE_KEY,
+        lease=settings.EXCHANGE_RATES_REFRESH_LOCK_LEASE,
+    )
+    if not refresh_lock.acquire():
+        return _wait_for_snapshot()
+
+    try:
+        return _fetch_and_publish_snapshot()
+    finally:
+        refresh_lock.release()
+
+
+@count_status(operation='rates_refresh')
+def refresh_rates_snapshot() -> OutputStatus:
+    """Refresh the rates snapshot, coalescing concurrent refreshes.
+
+    Concurrent callers on the same process share a single refresh and only the worker holding the
+    distributed lock accesses the external API, the other ones wait for its snapshot.
+    """
+    return _refresh_flight.do(key=REFRESH_LOCK_CACHE_KEY, function=_coalesced_refresh)
+
+
+def _background_refresh() -> None:
+    """Refresh the snapshot outside the request cycle (one refresh at a time per process)."""
+    try:
+        refresh_rates_snapshot()
+    except RedisError:
+        # The cache is unavailable, the next lookups retry
+        pass
+    finally:
+        connection.close()
+        _background_refresh_lock.release()
+
+
+def _start_background_refresh() -> None:
+    """Refresh the snapshot on a background thread, unless it's already being refreshed."""
+    if _background_refresh_lock.acquire(blocking=False):
+        threading.Thread(target=_background_refresh, daemon=True).start()
+
+
+def _count_snapshot_lookup(snapshot: RatesSnapshot | None, is_stale: bool) -> None:
+    """Count a published snapshot lookup (hit, stale or miss)."""
+    if snapshot is None:
+        result = 'miss'
+    else:
+        result = 'stale' if is_stale else 'hit'
+    cache_requests.inc(cache='rates_snapshot', result=result)
+
+
+def _is_recent(snapshot: RatesSnapshot) -> bool:
+    """Whether the (last known good) snapshot is within the published snapshots retention."""
+    return snapshot.age < settings.EXCHANGE_RATES_SNAPSHOT_RETENTION
+
+
+def _last_known_good_status(snapshot: RatesSnapshot) -> OutputStatus:
+    """Output status of the last known good snapshot served instead of the published one."""
+    cache_requests.inc(cache='last_known_good_snapshot', result='hit')
+    return OutputStatus(status='last_known_good', error=False, data={'snapshot': snapshot})
+
+
+def _cache_access_error() -> OutputStatus:
+    """Output status of the cache (Redis) failures."""
+    return OutputStatus(
+        status='cache_access_error',
+        error=True,
+        data={'error': 'Exchange rates cache is unavailable, try again later.'},
+    )
+
+
+def _refresh_or_last_known_good() -> OutputStatus:
+    """Refresh the missing snapshot or serve the last known good one (saved on disk).
+
+    A recent last known good snapshot is served right away (while it's refreshed in background),
+    and an older one only if the refresh fails (e.g. both the cache and the external API are down).
+    """
+    last_known_good = load_last_known_good()
+    if last_known_good is not None and _is_recent(snapshot=last_known_good):
+        _start_background_refresh()
+        return _last_known_good_status(snapshot=last_known_good)
+
+    try:
+        refresh_status = refresh_rates_snapshot()
+    except RedisError:
+        refresh_status = _cache_access_error()
+    if refresh_status.error and last_known_good is not None:
+        return _last_known_good_status(snapshot=last_known_good)
+    return refresh_status
+
+
+def get_rates_snapshot(currency_names: tuple[str, ...] = ()) -> OutputStatus:
+    """Get the published rates snapshot (stale-while-revalidate).
+
+    A stale snapshot is still served while a background thread replaces it; the external API is
+    only accessed synchronously when no snapshot was published yet (cold start) and there is no
+    recent last known good snapshot on disk. The snapshot is stale sooner when the rates of
+    volatile `currency_names` are going to be used.
+    """
+    try:
+        snapshot = get_snapshot()
+    except RedisError:
+        snapshot = None
+    is_stale = snapshot is not None and snapshot.is_stale_for(currency_names=currency_names)
+    _count_snapshot_lookup(snapshot=snapshot, is_stale=is_stale)
+    if snapshot is None:
+        return _refresh_or_last_known_good()
+
+    if is_stale:
+        _start_background_refresh()
+
+    return OutputStatus(status='ok', error=False, data={'snapshot': snapshot})
+
+
+def warm_up() -> OutputStatus:
+    """Prepare the process to serve requests (currencies registry, HTTP client and snapshot).
+
+    The last known good snapshot is loaded first, so a cold (or unavailable) cache doesn't hold
+    the process startup.
+    """
+    load_last_known_good()
+    get_http_client()
+    try:
+        currency_registry.index()
+    except RedisError:
+        # The cache is unavailable, the registry is loaded on first use
+        pass
+    return get_rates_snapshot()
+
+
+# --------------------------------------------------------------------------------------------------
+#   Rates snapshot (async)
+# --------------------------------------------------------------------------------------------------
+async def _afetch_and_publish_snapshot() -> OutputStatus:
+    """Async version of `_fetch_and_publish_snapshot()`."""
+    exchange_api = ExchangeApi(snapshot=await aget_snapshot())
+    exchange_rates_status = await exchange_api.aget_exchange_rates()
+
+    if exchange_rates_status.error:
+        return exchange_rates_status
+
+    if _is_unchanged(exchange_api=exchange_api, exchange_rates_status=exchange_rates_status):
+        snapshot = await arenew_snapshot(
+            snapshot=exchange_api.snapshot,
+            provider=exchange_api.provider_name,
+            validators=exchange_api.validators,
+        )
+        await asave_last_known_good(snapshot=snapshot)
+        return OutputStatus(status='not_modified', error=False, data={'snapshot': snapshot})
+
+    snapshot = await apublish_snapshot(
+        last_update=exchange_api.last_update_iso,
+        rates=exchange_api.exchange_rates,
+        provider=exchange_api.provider_name,
+        validators=exchange_api.validators,
+    )
+    await asave_last_known_good(snapshot=snapshot)
+    try:
+        await HistoricalRates.objects.abulk_create(
+            [HistoricalRates(
+                last_update=exchange_api.last_update, rates=exchange_api.exchange_rates)],
+            ignore_conflicts=True,
+        )
+    except DatabaseError:
+        logger.exception('Historical rates save failed.')
+        history_write_errors.inc()
+    return OutputStatus(status='ok', error=False, data={'snapshot': snapshot})
+
+
+async def _await_for_snapshot() -> OutputStatus:
+    """Async version of `_wait_for_snapshot()`."""
+    previous_snapshot = await aget_snapshot()
+    deadline = time.monotonic() + settings.EXCHANGE_RATES_REFRESH_LOCK_WAIT
+
+    while time.monotonic() < deadline:
+        await asyncio.sleep(REFRESH_WAIT_POLL_INTERVAL)
+        snapshot = await aget_snapshot()
+        if snapshot is not None and snapshot != previous_snapshot:
+            return OutputStatus(status='ok', error=False, data={'snapshot': snapshot})
+
+    if previous_snapshot is not None:
+        return OutputStatus(status='ok', error=False, data={'snapshot': previous_snapshot})
+
+    return OutputStatus(
+        status='refresh_timeout_error',
+        error=True,
+        data={'error': 'Exchange rates are being refreshed, try again later.'},
+    )
+
+
+async def _acoalesced_refresh() -> OutputStatus:
+    """Async version of `_coalesced_refresh()`."""
+    refresh_lock = DistributedLock(
+        key=REFRESH_LOCK_CACHE_KEY,
+        lease=settings.EXCHANGE_RATES_REFRESH_LOCK_LEASE,
+    )
+    if not await refresh_lock.aacquire():
+        return await _await_for_snapshot()
+
+    try:
+        return await _afetch_and_publish_snapshot()
+    finally:
+        await refresh_lock.arelease()
+
+
+@count_status(operation='rates_refresh')
+async def arefresh_rates_snapshot() -> OutputStatus:
+    """Async version of `refresh_rates_snapshot()`."""
+    return await _async_refresh_flight.do(key=REFRESH_LOCK_CACHE_KEY, function=_acoalesced_refresh)
+
+
+async def _abackground_refresh() -> None:
+    """Async version of `_background_refresh()`."""
+    try:
+        await arefresh_rates_snapshot()
+    except RedisError:
+        # The cache is unavailable, the next lookups retry
+        pass
+
+
+def _start_background_refresh_task() -> None:
+    """Refresh the snapshot on a background task, unless it's already being refreshed."""
+    if not _background_refresh_tasks:
+        refresh_task = asyncio.create_task(_abackground_refresh())
+        _background_refresh_tasks.add(refresh_task)
+        refresh_task.add_done_callback(_background_refresh_tasks.discard)
+
+
+async def _arefresh_or_last_known_good() -> OutputStatus:
+    """Async version of `_refresh_or_last_known_good()`."""
+    last_known_good = await aload_last_known_good()
+    if last_known_good is not None and _is_recent(snapshot=last_known_good):
+        _start_background_refresh_task()
+        return _last_known_good_status(snapshot=last_known_good)
+
+    try:
+        refresh_status = await arefresh_rates_snapshot()
+    except RedisError:
+        refresh_status = _cache_access_error()
+    if refresh_status.error and last_known_good is not None:
+        return _last_known_good_status(snapshot=last_known_good)
+    return refresh_status
+
+
+async def aget_rates_snapshot(currency_names: tuple[str, ...] = ()) -> OutputStatus:
+    """Async version of `get_rates_snapshot()` (stale snapshots are refreshed by a task)."""
+    try:
+        snapshot = await aget_snapshot()
+    except RedisError:
+        snapshot = None
+    is_stale = snapshot is not None and snapshot.is_stale_for(currency_names=currency_names)
+    _count_snapshot_lookup(snapshot=snapshot, is_stale=is_stale)
+    if snapshot is None:
+        return await _arefresh_or_last_known_good()
+
+    if is_stale:
+        _start_background_refresh_task()
+
+    return OutputStatus(status='ok', error=False, data={'snapshot': snapshot})
+
+
+# --------------------------------------------------------------------------------------------------
+#   Cache invalidation
+# --------------------------------------------------------------------------------------------------
+def _warm_rates() -> None:
+    """Publish a snapshot of the current rates (on the warming rates namespace)."""
+    _fetch_and_publish_snapshot()
+
+
+def _warm_currencies() -> None:
+    """Cache the currencies list and registry version (on the warming currencies namespace)."""
+    currency_registry.invalidate()
+    Currency.cached_acronyms_list()
+
+
+CACHE_WARMERS: dict[str, Callable[[], None]] = {
+    'rates': _warm_rates,
+    'currencies': _warm_currencies,
+}
+
+
+def invalidate_cache(scopes: Iterable[str], rewarm: bool = False) -> dict[str, int]:
+    """Invalidate the cached data of the `scopes` namespaces, returning their new versions.
+
+    When `rewarm`, the data is loaded on the next version before it goes live, so the workers don't
+    all miss the cache (and access the database and the external API) at once.
+    """
+    versions = {}
+    for name, namespace in CACHE_NAMESPACES.items():
+        if name not in scopes:
+            continue
+        if name == 'rates':
+            # Otherwise the invalidated rates would be served on the next snapshot miss (re-warming
+            # saves the new ones)
+            discard_last_known_good()
+        warmer = CACHE_WARMERS.get(name)
+        if rewarm and warmer is not None:
+            with namespace.warming():
+                warmer()
+        versions[name] = namespace.invalidate()
+    return versions
+
+
+def _background_invalidation(scopes: list[str]) -> None:
+    """Re-warm and invalidate the cache namespaces outside the request cycle."""
+    try:
+        invalidate_cache(scopes=scopes, rewarm=True)
+    finally:
+        connection.close()
+
+
+def invalidate_cache_in_background(scopes: list[str]) -> None:
+    """Invalidate the `scopes` namespaces after re-warming them on a background thread."""
+    threading.Thread(
+        target=_background_invalidation, kwargs={'scopes': scopes}, daemon=True).start()
+
+
+# --------------------------------------------------------------------------------------------------
+#   Historical rates
+# --------------------------------------------------------------------------------------------------
+def parse_timestamp(timestamp_str: str) -> OutputStatus:
+    """Parse an ISO 8601 timestamp (naive ones are considered UTC)."""
+    try:
+        timestamp = parse_datetime(timestamp_str)
+    except ValueError:
+        timestamp = None
+    if timestamp is None:
+        return OutputStatus(
+            status='invalid_timestamp_error',
+            error=True,
+            data={'error': f'The timestamp [{timestamp_str}] is a invalid value.'},
+        )
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp, timezone=datetime.timezone.utc)
+    return OutputStatus(status='ok', error=False, data={'timestamp': timestamp})
+
+
+def _nearest_snapshot_status(
+    timestamp: datetime.datetime,
+    before: HistoricalRates | None,
+    after: HistoricalRates | None,
+) -> OutputStatus:
+    """Snapshot of the historical rates (`before` or `after`) nearest to the timestamp."""
+    candidates = [record for record in (before, after) if record is not None]
+    if not candidates:
+        return OutputStatus(
+            status='historical_rates_not_found_error',
+            error=True,
+            data={'error': 'There are no historical rates available.'},
+        )
+    record = min(candidates, key=lambda record: abs(record.last_update - timestamp))
+
+    snapshot = RatesSnapshot(
+        version=0,
+        last_update=record.last_update.isoformat(),
+        rates=record.rates,
+        fetched_at=record.created.timestamp(),
+        cross_rates=build_cross_rates(rates=record.rates),
+    )
+    return OutputStatus(status='ok', error=False, data={'snapshot': snapshot})
+
+
+def get_historical_snapshot(timestamp: datetime.datetime) -> OutputStatus:
+    """Get the historical rates snapshot nearest to `timestamp`.
+
+    The nearest snapshots before and after the timestamp are each found by an index lookup.
+    """
+    before = HistoricalRates.objects.filter(last_update__lte=timestamp).order_by('-last_update')
+    after = HistoricalRates.objects.filter(last_update__gt=timestamp).order_by('last_update')
+    return _nearest_snapshot_status(timestamp=timestamp, before=before.first(), after=after.first())
+
+
+async def aget_historical_snapshot(timestamp: datetime.datetime) -> OutputStatus:
+    """Async version of `get_historical_snapshot()`."""
+    before = HistoricalRates.objects.filter(last_update__lte=timestamp).order_by('-last_update')
+    after = HistoricalRates.objects.filter(last_update__gt=timestamp).order_by('last_update')
+    return _nearest_snapshot_status(
+        timestamp=timestamp,
+        before=await before.afirst(),
+        after=await after.afirst(),
+    )
@@ -0,0 +1,83 @@
+# ==================================================================================================
+#   `convert_file` management command
+# ==================================================================================================
+
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.files import FILE_FORMATS, convert_file
+from api.logic import get_rates_snapshot
+
+
+class Command(BaseCommand):
+    """Bulk file conversion."""
+
+    help = 'Convert a CSV or JSON lines file of `from`, `to` and `amount` rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Input file path (`-` for stdin).')
+        parser.add_argument('output', help='Output file path (`-` for stdout).')
+        parser.add_argument(
+            '--input-format',
+            choices=FILE_FORMATS,
+            help='Input file format (from the input file extension by default).',
+        )
+        parser.add_argument(
+            '--output-format',
+            choices=FILE_FORMATS,
+            help='Output file format (from the output file extension by default).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.FILE_CONVERSION_CHUNK_SIZE,
+            help='Rows converted at once.',
+        )
+
+    @staticmethod
+    def _file_format(path: str, file_format: str | None, default: str) -> str:
+        """File format explicitly chosen or from the file extension."""
+        if file_format is not None:
+            return file_format
+        extension = Path(path).suffix.lstrip('.')
+        return extension if extension in FILE_FORMATS else default
+
+    def handle(self, *args, **options):
+        input_format = self._file_format(
+            path=options['input'], file_format=options['input_format'], default='csv')
+        output_format = self._file_format(
+            path=options['output'], file_format=options['output_format'], default=input_format)
+
+        snapshot_status = get_rates_snapshot()
+        if snapshot_status.error:
+            raise CommandError(
+                f'Rates unavailable [{snapshot_status.status}]: {snapshot_status.data}')
+        snapshot = snapshot_status.data['snapshot']
+
+        input_file = (
+            sys.stdin if options['input'] == '-'
+            else open(options['input'], encoding='utf-8', newline='')
+        )
+        output_file = (
+            sys.stdout if options['output'] == '-'
+            else open(options['output'], 'w', encoding='utf-8', newline='')
+        )
+        try:
+            for output_data in convert_file(
+                lines=input_file,
+                snapshot=snapshot,
+                input_format=input_format,
+                output_format=output_format,
+                chunk_size=options['chunk_size'],
+            ):
+                output_file.write(output_data)
+        finally:
+            if input_file is not sys.stdin:
+                input_file.close()
+            if output_file is not sys.stdout:
+                output_file.close()
+
+        self.stderr.write(f'Converted with the rates of {snapshot.last_update}.')
@@ -0,0 +1,79 @@
+# ==================================================================================================
+#   `refresh_rates` management command
+# ==================================================================================================
+
+import argparse
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.logic import refresh_rates_snapshot
+from api.schedules import RefreshSchedule
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Exchange rates snapshot refresher (worker process)."""
+
+    help = 'Periodically fetch the exchange rates and publish them as a snapshot on the cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Refresh the snapshot a single time and exit.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=settings.EXCHANGE_RATES_REFRESH_INTERVAL,
+            help='Seconds between refreshes (at most, when adaptive).',
+        )
+        parser.add_argument(
+            '--adaptive',
+            action=argparse.BooleanOptionalAction,
+            default=settings.EXCHANGE_RATES_REFRESH_ADAPTIVE,
+            help='Adapt the interval to the external API update cadence.',
+        )
+
+    def handle(self, *args, **options):
+        # The volatile currencies rates must not become stale between refreshes
+        interval = min(
+            [options['interval'], *settings.EXCHANGE_RATES_VOLATILE_CACHE_TIMEOUTS.values()])
+        schedule = RefreshSchedule(
+            min_interval=settings.EXCHANGE_RATES_REFRESH_MIN_INTERVAL,
+            max_interval=interval,
+        )
+
+        while True:
+            try:
+                refresh_status = refresh_rates_snapshot()
+            except Exception as err:
+                if options['once']:
+                    raise
+                # Unexpected failures (e.g. the cache is down) don't stop the refresher
+                logger.exception('Refresh failed.')
+                self.stderr.write(f'Refresh failed [{type(err).__name__}]: {err}')
+                time.sleep(interval)
+                continue
+
+            if refresh_status.error:
+                message = f'Refresh failed [{refresh_status.status}]: {refresh_status.data}'
+                if options['once']:
+                    raise CommandError(message)
+                self.stderr.write(message)
+            else:
+                snapshot = refresh_status.data['snapshot']
+                schedule.observe(last_update=snapshot.last_update)
+                action = 'Renewed' if refresh_status.status == 'not_modified' else 'Published'
+                self.stdout.write(
+                    f'{action} snapshot v{snapshot.version} (last update {snapshot.last_update}).'
+                )
+
+            if options['once']:
+                return
+            time.sleep(schedule.next_delay() if options['adaptive'] else interval)
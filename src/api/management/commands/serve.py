@@ -0,0 +1,95 @@
+# ==================================================================================================
+#   `serve` management command
+# ==================================================================================================
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from gunicorn.app.base import BaseApplication
+
+from api.logic import warm_up
+
+
+WSGI_WORKER_CLASS = 'gthread'
+ASGI_WORKER_CLASS = 'uvicorn.workers.UvicornWorker'
+
+
+def post_worker_init(worker) -> None:
+    """Warm up each worker (including recycled ones) before it accepts requests."""
+    warm_up_status = warm_up()
+    if warm_up_status.error:
+        worker.log.warning(f'Worker warm up failed [{warm_up_status.status}]: {warm_up_status.data}')
+    else:
+        snapshot = warm_up_status.data['snapshot']
+        worker.log.info(f'Worker warmed up with snapshot v{snapshot.version}.')
+    connections.close_all()
+
+
+class ServeApplication(BaseApplication):
+    """Gunicorn application serving the (preloaded) Django application."""
+
+    def __init__(self, options: dict, asgi: bool) -> None:
+        self.options = options
+        self.asgi = asgi
+        super().__init__()
+
+    def load_config(self) -> None:
+        for name, value in self.options.items():
+            self.cfg.set(name, value)
+
+    def load(self):
+        if self.asgi:
+            from data_stone.asgi import application
+        else:
+            from data_stone.wsgi import application
+        return application
+
+
+class Command(BaseCommand):
+    """Production server (preforking gunicorn master and workers)."""
+
+    help = 'Serve the application with multiple warmed up worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bind', default=settings.SERVER_BIND, help='Address to listen on.')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.SERVER_WORKERS,
+            help='Worker processes.',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=settings.SERVER_THREADS,
+            help='Threads per worker process (WSGI).',
+        )
+        parser.add_argument(
+            '--asgi',
+            action='store_true',
+            default=settings.SERVER_ASGI,
+            help='Serve the ASGI application (uvicorn workers).',
+        )
+        parser.add_argument(
+            '--max-requests',
+            type=int,
+            default=settings.SERVER_MAX_REQUESTS,
+            help='Requests served by a worker before it is recycled (0 to disable).',
+        )
+
+    def handle(self, *args, **options):
+        ServeApplication(
+            options={
+                'bind': options['bind'],
+                'workers': options['workers'],
+                'threads': options['threads'],
+                'worker_class': ASGI_WORKER_CLASS if options['asgi'] else WSGI_WORKER_CLASS,
+                'preload_app': True,
+                'max_requests': options['max_requests'],
+                'max_requests_jitter': settings.SERVER_MAX_REQUESTS_JITTER,
+                'timeout': settings.SERVER_TIMEOUT,
+                'post_worker_init': post_worker_init,
+                'accesslog': '-',
+            },
+            asgi=options['asgi'],
+        ).run()
@@ -0,0 +1,295 @@
+# ==================================================================================================
+#   `api` metrics
+# ==================================================================================================
+
+import bisect
+import functools
+import inspect
+import threading
+import time
+from typing import Callable, Iterator
+
+from redis.exceptions import RedisError
+
+from .snapshots import get_snapshot
+
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames: tuple[str, ...], labelvalues: tuple[str, ...], **extra) -> str:
+    """Prometheus text labels (`{name="value",...}`, empty without labels)."""
+    labels = [*zip(labelnames, labelvalues), *extra.items()]
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+
+def _format_value(value: float) -> str:
+    """Prometheus text sample value."""
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+# --------------------------------------------------------------------------------------------------
+#   Metrics
+# --------------------------------------------------------------------------------------------------
+class Metric:
+    """Base metric (process-local, thread-safe), with optional labels."""
+    type = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _labelvalues(self, labels: dict[str, str]) -> tuple[str, ...]:
+        """Labels values, in `labelnames` order."""
+        return tuple(map(labels.__getitem__, self.labelnames))
+
+    def samples(self) -> Iterator[str]:
+        """Prometheus text samples."""
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        """Reset the metric values."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Prometheus text exposition of the metric."""
+        return '\n'.join([
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+            *self.samples(),
+        ])
+
+
+class Counter(Metric):
+    """Monotonically increasing counter."""
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name=name, documentation=documentation, labelnames=labelnames)
+        self.clear()
+
+    def clear(self) -> None:
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Increment the counter of the `labels` values."""
+        labelvalues = self._labelvalues(labels=labels)
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, **labels) -> float:
+        """Current value of the `labels` values counter."""
+        return self._values.get(self._labelvalues(labels=labels), 0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for labelvalues, value in values:
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f'{self.name}{labels} {_format_value(value)}'
+
+
+class _HistogramTimer:
+    """Time a block (context manager) or function calls (decorator) on a histogram."""
+
+    def __init__(self, histogram: 'Histogram', labels: dict[str, str]) -> None:
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+    def __call__(self, function: Callable) -> Callable:
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_timed(*args, **kwargs):
+                with _HistogramTimer(histogram=self.histogram, labels=self.labels):
+                    return await function(*args, **kwargs)
+            return async_timed
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            with _HistogramTimer(histogram=self.histogram, labels=self.labels):
+                return function(*args, **kwargs)
+        return timed
+
+
+class Histogram(Metric):
+    """Distribution of observed values (e.g. durations in seconds) in cumulative buckets."""
+    type = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name=name, documentation=documentation, labelnames=labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.clear()
+
+    def clear(self) -> None:
+        # Per labels values: observations count per bucket (plus `+Inf`) and their sum
+        self._counts: dict[tuple[str, ...], list[int]] = {}
+        self._sums: dict[tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        """Observe a value of the `labels` values distribution."""
+        labelvalues = self._labelvalues(labels=labels)
+        bucket_index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(labelvalues)
+            if counts is None:
+                counts = self._counts[labelvalues] = [0] * (len(self.buckets) + 1)
+            counts[bucket_index] += 1
+            self._sums[labelvalues] = self._sums.get(labelvalues, 0.0) + value
+
+    def time(self, **labels) -> _HistogramTimer:
+        """Observe the duration of a block or of the decorated function calls."""
+        return _HistogramTimer(histogram=self, labels=labels)
+
+    def count(self, **labels) -> int:
+        """Observations count of the `labels` values."""
+        return sum(self._counts.get(self._labelvalues(labels=labels), []))
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            series = sorted(
+                (labelvalues, list(counts), self._sums[labelvalues])
+                for labelvalues, counts in self._counts.items()
+            )
+        for labelvalues, counts, total in series:
+            cumulative_count = 0
+            for bucket, count in zip((*self.buckets, float('inf')), counts):
+                cumulative_count += count
+                labels = _format_labels(self.labelnames, labelvalues, le=_format_value(bucket))
+                yield f'{self.name}_bucket{labels} {cumulative_count}'
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f'{self.name}_sum{labels} {_format_value(total)}'
+            yield f'{self.name}_count{labels} {cumulative_count}'
+
+
+class Gauge(Metric):
+    """Value computed by `function` at collection time (not exported while it's `None`)."""
+    type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, function: Callable[[], float | None]) -> None:
+        super().__init__(name=name, documentation=documentation)
+        self.function = function
+
+    def clear(self) -> None:
+        pass
+
+    def samples(self) -> Iterator[str]:
+        value = self.function()
+        if value is not None:
+            yield f'{self.name} {_format_value(value)}'
+
+
+# --------------------------------------------------------------------------------------------------
+#   Registry
+# --------------------------------------------------------------------------------------------------
+class MetricsRegistry:
+    """Process-local metrics registry, exposed in Prometheus text format (see `views.Metrics`).
+
+    Each process (worker) has its own registry, so the scraped values are of the answering one.
+    """
+
+    def __init__(self) -> None:
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def clear(self) -> None:
+        """Reset all metrics values."""
+        for metric in self.metrics:
+            metric.clear()
+
+    def render(self) -> str:
+        """Prometheus text exposition of all metrics."""
+        return '\n'.join(metric.render() for metric in self.metrics) + '\n'
+
+
+def _rates_snapshot_age() -> float | None:
+    """Age of the published rates snapshot (`None` if there is none or the cache is unavailable)."""
+    try:
+        snapshot = get_snapshot()
+    except RedisError:
+        return None
+    return None if snapshot is None else snapshot.age
+
+
+metrics_registry = MetricsRegistry()
+
+conversion_duration = metrics_registry.register(Histogram(
+    name='api_conversion_duration_seconds',
+    documentation='Conversion requests handling time.',
+    labelnames=('view',),
+))
+upstream_fetch_duration = metrics_registry.register(Histogram(
+    name='api_upstream_fetch_duration_seconds',
+    documentation='External exchange API fetch time (retries included).',
+    labelnames=('provider',),
+))
+upstream_fetches = metrics_registry.register(Counter(
+    name='api_upstream_fetches_total',
+    documentation='External exchange API fetches by provider and status.',
+    labelnames=('provider', 'status'),
+))
+output_statuses = metrics_registry.register(Counter(
+    name='api_output_status_total',
+    documentation='Business logic output statuses.',
+    labelnames=('operation', 'status'),
+))
+cache_requests = metrics_registry.register(Counter(
+    name='api_cache_requests_total',
+    documentation='Cache lookups by result (hit, stale or miss).',
+    labelnames=('cache', 'result'),
+))
+admission_rejections = metrics_registry.register(Counter(
+    name='api_admission_rejections_total',
+    documentation='Requests rejected by the admission control, by reason.',
+    labelnames=('reason',),
+))
+history_write_errors = metrics_registry.register(Counter(
+    name='api_history_write_errors_total',
+    documentation='Published rates snapshots not saved on the history (database errors).',
+))
+rates_snapshot_age = metrics_registry.register(Gauge(
+    name='api_rates_snapshot_age_seconds',
+    documentation='Seconds since the published rates snapshot was fetched.',
+    function=_rates_snapshot_age,
+))
+
+
+def count_status(operation: str) -> Callable:
+    """Count the `OutputStatus.status` returned by the decorated (sync or async) function."""
+    def decorator(function: Callable) -> Callable:
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_counted(*args, **kwargs):
+                output_status = await function(*args, **kwargs)
+                output_statuses.inc(operation=operation, status=output_status.status)
+                return output_status
+            return async_counted
+
+        @functools.wraps(function)
+        def counted(*args, **kwargs):
+            output_status = function(*args, **kwargs)
+            output_statuses.inc(operation=operation, status=output_status.status)
+            return output_status
+        return counted
+    return decorator
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.3 on 2026-10-18 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_populate_initial_currencies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoricalRates',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_update', models.DateTimeField(unique=True)),
+                ('rates', models.JSONField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'historical rates',
+                'get_latest_by': 'last_update',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='currency',
+            options={'verbose_name_plural': 'currencies'},
+        ),
+    ]
@@ -2,6 +2,9 @@ from django.conf import settings
 from django.core.cache import caches
 from django.db import models
 
+from .metrics import cache_requests
+from .namespaces import currencies_namespace
+
 
 CURRENCY_ACRONYMS_SIZE = 3
 CACHE_KEY = 'api_models_concurrency'
@@ -29,12 +32,30 @@ class Currency(models.Model):
     def cached_acronyms_list(cls) -> list[str]:
         """Return a cached list of currencies."""
         cache = caches['default']
-        acronyms_list = cache.get(key=CACHE_KEY)
+        version = currencies_namespace.version()
+        acronyms_list = cache.get(key=CACHE_KEY, version=version)
+        cache_requests.inc(cache='acronyms_list', result='miss' if acronyms_list is None else 'hit')
         if acronyms_list is None:
             acronyms_list = list(cls.objects.values_list('acronym', flat=True))
             cache.set(
                 key=CACHE_KEY,
                 value=acronyms_list,
-                timeout=settings.ACRONYMS_LIST_CACHE_TIMEOUT
+                timeout=settings.ACRONYMS_LIST_CACHE_TIMEOUT,
+                version=version,
             )
         return acronyms_list
+
+
+class HistoricalRates(models.Model):
+    """Exchange rates snapshots history (one row per external API update)."""
+    last_update = models.DateTimeField(unique=True)     # type: ignore[var-annotated]
+    rates = models.JSONField()     # type: ignore[var-annotated]
+    created = models.DateTimeField(auto_now_add=True)     # type: ignore[var-annotated]
+
+    class Meta:
+        verbose_name_plural = 'historical rates'
+        get_latest_by = 'last_update'
+
+    def __str__(self) -> str:
+        """Return object string representation."""
+        return self.last_update.isoformat()
@@ -0,0 +1,121 @@
+# ==================================================================================================
+#   `api` cache namespaces
+# ==================================================================================================
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from django.conf import settings
+from django.core.cache import caches
+from redis.exceptions import RedisError
+
+
+NAMESPACE_VERSION_CACHE_KEY = 'api_cache_namespace_version'
+
+# Namespaces (name -> version) whose data is being warmed on the current thread or task
+_warming_versions: ContextVar[dict[str, int]] = ContextVar('warming_versions', default={})
+
+
+class CacheNamespace:
+    """Cache keys invalidated together (e.g. the rates or the currencies ones).
+
+    The keys are stored with the namespace version (the Django cache key `version`), so a single
+    atomic increment of the version invalidates all of them (they expire on their own). The current
+    version is checked on the cache at most once every `CACHE_NAMESPACE_CHECK_INTERVAL` seconds.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.version_key = f'{NAMESPACE_VERSION_CACHE_KEY}:{name}'
+        self.clear()
+
+    def clear(self) -> None:
+        """Discard the process-local version (it's checked on next access)."""
+        self._version = 1
+        self._checked_at = -float('inf')
+
+    def _should_check(self) -> bool:
+        """Whether it's time to check the current version on the cache."""
+        return time.monotonic() - self._checked_at >= settings.CACHE_NAMESPACE_CHECK_INTERVAL
+
+    def _set_version(self, version: int) -> int:
+        """Replace the process-local version."""
+        self._version = version
+        self._checked_at = time.monotonic()
+        return version
+
+    def _load_version(self) -> int:
+        """Current version on the cache, initializing it if needed."""
+        cache = caches['default']
+        version = cache.get(key=self.version_key)
+        if version is None:
+            cache.add(key=self.version_key, value=1, timeout=None)
+            version = cache.get(key=self.version_key)
+        return version
+
+    async def _aload_version(self) -> int:
+        """Async version of `_load_version()`."""
+        cache = caches['default']
+        version = await cache.aget(key=self.version_key)
+        if version is None:
+            await cache.aadd(key=self.version_key, value=1, timeout=None)
+            version = await cache.aget(key=self.version_key)
+        return version
+
+    def version(self) -> int:
+        """Version of the namespace keys (the next one while they're being warmed)."""
+        warming_version = _warming_versions.get().get(self.name)
+        if warming_version is not None:
+            return warming_version
+        if self._should_check():
+            try:
+                self._set_version(version=self._load_version())
+            except RedisError:
+                # The cache is unavailable, the process-local version is kept until the next check
+                self._checked_at = time.monotonic()
+        return self._version
+
+    async def aversion(self) -> int:
+        """Async version of `version()`."""
+        warming_version = _warming_versions.get().get(self.name)
+        if warming_version is not None:
+            return warming_version
+        if self._should_check():
+            try:
+                self._set_version(version=await self._aload_version())
+            except RedisError:
+                self._checked_at = time.monotonic()
+        return self._version
+
+    def invalidate(self) -> int:
+        """Invalidate the namespace keys of all the workers (publishing a new version)."""
+        cache = caches['default']
+        cache.add(key=self.version_key, value=1, timeout=None)
+        return self._set_version(version=cache.incr(key=self.version_key))
+
+    @contextmanager
+    def warming(self) -> Iterator[int]:
+        """Direct the namespace keys accesses of the current thread (or task) to the next version.
+
+        So its data can be loaded before `invalidate()` makes it the current version.
+        """
+        version = self._load_version() + 1
+        token = _warming_versions.set({**_warming_versions.get(), self.name: version})
+        try:
+            yield version
+        finally:
+            _warming_versions.reset(token)
+
+
+rates_namespace = CacheNamespace(name='rates')
+currencies_namespace = CacheNamespace(name='currencies')
+# No data is stored on the responses namespace, its version is part of the responses validators
+responses_namespace = CacheNamespace(name='responses')
+
+# In invalidation order (the rates are fetched for the available currencies)
+CACHE_NAMESPACES = {
+    namespace.name: namespace
+    for namespace in [currencies_namespace, rates_namespace, responses_namespace]
+}
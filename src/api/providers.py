@@ -0,0 +1,63 @@
+# ==================================================================================================
+#   `api` exchange rates providers
+# ==================================================================================================
+
+import datetime
+from dataclasses import dataclass
+from typing import Any, ClassVar
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+@dataclass
+class Provider:
+    """Exchange rates external API, adapting its payload to the `lastupdate`/`rates` shape.
+
+    The adapted payload is validated afterwards, so unexpected payloads are returned as they are.
+    Without an update time on its payload (`has_update_time`), the fetch time is used instead.
+    """
+    name: str
+    url: str
+
+    has_update_time: ClassVar[bool] = True
+
+    def adapt(self, data: Any) -> Any:
+        """Adapt the decoded payload to the `{'lastupdate': ..., 'rates': {...}}` shape."""
+        return data
+
+
+class MoedaInfoProvider(Provider):
+    """`cdn.moeda.info` API (already in the expected shape, USD based)."""
+
+
+class CoinbaseProvider(Provider):
+    """Coinbase exchange rates API (`/v2/exchange-rates?currency=USD`).
+
+    Its payload has no update time, so the rates are considered updated when fetched (unless
+    they are the ones of the current snapshot, which keeps its update time).
+    """
+
+    has_update_time = False
+
+    def adapt(self, data: Any) -> Any:
+        if not isinstance(data, dict) or not isinstance(data.get('data'), dict):
+            return data
+        return {
+            'lastupdate': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'rates': data['data'].get('rates'),
+        }
+
+
+def get_providers() -> list[Provider]:
+    """Configured providers (`EXCHANGE_RATES_PROVIDERS`), in preference order."""
+    if not settings.EXCHANGE_RATES_PROVIDERS:
+        raise ImproperlyConfigured('At least one exchange rates provider is required.')
+    return [
+        import_string(provider_settings['adapter'])(
+            name=provider_settings['name'],
+            url=provider_settings['url'],
+        )
+        for provider_settings in settings.EXCHANGE_RATES_PROVIDERS
+    ]
@@ -0,0 +1,142 @@
+# ==================================================================================================
+#   `api` currencies registry
+# ==================================================================================================
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Currency
+from .namespaces import currencies_namespace
+
+
+REGISTRY_VERSION_CACHE_KEY = 'api_currency_registry_version'
+
+
+class CurrencyRegistry:
+    """Process-local registry of the available currencies (acronym -> index).
+
+    The currencies are loaded once from database and kept in memory. Changes on `Currency`
+    invalidate the currencies cache namespace (see `api.signals`) and so the version number of the
+    registry on the cache, checked at most once every `CURRENCY_REGISTRY_CHECK_INTERVAL` seconds, so
+    every worker reloads its registry.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        """Discard the loaded currencies (they're reloaded on next access)."""
+        self._version = None
+        self._checked_at = 0.0
+        self._index: dict[str, int] = {}
+        self._acronyms: frozenset[str] = frozenset()
+
+    def _is_outdated(self, version: int | None) -> bool:
+        """Whether the loaded currencies differ from the current version (or weren't loaded)."""
+        return version is None or version != self._version
+
+    def _set_currencies(self, acronyms_list: list[str], version: int | None) -> None:
+        """Replace the loaded currencies."""
+        self._index = {acronym: index for index, acronym in enumerate(acronyms_list)}
+        self._acronyms = frozenset(self._index)
+        self._version = version
+
+    def _should_check(self) -> bool:
+        """Whether it's time to check the current version on the cache."""
+        return time.monotonic() - self._checked_at >= settings.CURRENCY_REGISTRY_CHECK_INTERVAL
+
+    def _refresh(self) -> None:
+        """Reload the currencies if they're outdated."""
+        if not self._should_check():
+            return
+        with self._lock:
+            if not self._should_check():
+                return
+            version = caches['default'].get(
+                key=REGISTRY_VERSION_CACHE_KEY, version=currencies_namespace.version())
+            if self._is_outdated(version=version):
+                self._set_currencies(
+                    acronyms_list=list(
+                        Currency.objects.order_by('id').values_list('acronym', flat=True)),
+                    version=self._current_version(version=version),
+                )
+            self._checked_at = time.monotonic()
+
+    async def _arefresh(self) -> None:
+        """Async version of `_refresh()`."""
+        if not self._should_check():
+            return
+        version = await caches['default'].aget(
+            key=REGISTRY_VERSION_CACHE_KEY, version=await currencies_namespace.aversion())
+        if self._is_outdated(version=version):
+            acronyms_list = [
+                acronym async for acronym in
+                Currency.objects.order_by('id').values_list('acronym', flat=True)
+            ]
+            self._set_currencies(
+                acronyms_list=acronyms_list,
+                version=await self._acurrent_version(version=version),
+            )
+        self._checked_at = time.monotonic()
+
+    @staticmethod
+    def _current_version(version: int | None) -> int:
+        """Current version, initializing it on the cache if needed."""
+        if version is not None:
+            return version
+        cache = caches['default']
+        namespace_version = currencies_namespace.version()
+        cache.add(
+            key=REGISTRY_VERSION_CACHE_KEY,
+            value=time.time_ns(),
+            timeout=None,
+            version=namespace_version,
+        )
+        return cache.get(key=REGISTRY_VERSION_CACHE_KEY, version=namespace_version)
+
+    @staticmethod
+    async def _acurrent_version(version: int | None) -> int:
+        """Async version of `_current_version()`."""
+        if version is not None:
+            return version
+        cache = caches['default']
+        namespace_version = await currencies_namespace.aversion()
+        await cache.aadd(
+            key=REGISTRY_VERSION_CACHE_KEY,
+            value=time.time_ns(),
+            timeout=None,
+            version=namespace_version,
+        )
+        return await cache.aget(key=REGISTRY_VERSION_CACHE_KEY, version=namespace_version)
+
+    def acronyms(self) -> frozenset[str]:
+        """Available currencies acronyms."""
+        self._refresh()
+        return self._acronyms
+
+    def index(self) -> dict[str, int]:
+        """Available currencies acronyms and their (stable) indexes."""
+        self._refresh()
+        return self._index
+
+    async def aindex(self) -> dict[str, int]:
+        """Async version of `index()`."""
+        await self._arefresh()
+        return self._index
+
+    def invalidate(self) -> None:
+        """Invalidate the registry of all the workers (publishing a new version)."""
+        caches['default'].set(
+            key=REGISTRY_VERSION_CACHE_KEY,
+            value=time.time_ns(),
+            timeout=None,
+            version=currencies_namespace.version(),
+        )
+        self.clear()
+
+
+currency_registry = CurrencyRegistry()
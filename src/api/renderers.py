@@ -0,0 +1,63 @@
+# ==================================================================================================
+#   `api` renderers
+# ==================================================================================================
+
+import math
+import re
+
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+
+# Floats `orjson` writes differently of `repr()` (so of `json`), those `repr()` writes with an
+# exponent: `0.00001` and `1e16` instead of `1e-05` and `1e+16` (matches inside strings are false
+# positives, which are just rendered by `JSONRenderer`).
+ORJSON_DIFFERENT_FLOATS = re.compile(rb'\d[eE]|0\.0000')
+
+
+def _has_non_finite(data) -> bool:
+    """Whether the data has non-finite floats (`nan`, `inf`), which `orjson` writes as `null`."""
+    if isinstance(data, float):
+        return not math.isfinite(data)
+    if isinstance(data, dict):
+        return any(_has_non_finite(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(_has_non_finite(value) for value in data)
+    return False
+
+
+class ORJSONRenderer(JSONRenderer):
+    """`JSONRenderer` using `orjson` for the compact (default) output, with the same output bytes.
+
+    Types `orjson` doesn't handle the same way (datetimes, decimals, lazy strings, ...) go through
+    the DRF encoder. Indented output (and non-default `UNICODE_JSON`/`COMPACT_JSON` settings), very
+    small or large floats (formatted differently by `orjson`) and non-finite floats (rejected by
+    `JSONRenderer`) use the `JSONRenderer` itself.
+    """
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(
+                data=data,
+                accepted_media_type=accepted_media_type,
+                renderer_context=renderer_context,
+            )
+
+        ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        if ORJSON_DIFFERENT_FLOATS.search(ret) or (b'null' in ret and _has_non_finite(data)):
+            return super().render(
+                data=data,
+                accepted_media_type=accepted_media_type,
+                renderer_context=renderer_context,
+            )
+
+        # Same JavaScript-safe escaping of `JSONRenderer`
+        if b'\xe2\x80' in ret:
+            ret = ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+        return ret
@@ -0,0 +1,47 @@
+# ==================================================================================================
+#   `api` exchange rates refresh schedule
+# ==================================================================================================
+
+import datetime
+import statistics
+import time
+from collections import deque
+from itertools import pairwise
+
+
+class RefreshSchedule:
+    """Snapshot refresh schedule adapted to the external API update cadence.
+
+    The cadence is learned from the intervals between the (distinct) last updates of the published
+    rates, and the next refresh is scheduled right after the expected next update, within
+    `min_interval` and `max_interval`. Overdue updates are checked every `min_interval` (which is
+    cheap with conditional requests).
+    """
+
+    def __init__(self, min_interval: float, max_interval: float, history_size: int = 8) -> None:
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.updates: deque[float] = deque(maxlen=history_size)
+
+    def observe(self, last_update: str) -> None:
+        """Observe the last update (ISO 8601) of the published rates."""
+        timestamp = datetime.datetime.fromisoformat(last_update).timestamp()
+        if not self.updates or timestamp > self.updates[-1]:
+            self.updates.append(timestamp)
+
+    @property
+    def cadence(self) -> float | None:
+        """Learned update interval (median of the observed ones, `None` before two updates)."""
+        if len(self.updates) < 2:
+            return None
+        return statistics.median(after - before for before, after in pairwise(self.updates))
+
+    def next_delay(self, now: float | None = None) -> float:
+        """Seconds until the next refresh."""
+        cadence = self.cadence
+        if cadence is None:
+            return self.max_interval
+
+        now = time.time() if now is None else now
+        delay = self.updates[-1] + cadence - now
+        return min(max(delay, self.min_interval), self.max_interval)
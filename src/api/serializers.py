@@ -2,6 +2,8 @@
 #   `api` serializers
 # ==================================================================================================
 
+from typing import Any, Iterable
+
 from rest_framework import serializers as srlz
 
 # --------------------------------------------------------------------------------------------------
@@ -19,3 +21,91 @@ class ExchangeApiInputSerializer(srlz.Serializer):
     """External exchange API input validation."""
     lastupdate = srlz.DateTimeField(input_formats=['iso-8601'])
     rates = srlz.DictField(child=srlz.FloatField(validators=[greater_than_zero_validator]))
+
+# --------------------------------------------------------------------------------------------------
+#   Input validators
+# --------------------------------------------------------------------------------------------------
+class ExchangeApiInputValidator:
+    """Lightweight external exchange API input validation (same errors of the serializer).
+
+    Only the rates of `currencies` are validated and kept (in `currencies` order), so the rates
+    of untracked currencies are skipped instead of going through a DRF field each.
+    """
+    lastupdate_field = srlz.DateTimeField(input_formats=['iso-8601'])
+    rate_field = srlz.FloatField()
+
+    def __init__(self, data: Any, currencies: Iterable[str]) -> None:
+        self.initial_data = data
+        self.currencies = currencies
+        self.errors: dict = {}
+        self.validated_data: dict = {}
+
+    def _validate_lastupdate(self) -> None:
+        try:
+            self.validated_data['lastupdate'] = self.lastupdate_field.run_validation(
+                self.initial_data.get('lastupdate', srlz.empty))
+        except srlz.ValidationError as err:
+            self.errors['lastupdate'] = err.detail
+
+    def _error_message(self, key: str) -> str:
+        return str(self.rate_field.error_messages[key])
+
+    def _validate_rate(self, value: Any) -> tuple[float | None, str | None]:
+        """Validated rate and its error message (if invalid)."""
+        if value is None:
+            return None, self._error_message(key='null')
+        if isinstance(value, str) and len(value) > self.rate_field.MAX_STRING_LENGTH:
+            return None, self._error_message(key='max_string_length')
+        try:
+            rate = float(value)
+        except (TypeError, ValueError):
+            return None, self._error_message(key='invalid')
+        except OverflowError:
+            return None, self._error_message(key='overflow')
+        if rate <= 0:
+            return None, 'Invalid rate: must be > 0.0'
+        return rate, None
+
+    def _validate_rates(self) -> None:
+        rates = self.initial_data.get('rates', srlz.empty)
+        if rates is srlz.empty:
+            self.errors['rates'] = [self._error_message(key='required')]
+            return
+        if rates is None:
+            self.errors['rates'] = [self._error_message(key='null')]
+            return
+        if not isinstance(rates, dict):
+            self.errors['rates'] = [
+                f'Expected a dictionary of items but got type "{type(rates).__name__}".']
+            return
+
+        validated_rates = {}
+        rates_errors = {}
+        for currency_name in self.currencies:
+            if currency_name not in rates:
+                continue
+            rate, error = self._validate_rate(value=rates[currency_name])
+            if error is None:
+                validated_rates[currency_name] = rate
+            else:
+                rates_errors[currency_name] = [error]
+
+        if rates_errors:
+            self.errors['rates'] = rates_errors
+        else:
+            self.validated_data['rates'] = validated_rates
+
+    def is_valid(self) -> bool:
+        """Validate the input data (errors on `errors`, validated data on `validated_data`)."""
+        if not isinstance(self.initial_data, dict):
+            self.errors['non_field_errors'] = [
+                'Invalid data. Expected a dictionary, but got '
+                f'{type(self.initial_data).__name__}.'
+            ]
+            return False
+
+        self._validate_lastupdate()
+        self._validate_rates()
+        if self.errors:
+            self.validated_data = {}
+        return not self.errors
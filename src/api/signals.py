@@ -0,0 +1,17 @@
+# ==================================================================================================
+#   `api` signals
+# ==================================================================================================
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Currency
+from .namespaces import currencies_namespace
+from .registry import currency_registry
+
+
+@receiver([post_save, post_delete], sender=Currency)
+def invalidate_currencies(sender, **kwargs) -> None:
+    """Invalidate the cached currencies of all workers when they change."""
+    currencies_namespace.invalidate()
+    currency_registry.clear()
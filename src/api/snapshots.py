@@ -0,0 +1,418 @@
+# ==================================================================================================
+#   `api` exchange rates snapshots
+# ==================================================================================================
+
+import mmap
+import os
+import struct
+import tempfile
+import time
+from dataclasses import dataclass, field, replace
+from functools import cached_property
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+import orjson
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from .namespaces import rates_namespace
+
+
+# Cached snapshot binary format version (see `encode_snapshot()`), part of the cache key, so the
+# workers of releases with different formats sharing the cache don't read each other snapshots.
+SNAPSHOT_FORMAT_VERSION = 1
+
+SNAPSHOT_CACHE_KEY = f'api_rates_snapshot_f{SNAPSHOT_FORMAT_VERSION}'
+SNAPSHOT_VERSION_CACHE_KEY = 'api_rates_snapshot_version'
+
+
+# --------------------------------------------------------------------------------------------------
+#   Snapshot
+# --------------------------------------------------------------------------------------------------
+@dataclass
+class RatesSnapshot:
+    """Validated exchange rates published to the cache.
+
+    Besides the rates, the snapshot has the cross rates matrix of its currencies (in the `rates`
+    order), packed as float64 bytes: `matrix[from, to]` is the value of one `from` unit in `to`,
+    and the provider response validators (`ETag`/`Last-Modified`), for conditional refreshes.
+    """
+    version: int
+    last_update: str
+    rates: dict[str, float]
+    fetched_at: float
+    cross_rates: bytes
+    provider: str = ''
+    validators: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def age(self) -> float:
+        """Seconds elapsed since the rates were fetched from the external API."""
+        return time.time() - self.fetched_at
+
+    @property
+    def is_stale(self) -> bool:
+        """Whether the snapshot is older than the exchange rates cache retention time."""
+        return self.is_stale_for()
+
+    def timeout(self, currency_names: Iterable[str] = ()) -> float:
+        """Retention time of the rates of `currency_names` (shorter for the volatile ones)."""
+        volatile_timeouts = settings.EXCHANGE_RATES_VOLATILE_CACHE_TIMEOUTS
+        return min([
+            settings.EXCHANGE_RATES_CACHE_TIMEOUT,
+            *(volatile_timeouts[name] for name in currency_names if name in volatile_timeouts),
+        ])
+
+    def is_stale_for(self, currency_names: Iterable[str] = ()) -> bool:
+        """Whether the snapshot is older than the retention time of the `currency_names` rates."""
+        return self.age > self.timeout(currency_names=currency_names)
+
+    @cached_property
+    def currencies(self) -> list[str]:
+        """Snapshot currencies, in the cross rates matrix order."""
+        return list(self.rates)
+
+    @cached_property
+    def currency_index(self) -> dict[str, int]:
+        """Cross rates matrix index of each currency."""
+        return {currency_name: index for index, currency_name in enumerate(self.currencies)}
+
+    @cached_property
+    def cross_rates_matrix(self) -> np.ndarray:
+        """Cross rates matrix (read-only view over `cross_rates`)."""
+        currencies_count = len(self.currencies)
+        return np.frombuffer(self.cross_rates, dtype=np.float64).reshape(
+            currencies_count, currencies_count)
+
+    def cross_rate(self, from_currency_name: str, to_currency_name: str) -> float:
+        """Value of one `from_currency_name` unit in `to_currency_name`."""
+        return float(
+            self.cross_rates_matrix[
+                self.currency_index[from_currency_name],
+                self.currency_index[to_currency_name],
+            ]
+        )
+
+
+def _cross_rates(rates_array: np.ndarray) -> bytes:
+    """Compute the (packed) cross rates matrix of the rates array."""
+    return (rates_array[np.newaxis, :] / rates_array[:, np.newaxis]).tobytes()
+
+
+def build_cross_rates(rates: dict[str, float]) -> bytes:
+    """Compute the (packed) cross rates matrix of all the rates pairs."""
+    return _cross_rates(
+        rates_array=np.fromiter(rates.values(), dtype=np.float64, count=len(rates)))
+
+
+def _new_snapshot(
+    version: int,
+    last_update: str,
+    rates: dict[str, float],
+    provider: str,
+    validators: dict[str, str] | None,
+) -> RatesSnapshot:
+    """Create a snapshot, computing its cross rates."""
+    return RatesSnapshot(
+        version=version,
+        last_update=last_update,
+        rates=rates,
+        fetched_at=time.time(),
+        cross_rates=build_cross_rates(rates=rates),
+        provider=provider,
+        validators=validators or {},
+    )
+
+
+# --------------------------------------------------------------------------------------------------
+#   Binary format
+# --------------------------------------------------------------------------------------------------
+# Header: magic, format version, snapshot version, fetch time, currencies count and metadata size.
+# It's followed by the JSON metadata (last update, provider, validators and the ordered currencies)
+# padded to 8 bytes and the rates (float64 array). The cross rates matrix isn't stored, since it's
+# computed from the rates by each process once per snapshot (see `decode_snapshot()`).
+SNAPSHOT_MAGIC = b'RSNP'
+SNAPSHOT_HEADER = struct.Struct('<4sH2xqdII')
+FLOAT64_SIZE = 8
+
+# Last snapshot decoded by the process (reused while the cached snapshot is the same).
+_decoded_snapshot: RatesSnapshot | None = None
+
+
+def encode_snapshot(snapshot: RatesSnapshot) -> bytes:
+    """Encode the snapshot in the (versioned) binary format."""
+    metadata = orjson.dumps({
+        'last_update': snapshot.last_update,
+        'provider': snapshot.provider,
+        'validators': snapshot.validators,
+        'currencies': snapshot.currencies,
+    })
+    currencies_count = len(snapshot.currencies)
+    rates_array = np.fromiter(snapshot.rates.values(), dtype=np.float64, count=currencies_count)
+    return b''.join([
+        SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC,
+            SNAPSHOT_FORMAT_VERSION,
+            snapshot.version,
+            snapshot.fetched_at,
+            currencies_count,
+            len(metadata),
+        ),
+        metadata,
+        bytes(-len(metadata) % FLOAT64_SIZE),
+        rates_array.tobytes(),
+    ])
+
+
+def decode_snapshot(data: bytes | mmap.mmap | None) -> RatesSnapshot | None:
+    """Decode a binary snapshot (`None` for missing, corrupted or other format versions).
+
+    Only the header is decoded while the snapshot (version and fetch time) is the one decoded last
+    by the process, which is returned with its already computed cross rates and index.
+    """
+    global _decoded_snapshot
+
+    if not isinstance(data, (bytes, mmap.mmap)) or len(data) < SNAPSHOT_HEADER.size:
+        return None
+    magic, format_version, version, fetched_at, currencies_count, metadata_size = (
+        SNAPSHOT_HEADER.unpack_from(data))
+    if magic != SNAPSHOT_MAGIC or format_version != SNAPSHOT_FORMAT_VERSION:
+        return None
+
+    metadata_end = SNAPSHOT_HEADER.size + metadata_size
+    rates_offset = metadata_end + (-metadata_size % FLOAT64_SIZE)
+    if len(data) != rates_offset + currencies_count * FLOAT64_SIZE:
+        return None
+
+    snapshot = _decoded_snapshot
+    if snapshot is not None and snapshot.version == version and snapshot.fetched_at == fetched_at:
+        return snapshot
+
+    metadata = orjson.loads(memoryview(data)[SNAPSHOT_HEADER.size:metadata_end])
+    rates_array = np.frombuffer(
+        data, dtype=np.float64, count=currencies_count, offset=rates_offset)
+    snapshot = _decoded_snapshot = RatesSnapshot(
+        version=version,
+        last_update=metadata['last_update'],
+        rates=dict(zip(metadata['currencies'], rates_array.tolist())),
+        fetched_at=fetched_at,
+        cross_rates=_cross_rates(rates_array=rates_array),
+        provider=metadata['provider'],
+        validators=metadata['validators'],
+    )
+    return snapshot
+
+
+# --------------------------------------------------------------------------------------------------
+#   Cache storage
+# --------------------------------------------------------------------------------------------------
+def get_snapshot() -> RatesSnapshot | None:
+    """Return the currently published snapshot (`None` if there is none)."""
+    return decode_snapshot(
+        data=caches['default'].get(key=SNAPSHOT_CACHE_KEY, version=rates_namespace.version()))
+
+
+async def aget_snapshot() -> RatesSnapshot | None:
+    """Async version of `get_snapshot()`."""
+    return decode_snapshot(data=await caches['default'].aget(
+        key=SNAPSHOT_CACHE_KEY, version=await rates_namespace.aversion()))
+
+
+def publish_snapshot(
+    last_update: str,
+    rates: dict[str, float],
+    provider: str = '',
+    validators: dict[str, str] | None = None,
+) -> RatesSnapshot:
+    """Publish a new snapshot version replacing the current one."""
+    cache = caches['default']
+    cache.add(key=SNAPSHOT_VERSION_CACHE_KEY, value=0, timeout=None)
+    version = cache.incr(key=SNAPSHOT_VERSION_CACHE_KEY)
+
+    snapshot = _new_snapshot(
+        version=version,
+        last_update=last_update,
+        rates=rates,
+        provider=provider,
+        validators=validators,
+    )
+    cache.set(
+        key=SNAPSHOT_CACHE_KEY,
+        value=encode_snapshot(snapshot=snapshot),
+        timeout=settings.EXCHANGE_RATES_SNAPSHOT_RETENTION,
+        version=rates_namespace.version(),
+    )
+    return snapshot
+
+
+async def apublish_snapshot(
+    last_update: str,
+    rates: dict[str, float],
+    provider: str = '',
+    validators: dict[str, str] | None = None,
+) -> RatesSnapshot:
+    """Async version of `publish_snapshot()`."""
+    cache = caches['default']
+    await cache.aadd(key=SNAPSHOT_VERSION_CACHE_KEY, value=0, timeout=None)
+    version = await cache.aincr(key=SNAPSHOT_VERSION_CACHE_KEY)
+
+    snapshot = _new_snapshot(
+        version=version,
+        last_update=last_update,
+        rates=rates,
+        provider=provider,
+        validators=validators,
+    )
+    await cache.aset(
+        key=SNAPSHOT_CACHE_KEY,
+        value=encode_snapshot(snapshot=snapshot),
+        timeout=settings.EXCHANGE_RATES_SNAPSHOT_RETENTION,
+        version=await rates_namespace.aversion(),
+    )
+    return snapshot
+
+
+def _renewed_snapshot(
+    snapshot: RatesSnapshot,
+    provider: str,
+    validators: dict[str, str],
+) -> RatesSnapshot:
+    """Copy of the snapshot fetched now (same version and rates) from `provider`."""
+    if provider == snapshot.provider:
+        validators = {**snapshot.validators, **validators}
+    return replace(snapshot, fetched_at=time.time(), provider=provider, validators=validators)
+
+
+def renew_snapshot(
+    snapshot: RatesSnapshot,
+    provider: str,
+    validators: dict[str, str],
+) -> RatesSnapshot:
+    """Republish the snapshot as fetched now (its rates were confirmed by `provider`).
+
+    The version is kept, since the rates (and the responses computed with them) are the same.
+    """
+    renewed_snapshot = _renewed_snapshot(
+        snapshot=snapshot, provider=provider, validators=validators)
+    caches['default'].set(
+        key=SNAPSHOT_CACHE_KEY,
+        value=encode_snapshot(snapshot=renewed_snapshot),
+        timeout=settings.EXCHANGE_RATES_SNAPSHOT_RETENTION,
+        version=rates_namespace.version(),
+    )
+    return renewed_snapshot
+
+
+async def arenew_snapshot(
+    snapshot: RatesSnapshot,
+    provider: str,
+    validators: dict[str, str],
+) -> RatesSnapshot:
+    """Async version of `renew_snapshot()`."""
+    renewed_snapshot = _renewed_snapshot(
+        snapshot=snapshot, provider=provider, validators=validators)
+    await caches['default'].aset(
+        key=SNAPSHOT_CACHE_KEY,
+        value=encode_snapshot(snapshot=renewed_snapshot),
+        timeout=settings.EXCHANGE_RATES_SNAPSHOT_RETENTION,
+        version=await rates_namespace.aversion(),
+    )
+    return renewed_snapshot
+
+
+# --------------------------------------------------------------------------------------------------
+#   Disk storage (last known good snapshot)
+# --------------------------------------------------------------------------------------------------
+# Last known good snapshot loaded by the process and the file status it was loaded from.
+_last_known_good: tuple[tuple, RatesSnapshot | None] | None = None
+
+
+def _last_known_good_path() -> Path | None:
+    """Last known good snapshot file (`None` if disabled)."""
+    path = settings.EXCHANGE_RATES_LAST_KNOWN_GOOD_FILE
+    return Path(path) if path else None
+
+
+def save_last_known_good(snapshot: RatesSnapshot) -> bool:
+    """Save the snapshot (binary format) as the last known good one, replacing it atomically.
+
+    The file is written aside, synced and renamed over the previous one, so it's never read
+    partially written, even after a crash. Returns whether the snapshot was saved.
+    """
+    path = _last_known_good_path()
+    if path is None:
+        return False
+
+    temp_path = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=f'.{path.name}.', delete=False) as file:
+            temp_path = file.name
+            # Readable by the other processes (temporary files are private)
+            os.fchmod(file.fileno(), 0o644)
+            file.write(encode_snapshot(snapshot=snapshot))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except OSError:
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+    return True
+
+
+async def asave_last_known_good(snapshot: RatesSnapshot) -> bool:
+    """Async version of `save_last_known_good()`."""
+    return await sync_to_async(save_last_known_good)(snapshot=snapshot)
+
+
+def discard_last_known_good() -> bool:
+    """Remove the last known good snapshot (e.g. its rates were invalidated).
+
+    Returns whether there is no last known good snapshot anymore.
+    """
+    path = _last_known_good_path()
+    if path is None:
+        return True
+
+    try:
+        path.unlink(missing_ok=True)
+    except OSError:
+        return False
+    return True
+
+
+def load_last_known_good() -> RatesSnapshot | None:
+    """Return the last known good snapshot (`None` if there is none or it's unreadable).
+
+    The file is memory mapped and decoded once per change, otherwise it's just checked (`stat`).
+    """
+    global _last_known_good
+
+    path = _last_known_good_path()
+    if path is None:
+        return None
+
+    try:
+        with open(path, 'rb') as file:
+            file_status = os.fstat(file.fileno())
+            file_key = (str(path), file_status.st_ino, file_status.st_mtime_ns, file_status.st_size)
+            if _last_known_good is not None and _last_known_good[0] == file_key:
+                return _last_known_good[1]
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                snapshot = decode_snapshot(data=data)
+    except (OSError, ValueError):
+        # Missing or empty (can't be mapped) file
+        return None
+
+    _last_known_good = (file_key, snapshot)
+    return snapshot
+
+
+async def aload_last_known_good() -> RatesSnapshot | None:
+    """Async version of `load_last_known_good()`."""
+    return await sync_to_async(load_last_known_good)()
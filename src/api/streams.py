@@ -0,0 +1,191 @@
+# ==================================================================================================
+#   `api` live rates streams (Server-Sent Events)
+# ==================================================================================================
+
+import asyncio
+import contextlib
+import logging
+import weakref
+from typing import AsyncIterator
+
+import orjson
+from django.conf import settings
+from django.core.cache import caches
+
+from .logic import aget_rates_snapshot
+from .snapshots import SNAPSHOT_VERSION_CACHE_KEY, RatesSnapshot
+
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------------------------------------------------------
+#   Broadcaster
+# --------------------------------------------------------------------------------------------------
+class RatesBroadcaster:
+    """Fan-out of the published snapshots to the streams of an event loop.
+
+    A single task (running while there are subscribers) checks the snapshot version on the cache
+    every `RATES_STREAM_POLL_INTERVAL` seconds and wakes all the streams through a shared event,
+    so an idle stream costs only a suspended coroutine, whatever the number of connections.
+    """
+
+    def __init__(self) -> None:
+        self.snapshot: RatesSnapshot | None = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def _publish(self, snapshot: RatesSnapshot) -> None:
+        """Make `snapshot` the current one and wake the subscribers."""
+        self.snapshot = snapshot
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def _check(self) -> None:
+        """Publish the current snapshot if it changed."""
+        current_version = await caches['default'].aget(key=SNAPSHOT_VERSION_CACHE_KEY)
+        # Stale snapshots are also looked up, so they are refreshed (in background), and the
+        # snapshots being warmed (see `CacheNamespace.warming()`) until they're published
+        if (
+            self.snapshot is None
+            or self.snapshot.version != current_version
+            or self.snapshot.is_stale
+        ):
+            snapshot_status = await aget_rates_snapshot()
+            snapshot = snapshot_status.data.get('snapshot')
+            if not snapshot_status.error and snapshot != self.snapshot:
+                self._publish(snapshot=snapshot)
+
+    async def _poll(self) -> None:
+        """Follow the published snapshot while there are subscribers.
+
+        A failed check (e.g. the cache is unavailable) is retried on the next poll, so the streams
+        resume once it's available again.
+        """
+        try:
+            while self.subscribers:
+                try:
+                    await self._check()
+                except Exception:
+                    logger.exception('Rates stream poll failed.')
+                await asyncio.sleep(settings.RATES_STREAM_POLL_INTERVAL)
+        finally:
+            self._task = None
+
+    async def subscribe(self) -> AsyncIterator[RatesSnapshot | None]:
+        """Yield the current snapshot and then each new one (`None` on keep-alive timeouts).
+
+        Slow subscribers skip the intermediate snapshots and receive only the latest one.
+        """
+        self.subscribers += 1
+        if self._task is None:
+            # Not followed since the last subscriber left, so it may be outdated
+            self.snapshot = None
+            self._task = asyncio.create_task(self._poll())
+
+        try:
+            sent_snapshot = None
+            while True:
+                changed = self._changed
+                if self.snapshot is not None and self.snapshot is not sent_snapshot:
+                    sent_snapshot = self.snapshot
+                    yield sent_snapshot
+                    continue
+                try:
+                    await asyncio.wait_for(
+                        changed.wait(), timeout=settings.RATES_STREAM_KEEPALIVE_INTERVAL)
+                except TimeoutError:
+                    yield None
+        finally:
+            self.subscribers -= 1
+
+
+_broadcasters: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, RatesBroadcaster] = (
+    weakref.WeakKeyDictionary())
+
+
+def get_rates_broadcaster() -> RatesBroadcaster:
+    """Rates broadcaster of the running event loop."""
+    loop = asyncio.get_running_loop()
+    broadcaster = _broadcasters.get(loop)
+    if broadcaster is None:
+        broadcaster = _broadcasters[loop] = RatesBroadcaster()
+    return broadcaster
+
+
+# --------------------------------------------------------------------------------------------------
+#   Events
+# --------------------------------------------------------------------------------------------------
+def format_event(event: str, data: dict, event_id: int | None = None) -> bytes:
+    """Server-Sent Event with JSON `data`."""
+    event_id_field = b'' if event_id is None else f'id: {event_id}\n'.encode()
+    return (
+        event_id_field + f'event: {event}\n'.encode() + b'data: ' + orjson.dumps(data) + b'\n\n')
+
+
+KEEPALIVE_EVENT = b': keep-alive\n\n'
+
+
+def snapshot_rates(
+    snapshot: RatesSnapshot,
+    currencies: list[str] | None = None,
+    base: str | None = None,
+) -> dict[str, float]:
+    """Snapshot rates (of `currencies` only, in `base` currency units) streamed to a client."""
+    if base is None:
+        rates = snapshot.rates
+    elif base in snapshot.currency_index:
+        row = snapshot.cross_rates_matrix[snapshot.currency_index[base]].tolist()
+        rates = dict(zip(snapshot.currencies, row))
+    else:
+        rates = {}
+
+    if currencies is None:
+        return rates
+    return {
+        currency_name: rates[currency_name]
+        for currency_name in currencies
+        if currency_name in rates
+    }
+
+
+async def stream_rates(
+    currencies: list[str] | None = None,
+    base: str | None = None,
+) -> AsyncIterator[bytes]:
+    """Stream the rates as Server-Sent Events.
+
+    The first event (`snapshot`) has all the rates, the next ones (`delta`) only the rates changed
+    since the previous event, and comments are sent while idle to keep the connection open.
+    """
+    sent_rates = None
+    # Closed with the stream (e.g. when the client disconnects), unsubscribing it
+    async with contextlib.aclosing(get_rates_broadcaster().subscribe()) as snapshots:
+        async for snapshot in snapshots:
+            if snapshot is None:
+                yield KEEPALIVE_EVENT
+                continue
+
+            rates = snapshot_rates(snapshot=snapshot, currencies=currencies, base=base)
+            if sent_rates is None:
+                event = 'snapshot'
+                event_rates = rates
+            else:
+                event = 'delta'
+                event_rates = {
+                    currency_name: rate for currency_name, rate in rates.items()
+                    if sent_rates.get(currency_name) != rate
+                }
+                if not event_rates:
+                    continue
+            sent_rates = rates
+
+            yield format_event(
+                event=event,
+                data={
+                    'version': snapshot.version,
+                    'last_update': snapshot.last_update,
+                    'rates': event_rates,
+                },
+                event_id=snapshot.version,
+            )
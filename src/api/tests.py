@@ -1,16 +1,80 @@
-from typing import Any
+from typing import Any, Iterator
 from unittest import mock
 
+import asyncio
+import csv
+import datetime
+import decimal
+import io
+import json
+import pickle
+import struct
+import threading
+import time
+from dataclasses import replace
+from pathlib import Path
+
 import httpx
+import orjson
 import pytest
 import rest_framework.status as status
-from django.urls import reverse
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError
+from django.core.management import call_command
+from django.test import AsyncClient, override_settings
+from django.urls import Resolver404, resolve, reverse
+from django.utils.translation import gettext_lazy
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
-from .logic import ExchangeApi
+import data_stone.asgi
+import data_stone.settings_api
+
+from . import admission, coalescing, files, logic, metrics, namespaces, streams, views
+from .clients import aget_http_client, get_http_client
+from .coalescing import DistributedLock
+from .logic import REFRESH_LOCK_CACHE_KEY, ExchangeApi, get_rates_snapshot
+from .management.commands import refresh_rates, serve
+from .metrics import (
+    Counter,
+    Histogram,
+    admission_rejections,
+    cache_requests,
+    conversion_duration,
+    history_write_errors,
+    output_statuses,
+    upstream_fetch_duration,
+)
+from .models import Currency, HistoricalRates
+from .namespaces import CacheNamespace, rates_namespace, responses_namespace
+from .renderers import ORJSONRenderer
+from .schedules import RefreshSchedule
+from .providers import CoinbaseProvider, MoedaInfoProvider, Provider, get_providers
+from .registry import CurrencyRegistry, currency_registry
+from .serializers import ExchangeApiInputSerializer, ExchangeApiInputValidator
+from .snapshots import (
+    SNAPSHOT_FORMAT_VERSION,
+    RatesSnapshot,
+    apublish_snapshot,
+    decode_snapshot,
+    encode_snapshot,
+    get_snapshot,
+    load_last_known_good,
+    publish_snapshot,
+    save_last_known_good,
+)
+from .streams import get_rates_broadcaster, stream_rates
+from .views import Conversion
 
 
+pytestmark = pytest.mark.django_db
+
 client = APIClient()
+async_client = AsyncClient()
 
 
 # ==================================================================================================
@@ -26,8 +90,8 @@ class TestExchangeApi:
         exchange_api_result: dict[str, Any],
         expected_rates: dict[str, Any],
     ) -> None:
-        with mock.patch.object(target=httpx, attribute='get', autospec=True) as mock_get_api:
-            mock_get_api.return_value.json.return_value = exchange_api_result
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
 
             exchange_api = ExchangeApi()
             exchange_rates_status = exchange_api.get_exchange_rates()
@@ -42,7 +106,7 @@ class TestExchangeApi:
         self,
         httpx_get_request: httpx.Request,
     ) -> None:
-        with mock.patch.object(target=httpx, attribute='get', autospec=True) as mock_get_api:
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
             mock_get_api.return_value = httpx.Response(
                 content='invalid json',
                 status_code=status.HTTP_200_OK,
@@ -62,9 +126,9 @@ class TestExchangeApi:
         self,
         exchange_api_result: dict[str, Any]
     ) -> None:
-        with mock.patch.object(target=httpx, attribute='get', autospec=True) as mock_get_api:
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
             exchange_api_result['lastupdate'] = ''
-            mock_get_api.return_value.json.return_value = exchange_api_result
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
 
             exchange_api = ExchangeApi()
             exchange_rates_status = exchange_api.get_exchange_rates()
@@ -84,9 +148,9 @@ class TestExchangeApi:
         self,
         exchange_api_result: dict[str, Any]
     ) -> None:
-        with mock.patch.object(target=httpx, attribute='get', autospec=True) as mock_get_api:
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
             exchange_api_result['rates']['BRL'] = 'invalid float'
-            mock_get_api.return_value.json.return_value = exchange_api_result
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
 
             exchange_api = ExchangeApi()
             exchange_rates_status = exchange_api.get_exchange_rates()
@@ -107,9 +171,9 @@ class TestExchangeApi:
         self,
         exchange_api_result: dict[str, Any]
     ) -> None:
-        with mock.patch.object(target=httpx, attribute='get', autospec=True) as mock_get_api:
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
             exchange_api_result['rates']['BRL'] = -1.23
-            mock_get_api.return_value.json.return_value = exchange_api_result
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
 
             exchange_api = ExchangeApi()
             exchange_rates_status = exchange_api.get_exchange_rates()
@@ -130,9 +194,9 @@ class TestExchangeApi:
         self,
         exchange_api_result: dict[str, Any]
     ) -> None:
-        with mock.patch.object(target=httpx, attribute='get', autospec=True) as mock_get_api:
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
             exchange_api_result['rates']['BRL'] = 0
-            mock_get_api.return_value.json.return_value = exchange_api_result
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
 
             exchange_api = ExchangeApi()
             exchange_rates_status = exchange_api.get_exchange_rates()
@@ -149,6 +213,818 @@ class TestExchangeApi:
                 str(exchange_rates_status.data['error']['Invalid API response']['rates']['BRL'])
             )
 
+    def test_get_exchange_rates__untracked_currency_skipped(
+        self,
+        exchange_api_result: dict[str, Any],
+        expected_rates: dict[str, Any],
+    ) -> None:
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            exchange_api_result['rates']['XYZ'] = 'invalid float'
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
+
+            exchange_rates_status = ExchangeApi().get_exchange_rates()
+
+            assert not exchange_rates_status.error
+            assert exchange_rates_status.data['exchange_rates'] == expected_rates
+
+    @pytest.mark.parametrize(
+        argnames='data',
+        argvalues=[
+            [],
+            {},
+            {'lastupdate': '2024-03-28T21:19:45Z', 'rates': None},
+            {'lastupdate': '2024-03-28T21:19:45Z', 'rates': ['USD']},
+            {'lastupdate': 'yesterday', 'rates': {'USD': 1, 'BRL': None}},
+            {'lastupdate': '2024-03-28T21:19:45Z', 'rates': {'USD': 'x' * 1001, 'BRL': 10**400}},
+            {'lastupdate': '2024-03-28', 'rates': {'USD': -1, 'BRL': '5.01', 'EUR': True}},
+            {'lastupdate': '2024-03-28T21:19:45Z', 'rates': {'USD': 1, 'BRL': '5.01'}},
+        ],
+    )
+    def test_exchange_api_input_validator__serializer_errors(self, data: Any) -> None:
+        currencies = ['USD', 'BRL', 'EUR']
+        serializer = ExchangeApiInputSerializer(data=data)
+        validator = ExchangeApiInputValidator(data=data, currencies=currencies)
+
+        assert validator.is_valid() == serializer.is_valid()
+        assert json.loads(json.dumps(validator.errors)) == json.loads(json.dumps(serializer.errors))
+        if serializer.is_valid():
+            assert validator.validated_data == serializer.validated_data
+
+    def test_get_exchange_rates__retry_on_timeout(
+        self,
+        settings,
+        exchange_api_result: dict[str, Any],
+        httpx_get_request: httpx.Request,
+    ) -> None:
+        settings.EXCHANGE_RATES_API_RETRY_BACKOFF = 0
+        settings.EXCHANGE_RATES_PROVIDERS = settings.EXCHANGE_RATES_PROVIDERS[:1]
+        with mock.patch.object(target=httpx.Client, attribute='get') as mock_get_api:
+            mock_get_api.side_effect = [
+                httpx.ReadTimeout('Read timed out', request=httpx_get_request),
+                httpx.Response(
+                    json=exchange_api_result,
+                    status_code=status.HTTP_200_OK,
+                    request=httpx_get_request,
+                ),
+            ]
+
+            exchange_rates_status = ExchangeApi().get_exchange_rates()
+
+            assert not exchange_rates_status.error
+            assert mock_get_api.call_count == 2
+
+    def test_get_exchange_rates__retries_exhausted(
+        self,
+        settings,
+        httpx_get_request: httpx.Request,
+    ) -> None:
+        settings.EXCHANGE_RATES_API_RETRY_BACKOFF = 0
+        settings.EXCHANGE_RATES_PROVIDERS = settings.EXCHANGE_RATES_PROVIDERS[:1]
+        with mock.patch.object(target=httpx.Client, attribute='get') as mock_get_api:
+            mock_get_api.side_effect = httpx.ConnectTimeout(
+                'Connection timed out',
+                request=httpx_get_request,
+            )
+
+            exchange_rates_status = ExchangeApi().get_exchange_rates()
+
+            assert exchange_rates_status.error
+            assert exchange_rates_status.status == 'api_access_error'
+            assert exchange_rates_status.data == {'error': 'Connection timed out'}
+            assert mock_get_api.call_count == settings.EXCHANGE_RATES_API_RETRIES + 1
+
+    def test_get_exchange_rates__retry_on_unavailable(
+        self,
+        settings,
+        httpx_get_request: httpx.Request,
+    ) -> None:
+        settings.EXCHANGE_RATES_API_RETRY_BACKOFF = 0
+        settings.EXCHANGE_RATES_PROVIDERS = settings.EXCHANGE_RATES_PROVIDERS[:1]
+        with mock.patch.object(target=httpx.Client, attribute='get') as mock_get_api:
+            mock_get_api.return_value = httpx.Response(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                request=httpx_get_request,
+            )
+
+            exchange_rates_status = ExchangeApi().get_exchange_rates()
+
+            assert exchange_rates_status.error
+            assert exchange_rates_status.status == 'api_access_error'
+            assert mock_get_api.call_count == settings.EXCHANGE_RATES_API_RETRIES + 1
+
+    def test_get_http_client__process_wide(self) -> None:
+        assert get_http_client() is get_http_client()
+
+    def test_aget_http_client__closed_on_loop_shutdown(self) -> None:
+        async def get_clients() -> tuple[httpx.AsyncClient, httpx.AsyncClient]:
+            return await aget_http_client(), await aget_http_client()
+
+        first_client, same_loop_client = async_to_sync(get_clients)()
+        second_client, _ = async_to_sync(get_clients)()
+
+        assert first_client is same_loop_client
+        assert first_client is not second_client
+        assert first_client.is_closed
+        assert second_client.is_closed
+
+
+# ==================================================================================================
+#   Exchange rates providers
+# ==================================================================================================
+class TestProviders:
+    coinbase_result = {
+        'data': {
+            'currency': 'USD',
+            'rates': {'USD': '1', 'BRL': '5.1', 'EUR': '0.93', 'BTC': '0.0000141', 'JPY': '151.3'},
+        },
+    }
+
+    def providers(self, primary_url: str, secondary_url: str) -> list[Provider]:
+        return [
+            MoedaInfoProvider(name='primary', url=primary_url),
+            CoinbaseProvider(name='secondary', url=secondary_url),
+        ]
+
+    def test_get_exchange_rates__hedged_request(
+        self,
+        settings,
+        stub_server,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        settings.EXCHANGE_RATES_HEDGE_DELAY = 0.05
+        exchange_api = ExchangeApi(providers=self.providers(
+            primary_url=stub_server(content=json.dumps(exchange_api_result).encode(), delay=2),
+            secondary_url=stub_server(content=json.dumps(self.coinbase_result).encode()),
+        ))
+
+        start = time.monotonic()
+        exchange_rates_status = exchange_api.get_exchange_rates()
+
+        assert time.monotonic() - start < 1
+        assert not exchange_rates_status.error
+        assert exchange_rates_status.data['exchange_rates'] == {
+            'USD': 1.0, 'BRL': 5.1, 'EUR': 0.93, 'BTC': 0.0000141}
+
+    def test_get_exchange_rates__preferred_provider(
+        self,
+        stub_server,
+        exchange_api_result: dict[str, Any],
+        expected_rates: dict[str, Any],
+    ) -> None:
+        exchange_api = ExchangeApi(providers=self.providers(
+            primary_url=stub_server(content=json.dumps(exchange_api_result).encode()),
+            secondary_url=stub_server(content=json.dumps(self.coinbase_result).encode()),
+        ))
+
+        exchange_rates_status = exchange_api.get_exchange_rates()
+
+        assert exchange_rates_status.data == {
+            'exchange_rates': expected_rates, 'updated': exchange_api_result['lastupdate']}
+
+    def test_get_exchange_rates__failover(self, settings, stub_server) -> None:
+        settings.EXCHANGE_RATES_HEDGE_DELAY = 5
+        exchange_api = ExchangeApi(providers=self.providers(
+            primary_url=stub_server(content=b'', status_code=status.HTTP_500_INTERNAL_SERVER_ERROR),
+            secondary_url=stub_server(content=json.dumps(self.coinbase_result).encode()),
+        ))
+
+        start = time.monotonic()
+        exchange_rates_status = exchange_api.get_exchange_rates()
+
+        assert time.monotonic() - start < settings.EXCHANGE_RATES_HEDGE_DELAY
+        assert not exchange_rates_status.error
+        assert exchange_rates_status.data['exchange_rates']['BRL'] == 5.1
+
+    def test_get_exchange_rates__all_providers_failed(self, stub_server) -> None:
+        exchange_api = ExchangeApi(providers=self.providers(
+            primary_url=stub_server(content=b'invalid json'),
+            secondary_url=stub_server(content=b'', status_code=status.HTTP_404_NOT_FOUND),
+        ))
+
+        exchange_rates_status = exchange_api.get_exchange_rates()
+
+        assert exchange_rates_status.error
+        assert exchange_rates_status.status == 'json_data_error'
+
+    def test_aget_exchange_rates__hedged_request(
+        self,
+        settings,
+        stub_server,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        settings.EXCHANGE_RATES_HEDGE_DELAY = 0.05
+        exchange_api = ExchangeApi(providers=self.providers(
+            primary_url=stub_server(content=json.dumps(exchange_api_result).encode(), delay=2),
+            secondary_url=stub_server(content=json.dumps(self.coinbase_result).encode()),
+        ))
+
+        start = time.monotonic()
+        exchange_rates_status = async_to_sync(exchange_api.aget_exchange_rates)()
+
+        assert time.monotonic() - start < 1
+        assert not exchange_rates_status.error
+        assert exchange_rates_status.data['exchange_rates']['BRL'] == 5.1
+
+    def test_get_providers(self, settings) -> None:
+        settings.EXCHANGE_RATES_PROVIDERS = [
+            {'name': 'coinbase', 'adapter': 'api.providers.CoinbaseProvider', 'url': 'http://c/'},
+        ]
+
+        assert get_providers() == [CoinbaseProvider(name='coinbase', url='http://c/')]
+
+    def test_get_providers__empty(self, settings) -> None:
+        settings.EXCHANGE_RATES_PROVIDERS = []
+
+        with pytest.raises(ImproperlyConfigured, match='At least one exchange rates provider'):
+            get_providers()
+        with pytest.raises(ImproperlyConfigured):
+            ExchangeApi()
+
+
+# ==================================================================================================
+#   Currencies registry
+# ==================================================================================================
+class TestCurrencyRegistry:
+    def test_index__loaded_once(self, django_assert_num_queries) -> None:
+        with django_assert_num_queries(1):
+            index = currency_registry.index()
+            assert currency_registry.index() is index
+            assert currency_registry.acronyms() == frozenset(Currency.cached_acronyms_list())
+
+        assert sorted(index.values()) == list(range(len(index)))
+
+    def test_index__invalidated_on_change(
+        self,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        assert 'AUD' not in currency_registry.acronyms()
+
+        currency = Currency.objects.create(acronym='aud')
+        assert 'AUD' in currency_registry.acronyms()
+        assert 'AUD' in Currency.cached_acronyms_list()
+
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
+
+            exchange_rates_status = ExchangeApi().get_exchange_rates()
+            assert exchange_rates_status.data['exchange_rates']['AUD'] == 1.534728
+
+        currency.delete()
+        assert 'AUD' not in currency_registry.acronyms()
+
+    def test_index__invalidated_on_other_worker(self, settings) -> None:
+        settings.CURRENCY_REGISTRY_CHECK_INTERVAL = 0
+        other_worker_registry = CurrencyRegistry()
+        assert 'AUD' not in other_worker_registry.acronyms()
+
+        Currency.objects.create(acronym='AUD')
+
+        assert 'AUD' in other_worker_registry.acronyms()
+
+    def test_index__check_interval(self, django_assert_num_queries) -> None:
+        other_worker_registry = CurrencyRegistry()
+        other_worker_registry.index()
+
+        Currency.objects.create(acronym='AUD')
+
+        with django_assert_num_queries(0):
+            assert 'AUD' not in other_worker_registry.acronyms()
+
+
+# ==================================================================================================
+#   Rates snapshot
+# ==================================================================================================
+class TestRatesSnapshot:
+    # ----------------------------------------------------------------------------------------------
+    #   `get_rates_snapshot()`
+    # ----------------------------------------------------------------------------------------------
+    def test_get_rates_snapshot__cold_cache(
+        self,
+        exchange_api_result: dict[str, Any],
+        expected_rates: dict[str, Any],
+    ) -> None:
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
+
+            first_status = get_rates_snapshot()
+            second_status = get_rates_snapshot()
+
+            assert not first_status.error
+            assert mock_get_api.call_count == 1
+
+            snapshot = second_status.data['snapshot']
+            assert snapshot == first_status.data['snapshot']
+            assert snapshot.rates == expected_rates
+            assert snapshot.last_update == exchange_api_result['lastupdate']
+
+    def test_get_rates_snapshot__stale_snapshot(
+        self,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        stale_snapshot = publish_snapshot(
+            last_update='2024-03-27T10:00:00+00:00',
+            rates={'USD': 1.0},
+        )
+        with (
+            mock.patch.object(target=logic, attribute='refresh_rates_snapshot') as mock_refresh,
+            mock.patch.object(
+                target=type(stale_snapshot),
+                attribute='is_stale_for',
+                return_value=True,
+            ),
+        ):
+            snapshot_status = get_rates_snapshot()
+            assert snapshot_status.data['snapshot'] == stale_snapshot
+
+            logic._background_refresh_lock.acquire()
+            logic._background_refresh_lock.release()
+            mock_refresh.assert_called_once()
+
+    def test_refresh_rates_command__once(
+        self,
+        exchange_api_result: dict[str, Any],
+        expected_rates: dict[str, Any],
+    ) -> None:
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
+
+            call_command('refresh_rates', '--once')
+
+            snapshot = get_snapshot()
+            assert snapshot is not None
+            assert snapshot.rates == expected_rates
+
+    def test_refresh_rates_command__unexpected_error(self) -> None:
+        # The second refresh stops the (endless) command loop
+        with (
+            mock.patch.object(
+                target=refresh_rates,
+                attribute='refresh_rates_snapshot',
+                side_effect=[RedisConnectionError('Cache is down.'), KeyboardInterrupt],
+            ) as mock_refresh,
+            mock.patch.object(target=refresh_rates.time, attribute='sleep') as mock_sleep,
+            pytest.raises(KeyboardInterrupt),
+        ):
+            stderr = io.StringIO()
+            call_command('refresh_rates', stderr=stderr)
+
+        assert mock_refresh.call_count == 2
+        mock_sleep.assert_called_once()
+        assert 'Refresh failed [ConnectionError]: Cache is down.' in stderr.getvalue()
+
+    def test_refresh_rates_snapshot__history_database_error(
+        self,
+        exchange_api_result: dict[str, Any],
+        httpx_get_request: httpx.Request,
+    ) -> None:
+        write_errors = history_write_errors.value()
+        api_response = httpx.Response(
+            json=exchange_api_result,
+            status_code=status.HTTP_200_OK,
+            request=httpx_get_request,
+        )
+
+        with (
+            mock.patch.object(target=httpx.Client, attribute='get', return_value=api_response),
+            mock.patch.object(
+                target=httpx.AsyncClient,
+                attribute='get',
+                new_callable=mock.AsyncMock,
+                return_value=api_response,
+            ),
+            mock.patch.object(
+                target=HistoricalRates.objects,
+                attribute='bulk_create',
+                side_effect=DatabaseError,
+            ),
+            mock.patch.object(
+                target=HistoricalRates.objects,
+                attribute='abulk_create',
+                side_effect=DatabaseError,
+            ),
+        ):
+            # The published snapshot is kept
+            snapshot_status = logic.refresh_rates_snapshot()
+            assert snapshot_status.status == 'ok'
+            assert get_snapshot() == snapshot_status.data['snapshot']
+
+            rates_namespace.invalidate()
+            snapshot_status = async_to_sync(logic.arefresh_rates_snapshot)()
+            assert snapshot_status.status == 'ok'
+            assert get_snapshot() == snapshot_status.data['snapshot']
+
+        assert history_write_errors.value() == write_errors + 2
+
+    # ----------------------------------------------------------------------------------------------
+    #   Refresh coalescing
+    # ----------------------------------------------------------------------------------------------
+    @pytest.mark.django_db(transaction=True, serialized_rollback=True)
+    def test_get_rates_snapshot__concurrent_misses(
+        self,
+        exchange_api_result: dict[str, Any],
+        httpx_get_request: httpx.Request,
+    ) -> None:
+        concurrent_requests = 20
+
+        def slow_get(*args, **kwargs) -> httpx.Response:
+            time.sleep(0.2)
+            return httpx.Response(
+                json=exchange_api_result,
+                status_code=status.HTTP_200_OK,
+                request=httpx_get_request,
+            )
+
+        with mock.patch.object(
+            target=httpx.Client,
+            attribute='get',
+            side_effect=slow_get,
+        ) as mock_get_api:
+            barrier = threading.Barrier(concurrent_requests)
+            results = []
+
+            def get_snapshot_version() -> None:
+                barrier.wait()
+                results.append(get_rates_snapshot().data['snapshot'].version)
+
+            threads = [
+                threading.Thread(target=get_snapshot_version) for _ in range(concurrent_requests)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            assert mock_get_api.call_count == 1
+            assert len(results) == concurrent_requests
+            assert len(set(results)) == 1
+
+    def test_get_rates_snapshot__refresh_by_another_worker(
+        self,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        other_worker_lock = DistributedLock(key=REFRESH_LOCK_CACHE_KEY, lease=10)
+        assert other_worker_lock.acquire()
+
+        other_worker_refresh = threading.Timer(
+            interval=0.2,
+            function=publish_snapshot,
+            kwargs={'last_update': exchange_api_result['lastupdate'], 'rates': {'USD': 1.0}},
+        )
+        try:
+            with mock.patch.object(
+                target=httpx.Client,
+                attribute='get',
+                autospec=True,
+            ) as mock_get_api:
+                other_worker_refresh.start()
+                snapshot_status = get_rates_snapshot()
+
+                assert not snapshot_status.error
+                assert snapshot_status.data['snapshot'].rates == {'USD': 1.0}
+                mock_get_api.assert_not_called()
+        finally:
+            other_worker_refresh.join()
+            other_worker_lock.release()
+
+    def test_refresh_rates_snapshot__previous_snapshot_on_timeout(self, settings) -> None:
+        settings.EXCHANGE_RATES_REFRESH_LOCK_WAIT = 0.1
+        previous_snapshot = publish_snapshot(
+            last_update='2024-03-27T10:00:00+00:00',
+            rates={'USD': 1.0},
+        )
+        other_worker_lock = DistributedLock(key=REFRESH_LOCK_CACHE_KEY, lease=10)
+        assert other_worker_lock.acquire()
+        try:
+            with mock.patch.object(
+                target=httpx.Client,
+                attribute='get',
+                autospec=True,
+            ) as mock_get_api:
+                refresh_status = logic.refresh_rates_snapshot()
+
+                assert refresh_status.data['snapshot'] == previous_snapshot
+                mock_get_api.assert_not_called()
+        finally:
+            other_worker_lock.release()
+
+    def test_distributed_lock__release_reacquired(self) -> None:
+        lock = DistributedLock(key=REFRESH_LOCK_CACHE_KEY, lease=10)
+        other_worker_lock = DistributedLock(key=REFRESH_LOCK_CACHE_KEY, lease=10)
+        assert lock.acquire()
+
+        cache = caches['default']
+        cache_get = type(cache).get
+        compared = threading.Event()
+
+        def get_then_pause(*args, **kwargs):
+            value = cache_get(*args, **kwargs)
+            compared.set()
+            time.sleep(0.2)
+            return value
+
+        # The lease expires and another worker acquires the lock between the check and the delete
+        with mock.patch.object(
+            target=type(cache),
+            attribute='get',
+            autospec=True,
+            side_effect=get_then_pause,
+        ):
+            release = threading.Thread(target=lock.release)
+            release.start()
+            assert compared.wait(timeout=5)
+            cache.delete(key=REFRESH_LOCK_CACHE_KEY)
+            other_worker_acquired = other_worker_lock.acquire()
+            release.join()
+
+        assert other_worker_acquired
+        assert cache.get(key=REFRESH_LOCK_CACHE_KEY) == other_worker_lock.token
+        other_worker_lock.release()
+        assert cache.get(key=REFRESH_LOCK_CACHE_KEY) is None
+
+    def test_distributed_lock__redis_release(self) -> None:
+        redis_cache = RedisCache(server='redis://127.0.0.1:1', params={})
+        lock = DistributedLock(key=REFRESH_LOCK_CACHE_KEY, lease=10)
+        with (
+            mock.patch.object(target=coalescing, attribute='caches', new={'default': redis_cache}),
+            mock.patch.object(target=coalescing, attribute='_release_lock_script') as mock_script,
+            mock.patch.object(target=redis_cache, attribute='get') as mock_get,
+            mock.patch.object(target=redis_cache, attribute='delete') as mock_delete,
+        ):
+            async_to_sync(lock.arelease)()
+
+        mock_script.assert_called_once_with(cache=redis_cache)
+        mock_script.return_value.assert_called_once_with(
+            keys=[redis_cache.make_and_validate_key(key=REFRESH_LOCK_CACHE_KEY)],
+            args=[pickle.dumps(lock.token, pickle.HIGHEST_PROTOCOL)],
+        )
+        mock_get.assert_not_called()
+        mock_delete.assert_not_called()
+
+    # ----------------------------------------------------------------------------------------------
+    #   Conditional and adaptive refreshes
+    # ----------------------------------------------------------------------------------------------
+    def test_refresh_rates_snapshot__not_modified(
+        self,
+        settings,
+        exchange_api_result: dict[str, Any],
+        httpx_get_request: httpx.Request,
+    ) -> None:
+        settings.EXCHANGE_RATES_PROVIDERS = settings.EXCHANGE_RATES_PROVIDERS[:1]
+        validators = {'ETag': '"rates-1"', 'Last-Modified': 'Thu, 28 Mar 2024 21:19:45 GMT'}
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            mock_get_api.side_effect = [
+                httpx.Response(
+                    json=exchange_api_result,
+                    headers=validators,
+                    status_code=status.HTTP_200_OK,
+                    request=httpx_get_request,
+                ),
+                httpx.Response(status_code=status.HTTP_304_NOT_MODIFIED, request=httpx_get_request),
+            ]
+            published_status = logic.refresh_rates_snapshot()
+            renewed_status = logic.refresh_rates_snapshot()
+
+            assert mock_get_api.call_args_list[0].kwargs['headers'] == {}
+            assert mock_get_api.call_args_list[1].kwargs['headers'] == {
+                'If-None-Match': '"rates-1"',
+                'If-Modified-Since': 'Thu, 28 Mar 2024 21:19:45 GMT',
+            }
+
+        published_snapshot = published_status.data['snapshot']
+        assert published_snapshot.validators == validators
+        assert renewed_status.status == 'not_modified'
+
+        renewed_snapshot = get_snapshot()
+        assert renewed_snapshot == renewed_status.data['snapshot']
+        assert renewed_snapshot.version == published_snapshot.version
+        assert renewed_snapshot.rates == published_snapshot.rates
+        assert renewed_snapshot.validators == validators
+        assert renewed_snapshot.fetched_at > published_snapshot.fetched_at
+        assert HistoricalRates.objects.count() == 1
+
+    def test_refresh_rates_snapshot__unchanged_rates(
+        self,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
+            published_snapshot = logic.refresh_rates_snapshot().data['snapshot']
+            renewed_status = logic.refresh_rates_snapshot()
+
+        assert renewed_status.status == 'not_modified'
+        assert renewed_status.data['snapshot'].version == published_snapshot.version
+
+    def test_refresh_rates_snapshot__unchanged_rates_without_update_time(self, settings) -> None:
+        settings.EXCHANGE_RATES_PROVIDERS = [
+            {'name': 'coinbase', 'adapter': 'api.providers.CoinbaseProvider', 'url': 'http://c/'},
+        ]
+        coinbase_result = {'data': {'currency': 'USD', 'rates': {'USD': '1', 'BRL': '5.1'}}}
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            mock_get_api.return_value.content = json.dumps(coinbase_result).encode()
+            published_snapshot = logic.refresh_rates_snapshot().data['snapshot']
+            renewed_status = logic.refresh_rates_snapshot()
+
+        assert renewed_status.status == 'not_modified'
+        assert renewed_status.data['snapshot'].version == published_snapshot.version
+        assert renewed_status.data['snapshot'].last_update == published_snapshot.last_update
+        assert HistoricalRates.objects.count() == 1
+
+    def test_get_rates_snapshot__volatile_currencies(self, settings) -> None:
+        settings.EXCHANGE_RATES_VOLATILE_CACHE_TIMEOUTS = {'BTC': 5 * 60}
+        snapshot = publish_snapshot(
+            last_update='2024-03-27T10:00:00+00:00',
+            rates={'USD': 1.0, 'BRL': 5.0, 'BTC': 0.00001},
+        )
+        with (
+            mock.patch.object(target=logic, attribute='refresh_rates_snapshot') as mock_refresh,
+            mock.patch.object(
+                target=type(snapshot),
+                attribute='age',
+                new_callable=mock.PropertyMock,
+                return_value=10 * 60,
+            ),
+        ):
+            get_rates_snapshot(currency_names=('USD', 'BRL'))
+            logic._background_refresh_lock.acquire()
+            logic._background_refresh_lock.release()
+            mock_refresh.assert_not_called()
+
+            snapshot_status = get_rates_snapshot(currency_names=('BTC', 'BRL'))
+            assert snapshot_status.data['snapshot'] == snapshot
+            logic._background_refresh_lock.acquire()
+            logic._background_refresh_lock.release()
+            mock_refresh.assert_called_once()
+
+    def test_refresh_schedule__learned_cadence(self) -> None:
+        schedule = RefreshSchedule(min_interval=60, max_interval=2 * 60 * 60)
+        assert schedule.next_delay() == 2 * 60 * 60
+
+        for hour in [10, 11, 12, 14]:
+            schedule.observe(last_update=f'2024-03-28T{hour}:00:05+00:00')
+        schedule.observe(last_update='2024-03-28T14:00:05+00:00')
+        assert schedule.cadence == 60 * 60
+
+        last_update = datetime.datetime(2024, 3, 28, 14, 0, 5, tzinfo=datetime.timezone.utc)
+        now = last_update.timestamp() + 15 * 60
+        assert schedule.next_delay(now=now) == 45 * 60
+        # Overdue updates are checked at the minimum interval
+        assert schedule.next_delay(now=now + 60 * 60) == 60
+
+    # ----------------------------------------------------------------------------------------------
+    #   Binary format
+    # ----------------------------------------------------------------------------------------------
+    def test_encode_snapshot__round_trip(self, exchange_api_result: dict[str, Any]) -> None:
+        snapshot = publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+            provider='moeda.info',
+            validators={'ETag': '"rates-1"'},
+        )
+        data = encode_snapshot(snapshot=snapshot)
+        decoded_snapshot = decode_snapshot(data=data)
+
+        assert decoded_snapshot == snapshot
+        assert decoded_snapshot.currencies == list(exchange_api_result['rates'])
+        assert decoded_snapshot.cross_rate('BTC', 'EUR') == snapshot.cross_rate('BTC', 'EUR')
+        # The cross rates matrix isn't stored
+        assert len(data) < len(snapshot.cross_rates)
+        # The same snapshot is decoded once per process
+        assert get_snapshot() is decoded_snapshot
+
+    def test_decode_snapshot__other_formats(self, exchange_api_result: dict[str, Any]) -> None:
+        snapshot = publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+        data = encode_snapshot(snapshot=snapshot)
+        other_format_version = struct.pack('<H', SNAPSHOT_FORMAT_VERSION + 1)
+
+        assert decode_snapshot(data=None) is None
+        assert decode_snapshot(data={'rates': exchange_api_result['rates']}) is None
+        assert decode_snapshot(data=data[:4] + other_format_version + data[6:]) is None
+        assert decode_snapshot(data=data[:-8]) is None
+        assert decode_snapshot(data=data) == snapshot
+
+
+    # ----------------------------------------------------------------------------------------------
+    #   Last known good snapshot
+    # ----------------------------------------------------------------------------------------------
+    def test_save_last_known_good__atomic(
+        self,
+        exchange_api_result: dict[str, Any],
+        last_known_good_file: Path,
+    ) -> None:
+        assert load_last_known_good() is None
+        snapshot = publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+
+        assert save_last_known_good(snapshot=snapshot)
+        assert list(last_known_good_file.parent.iterdir()) == [last_known_good_file]
+        assert last_known_good_file.read_bytes() == encode_snapshot(snapshot=snapshot)
+        assert load_last_known_good() == snapshot
+
+        last_known_good_file.write_bytes(b'')
+        assert load_last_known_good() is None
+
+    def test_save_last_known_good__disabled(self, settings, last_known_good_file: Path) -> None:
+        settings.EXCHANGE_RATES_LAST_KNOWN_GOOD_FILE = ''
+        snapshot = publish_snapshot(last_update='2024-03-27T10:00:00+00:00', rates={'USD': 1.0})
+
+        assert not save_last_known_good(snapshot=snapshot)
+        assert load_last_known_good() is None
+        assert not last_known_good_file.exists()
+
+    def test_refresh_rates_snapshot__saves_last_known_good(
+        self,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
+            snapshot_status = get_rates_snapshot()
+
+        assert load_last_known_good() == snapshot_status.data['snapshot']
+
+    def test_get_rates_snapshot__cold_start_last_known_good(
+        self,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        last_known_good = publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+        save_last_known_good(snapshot=last_known_good)
+        rates_namespace.invalidate()
+
+        with (
+            mock.patch.object(target=logic, attribute='refresh_rates_snapshot') as mock_refresh,
+            mock.patch.object(target=logic, attribute='_start_background_refresh') as mock_start,
+        ):
+            snapshot_status = get_rates_snapshot()
+            assert snapshot_status.status == 'last_known_good'
+            assert snapshot_status.data['snapshot'] == last_known_good
+            mock_refresh.assert_not_called()
+            mock_start.assert_called_once()
+
+    def test_get_rates_snapshot__cache_and_api_down(
+        self,
+        settings,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        snapshot = publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+        old_snapshot = replace(
+            snapshot, fetched_at=time.time() - settings.EXCHANGE_RATES_SNAPSHOT_RETENTION - 60)
+        save_last_known_good(snapshot=old_snapshot)
+
+        with (
+            mock.patch.object(
+                target=logic, attribute='get_snapshot', side_effect=RedisConnectionError),
+            mock.patch.object(
+                target=logic, attribute='refresh_rates_snapshot', side_effect=RedisConnectionError),
+            mock.patch.object(
+                target=logic, attribute='aget_snapshot', side_effect=RedisConnectionError),
+            mock.patch.object(
+                target=logic,
+                attribute='arefresh_rates_snapshot',
+                side_effect=RedisConnectionError,
+            ),
+        ):
+            snapshot_status = get_rates_snapshot()
+            assert snapshot_status.status == 'last_known_good'
+            assert snapshot_status.data['snapshot'] == old_snapshot
+
+            result = client.get(
+                path=reverse('api.currency_conversion'),
+                data={'from': 'USD', 'to': 'BRL', 'amount': 2.0},
+            )
+            assert result.status_code == status.HTTP_200_OK
+            assert result.json()['converted_value'] == 10.026532
+            assert int(result['X-Rates-Age']) >= settings.EXCHANGE_RATES_SNAPSHOT_RETENTION
+            assert 'max-age=0' in result['Cache-Control']
+
+            result = async_to_sync(async_client.get)(
+                path=reverse('api.currency_conversion_async'),
+                data={'from': 'USD', 'to': 'BRL', 'amount': 2.0},
+            )
+            assert result.status_code == status.HTTP_200_OK
+            assert int(result['X-Rates-Age']) >= settings.EXCHANGE_RATES_SNAPSHOT_RETENTION
+
+    def test_get_rates_snapshot__cache_down_without_last_known_good(self) -> None:
+        with (
+            mock.patch.object(
+                target=logic, attribute='get_snapshot', side_effect=RedisConnectionError),
+            mock.patch.object(
+                target=logic, attribute='refresh_rates_snapshot', side_effect=RedisConnectionError),
+        ):
+            snapshot_status = get_rates_snapshot()
+            assert snapshot_status.error
+            assert snapshot_status.status == 'cache_access_error'
+
+
 class TestConversion:
     # ----------------------------------------------------------------------------------------------
     #   /conversion endpoint (GET)
@@ -157,7 +1033,7 @@ class TestConversion:
         'from_currency,to_currency, amount, converted_value',
         [
             ('USD', 'BRL', 2.0, 10.026532),
-            ('BTC', 'EUR', 3.0, 196705.8257921073),
+            ('BTC', 'EUR', 3.0, 196705.82579210727),
             ('ETH', 'USD', 4.0, 14252.759868789093),
         ]
     )
@@ -169,8 +1045,8 @@ class TestConversion:
         amount: float,
         converted_value: float,
     ) -> None:
-        with mock.patch.object(target=httpx, attribute='get', autospec=True) as mock_get_api:
-            mock_get_api.return_value.json.return_value = exchange_api_result
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
 
             result = client.get(
                 path=reverse('api.currency_conversion'),
@@ -187,6 +1063,39 @@ class TestConversion:
             }
             assert result.json() == expected_result
 
+    def test_get_conversion__published_snapshot(self, exchange_api_result: dict[str, Any]) -> None:
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            result = client.get(
+                path=reverse('api.currency_conversion'),
+                data={'from': 'USD', 'to': 'AUD', 'amount': 7.0}
+            )
+            assert result.status_code == status.HTTP_200_OK
+            assert result.json()['converted_value'] == 7.0 * exchange_api_result['rates']['AUD']
+
+            mock_get_api.assert_not_called()
+
+    def test_get_conversion__amount_independent_cache(
+        self,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
+
+            converted_values = [
+                client.get(
+                    path=reverse('api.currency_conversion'),
+                    data={'from': 'USD', 'to': 'BRL', 'amount': amount},
+                ).json()['converted_value']
+                for amount in [1.0, 2.0, 3.0]
+            ]
+
+            assert converted_values == [5.013266, 10.026532, 15.039798]
+            assert mock_get_api.call_count == 1
+
     @pytest.mark.parametrize(
         'from_currency,to_currency, amount',
         [
@@ -202,8 +1111,8 @@ class TestConversion:
         to_currency: str | None,
         amount: float | None,
     ) -> None:
-        with mock.patch.object(target=httpx, attribute='get', autospec=True) as mock_get_api:
-            mock_get_api.return_value.json.return_value = exchange_api_result
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
 
             params = [
                 param for param in zip(
@@ -233,8 +1142,8 @@ class TestConversion:
         from_currency: str,
         to_currency: str,
     ) -> None:
-        with mock.patch.object(target=httpx, attribute='get', autospec=True) as mock_get_api:
-            mock_get_api.return_value.json.return_value = exchange_api_result
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
 
             result = client.get(
                 path=reverse('api.currency_conversion'),
@@ -259,8 +1168,8 @@ class TestConversion:
         from_currency: str,
         to_currency: str,
     ) -> None:
-        with mock.patch.object(target=httpx, attribute='get', autospec=True) as mock_get_api:
-            mock_get_api.return_value.json.return_value = exchange_api_result
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
 
             result = client.get(
                 path=reverse('api.currency_conversion'),
@@ -272,13 +1181,30 @@ class TestConversion:
             expected_result = {'error': 'The currency [] is not available for conversion.'}
             assert result.json() == expected_result
 
+    @pytest.mark.parametrize('amount', ['nan', 'inf', '-Infinity', '1e308'])
+    def test_get_conversion__non_finite_amount(
+        self,
+        exchange_api_result: dict[str, Any],
+        amount: str,
+    ) -> None:
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+        result = client.get(
+            path=reverse('api.currency_conversion'),
+            data={'from': 'BTC', 'to': 'BRL', 'amount': amount},
+        )
+        assert result.status_code == status.HTTP_400_BAD_REQUEST
+        assert result.json() == {'error': f'The amount [{amount}] is a invalid value.'}
+
     def test_get_conversion__external_api_error(
         self,
         exchange_api_result: dict[str, Any],
     ) -> None:
-        with mock.patch.object(target=httpx, attribute='get', autospec=True) as mock_get_api:
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
             exchange_api_result['rates']['BRL'] = 'invalid float'
-            mock_get_api.return_value.json.return_value = exchange_api_result
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
 
             result = client.get(
                 path=reverse('api.currency_conversion'),
@@ -297,3 +1223,1577 @@ class TestConversion:
                 'A valid number is required.' in
                 str(result_json['error']['Invalid API response']['rates']['BRL'])
             )
+
+
+class TestConversionHttpCaching:
+    # ----------------------------------------------------------------------------------------------
+    #   /conversion endpoint (GET) validators and conditional requests
+    # ----------------------------------------------------------------------------------------------
+    @pytest.fixture(autouse=True)
+    def snapshot(self, exchange_api_result: dict[str, Any]) -> RatesSnapshot:
+        return publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+
+    def test_get_conversion__cache_headers(self, settings, snapshot: RatesSnapshot) -> None:
+        result = client.get(
+            path=reverse('api.currency_conversion'),
+            data={'from': 'USD', 'to': 'BRL', 'amount': 2.0},
+        )
+        assert result.status_code == status.HTTP_200_OK
+        assert result['ETag'] == f'"{snapshot.version}.1711660785.{responses_namespace.version()}"'
+        assert result['Last-Modified'] == 'Thu, 28 Mar 2024 21:19:45 GMT'
+
+        max_age = int(result['Cache-Control'].split('max-age=')[1])
+        assert 'public' in result['Cache-Control']
+        assert settings.EXCHANGE_RATES_REFRESH_INTERVAL - 5 <= max_age
+        assert max_age <= settings.EXCHANGE_RATES_REFRESH_INTERVAL
+
+    def test_get_conversion__not_modified(self) -> None:
+        data = {'from': 'USD', 'to': 'BRL', 'amount': 2.0}
+        etag = client.get(path=reverse('api.currency_conversion'), data=data)['ETag']
+
+        result = client.get(
+            path=reverse('api.currency_conversion'), data=data, HTTP_IF_NONE_MATCH=etag)
+        assert result.status_code == status.HTTP_304_NOT_MODIFIED
+        assert result['ETag'] == etag
+        assert 'max-age' in result['Cache-Control']
+        assert not result.content
+
+        result = async_to_sync(async_client.get)(
+            path=reverse('api.currency_conversion_async'),
+            data=data,
+            headers={'If-None-Match': etag},
+        )
+        assert result.status_code == status.HTTP_304_NOT_MODIFIED
+
+    @pytest.mark.parametrize(
+        'path_name, data',
+        [
+            ('api.currency_conversion', {'from': 'USD', 'to': 'INEXISTENT', 'amount': 2.0}),
+            ('api.currency_conversion', {'from': 'USD', 'to': 'BRL', 'amount': 'invalid'}),
+            ('api.currency_conversion_async', {'from': 'INEXISTENT', 'to': 'BRL', 'amount': 2.0}),
+            ('api.currency_rates_matrix', {'from': 'INEXISTENT'}),
+        ]
+    )
+    def test_get__not_modified_invalid_parameters(self, path_name: str, data: dict) -> None:
+        etag = client.get(path=reverse('api.currency_rates_matrix'))['ETag']
+
+        result = client.get(path=reverse(path_name), data=data, HTTP_IF_NONE_MATCH=etag)
+
+        assert result.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_get_conversion__if_modified_since(self) -> None:
+        result = client.get(
+            path=reverse('api.currency_conversion'),
+            data={'from': 'USD', 'to': 'BRL', 'amount': 2.0},
+            HTTP_IF_MODIFIED_SINCE='Thu, 28 Mar 2024 21:19:45 GMT',
+        )
+        assert result.status_code == status.HTTP_304_NOT_MODIFIED
+
+        result = client.get(
+            path=reverse('api.currency_conversion'),
+            data={'from': 'USD', 'to': 'BRL', 'amount': 2.0},
+            HTTP_IF_MODIFIED_SINCE='Thu, 28 Mar 2024 20:00:00 GMT',
+        )
+        assert result.status_code == status.HTTP_200_OK
+
+    def test_get_conversion__new_snapshot_modified(
+        self,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        data = {'from': 'USD', 'to': 'BRL', 'amount': 2.0}
+        etag = client.get(path=reverse('api.currency_conversion'), data=data)['ETag']
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates={**exchange_api_result['rates'], 'BRL': 5.1},
+        )
+
+        result = client.get(
+            path=reverse('api.currency_conversion'), data=data, HTTP_IF_NONE_MATCH=etag)
+        assert result.status_code == status.HTTP_200_OK
+        assert result['ETag'] != etag
+        assert result.json()['converted_value'] == 10.2
+
+    def test_get_conversion__refresh_due_max_age(self, settings) -> None:
+        settings.EXCHANGE_RATES_REFRESH_INTERVAL = 0
+        result = client.get(
+            path=reverse('api.currency_conversion'),
+            data={'from': 'USD', 'to': 'BRL', 'amount': 2.0},
+        )
+        assert result.status_code == status.HTTP_200_OK
+        assert 'max-age=0' in result['Cache-Control']
+
+    def test_get_conversion__errors_not_cached(self) -> None:
+        result = client.get(
+            path=reverse('api.currency_conversion'),
+            data={'from': 'USD', 'to': 'XXX', 'amount': 2.0},
+        )
+        assert result.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'ETag' not in result
+        assert 'Cache-Control' not in result
+
+
+class TestHistoricalConversion:
+    # ----------------------------------------------------------------------------------------------
+    #   /conversion endpoint (GET) with `at`
+    # ----------------------------------------------------------------------------------------------
+    @pytest.fixture(autouse=True)
+    def historical_rates(self) -> None:
+        HistoricalRates.objects.bulk_create(
+            [
+                HistoricalRates(
+                    last_update=datetime.datetime(2024, 3, day, 12, tzinfo=datetime.timezone.utc),
+                    rates={'USD': 1.0, 'BRL': 4.0 + day / 10},
+                )
+                for day in [10, 11, 12]
+            ]
+        )
+
+    def test_refresh_rates_snapshot__history(
+        self,
+        exchange_api_result: dict[str, Any],
+        expected_rates: dict[str, Any],
+    ) -> None:
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
+
+            logic.refresh_rates_snapshot()
+            logic.refresh_rates_snapshot()
+
+            record = HistoricalRates.objects.latest()
+            assert record.last_update.isoformat() == exchange_api_result['lastupdate']
+            assert record.rates == expected_rates
+            assert HistoricalRates.objects.count() == 4
+
+    @pytest.mark.parametrize(
+        'at, converted_value, last_update',
+        [
+            ('2024-03-11T13:00:00Z', 5.1, '2024-03-11T12:00:00+00:00'),
+            ('2024-03-12T01:00:00+00:00', 5.2, '2024-03-12T12:00:00+00:00'),
+            ('2024-03-01T00:00:00', 5.0, '2024-03-10T12:00:00+00:00'),
+            ('2024-04-01T00:00:00', 5.2, '2024-03-12T12:00:00+00:00'),
+        ]
+    )
+    def test_get_conversion__at_timestamp(
+        self,
+        at: str,
+        converted_value: float,
+        last_update: str,
+    ) -> None:
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            result = client.get(
+                path=reverse('api.currency_conversion'),
+                data={'from': 'USD', 'to': 'BRL', 'amount': 1.0, 'at': at}
+            )
+            assert result.status_code == status.HTTP_200_OK
+            assert result.json()['converted_value'] == converted_value
+            assert result.json()['last_update'] == last_update
+
+            mock_get_api.assert_not_called()
+
+    def test_get_conversion__invalid_timestamp(self) -> None:
+        result = client.get(
+            path=reverse('api.currency_conversion'),
+            data={'from': 'USD', 'to': 'BRL', 'amount': 1.0, 'at': 'yesterday'}
+        )
+        assert result.status_code == status.HTTP_400_BAD_REQUEST
+        assert result.json() == {'error': 'The timestamp [yesterday] is a invalid value.'}
+
+    def test_get_async_conversion__at_timestamp(self) -> None:
+        result = async_to_sync(async_client.get)(
+            path=reverse('api.currency_conversion_async'),
+            data={'from': 'USD', 'to': 'BRL', 'amount': 2.0, 'at': '2024-03-12T00:00:00Z'},
+        )
+        assert result.status_code == status.HTTP_200_OK
+        assert result.json()['converted_value'] == 10.2
+
+
+class TestRatesHistory:
+    # ----------------------------------------------------------------------------------------------
+    #   /rates/history endpoint (GET)
+    # ----------------------------------------------------------------------------------------------
+    @pytest.fixture(autouse=True)
+    def historical_rates(self) -> None:
+        start = datetime.datetime(2024, 3, 10, 12, tzinfo=datetime.timezone.utc)
+        brl_rates = [5.0, 5.2, 4.8, 5.1, 5.4, 5.3, 5.5]
+        HistoricalRates.objects.bulk_create(
+            [
+                HistoricalRates(
+                    last_update=start + datetime.timedelta(minutes=20 * position),
+                    rates={'USD': 2.0, 'BRL': 2.0 * brl_rate},
+                )
+                for position, brl_rate in enumerate(brl_rates)
+            ]
+        )
+
+    @pytest.fixture
+    def expected_history(self) -> list[dict[str, Any]]:
+        return [
+            {
+                'start': '2024-03-10T12:00:00+00:00',
+                'open': 5.0,
+                'high': 5.2,
+                'low': 4.8,
+                'close': 4.8,
+                'mean': pytest.approx(5.0),
+                'count': 3,
+            },
+            {
+                'start': '2024-03-10T13:00:00+00:00',
+                'open': 5.1,
+                'high': 5.4,
+                'low': 5.1,
+                'close': 5.3,
+                'mean': pytest.approx(5.266666666),
+                'count': 3,
+            },
+            {
+                'start': '2024-03-10T14:00:00+00:00',
+                'open': 5.5,
+                'high': 5.5,
+                'low': 5.5,
+                'close': 5.5,
+                'mean': 5.5,
+                'count': 1,
+            },
+        ]
+
+    def get_history(self, **params) -> Any:
+        return client.get(
+            path=reverse('api.currency_rates_history'),
+            data={
+                'from': 'USD',
+                'to': 'BRL',
+                'start': '2024-03-10T12:00:00Z',
+                'end': '2024-03-11T00:00:00Z',
+                **params,
+            },
+        )
+
+    @pytest.mark.parametrize('chunk_size', [2, 2000])
+    def test_get_rates_history__general_case(
+        self,
+        settings,
+        expected_history: list[dict[str, Any]],
+        chunk_size: int,
+    ) -> None:
+        settings.RATES_HISTORY_CHUNK_SIZE = chunk_size
+
+        result = self.get_history(interval='1h')
+        assert result.status_code == status.HTTP_200_OK
+        assert result.streaming
+
+        assert json.loads(b''.join(result.streaming_content)) == expected_history
+
+    def test_get_rates_history__empty_window(self) -> None:
+        result = self.get_history(start='2024-03-01T00:00:00Z', end='2024-03-02T00:00:00Z')
+        assert result.status_code == status.HTTP_200_OK
+        assert json.loads(b''.join(result.streaming_content)) == []
+
+    def test_get_rates_history__missing_parameters(self) -> None:
+        result = client.get(
+            path=reverse('api.currency_rates_history'),
+            data={'from': 'USD', 'to': 'BRL'},
+        )
+        assert result.status_code == status.HTTP_400_BAD_REQUEST
+        assert result.json() == {'error': 'There are missing parameters on query string.'}
+
+    def test_get_rates_history__invalid_interval(self) -> None:
+        result = self.get_history(interval='1w')
+        assert result.status_code == status.HTTP_400_BAD_REQUEST
+        assert result.json() == {'error': 'The interval [1w] is a invalid value.'}
+
+    def test_get_rates_history__too_many_intervals(self, settings) -> None:
+        settings.RATES_HISTORY_MAX_INTERVALS = 10
+        result = self.get_history(interval='1h')
+        assert result.status_code == status.HTTP_400_BAD_REQUEST
+        assert result.json() == {'error': 'The number of intervals is limited to 10.'}
+
+    def test_get_rates_history__invalid_window(self) -> None:
+        result = self.get_history(end='2024-03-01T00:00:00Z')
+        assert result.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'The end must be after the start' in result.json()['error']
+
+
+class TestConversionBatch:
+    # ----------------------------------------------------------------------------------------------
+    #   /conversion/batch endpoint (POST)
+    # ----------------------------------------------------------------------------------------------
+    def test_post_conversion_batch__general_case(
+        self,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+        result = client.post(
+            path=reverse('api.currency_conversion_batch'),
+            data={
+                'from': ['USD', 'BTC', 'INEXISTENT', 'ETH', 'USD'],
+                'to': ['BRL', 'EUR', 'USD', 'USD', 'BRL'],
+                'amount': [2.0, 3.0, 1.0, 4.0, 'invalid'],
+            },
+            format='json',
+        )
+        assert result.status_code == status.HTTP_200_OK
+
+        expected_result = {
+            'converted_values': [10.026532, 196705.82579210727, None, 14252.759868789093, None],
+            'errors': [
+                {
+                    'index': 2,
+                    'error': 'The currency [INEXISTENT] is not available for conversion.',
+                },
+                {'index': 4, 'error': 'The amount [invalid] is a invalid value.'},
+            ],
+            'last_update': exchange_api_result['lastupdate'],
+        }
+        assert result.json() == expected_result
+
+    @pytest.mark.parametrize(
+        'batch',
+        [
+            {'from': ['USD'], 'to': ['BRL']},
+            {'from': 'USD', 'to': ['BRL'], 'amount': [1.0]},
+            [['USD', 'BRL', 1.0]],
+        ]
+    )
+    def test_post_conversion_batch__missing_arrays(self, batch: Any) -> None:
+        result = client.post(
+            path=reverse('api.currency_conversion_batch'),
+            data=batch,
+            format='json',
+        )
+        assert result.status_code == status.HTTP_400_BAD_REQUEST
+        assert result.json() == {'error': 'The `from`, `to` and `amount` arrays are required.'}
+
+    def test_post_conversion_batch__invalid_items(
+        self,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+        result = client.post(
+            path=reverse('api.currency_conversion_batch'),
+            data={
+                'from': [['USD'], {'USD': 1}, 'USD', 'USD', 'USD'],
+                'to': ['BRL', 'BRL', 7, 'BRL', 'BRL'],
+                'amount': [1.0, 1.0, 1.0, [1, 2], '2'],
+            },
+            format='json',
+        )
+        assert result.status_code == status.HTTP_200_OK
+
+        data = result.json()
+        assert data['converted_values'] == [None, None, None, None, 10.026532]
+        assert data['errors'] == [
+            {'index': 0, 'error': "The currency [['USD']] is not available for conversion."},
+            {'index': 1, 'error': "The currency [{'USD': 1}] is not available for conversion."},
+            {'index': 2, 'error': 'The currency [7] is not available for conversion.'},
+            {'index': 3, 'error': 'The amount [[1, 2]] is a invalid value.'},
+        ]
+
+    def test_post_conversion_batch__huge_integer_amount(
+        self,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+        huge_amount = 10 ** 400
+        result = client.post(
+            path=reverse('api.currency_conversion_batch'),
+            data={'from': ['USD', 'USD'], 'to': ['BRL', 'BRL'], 'amount': [huge_amount, 2]},
+            format='json',
+        )
+        assert result.status_code == status.HTTP_200_OK
+
+        data = result.json()
+        assert data['converted_values'] == [None, 10.026532]
+        assert data['errors'] == [
+            {'index': 0, 'error': f'The amount [{huge_amount}] is a invalid value.'},
+        ]
+
+    def test_post_conversion_batch__non_finite_values(
+        self,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+        result = client.post(
+            path=reverse('api.currency_conversion_batch'),
+            data={
+                'from': ['USD', 'USD', 'BTC', 'USD'],
+                'to': ['BRL', 'BRL', 'BRL', 'BRL'],
+                'amount': ['nan', '-inf', 1e308, 2.0],
+            },
+            format='json',
+        )
+        assert result.status_code == status.HTTP_200_OK
+
+        data = result.json()
+        assert data['converted_values'] == [None, None, None, 10.026532]
+        assert data['errors'] == [
+            {'index': 0, 'error': 'The amount [nan] is a invalid value.'},
+            {'index': 1, 'error': 'The amount [-inf] is a invalid value.'},
+            {'index': 2, 'error': 'The amount [1e+308] is a invalid value.'},
+        ]
+
+    @pytest.mark.parametrize('amounts', [[[1, 2]], [[1], [2]], [[1, 2], [3, 4]]])
+    def test_post_conversion_batch__nested_amounts(
+        self,
+        exchange_api_result: dict[str, Any],
+        amounts: list,
+    ) -> None:
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+        result = client.post(
+            path=reverse('api.currency_conversion_batch'),
+            data={'from': ['USD'] * len(amounts), 'to': ['BRL'] * len(amounts), 'amount': amounts},
+            format='json',
+        )
+        assert result.status_code == status.HTTP_200_OK
+        assert result.json()['converted_values'] == [None] * len(amounts)
+
+    def test_post_conversion_batch__different_sizes(self) -> None:
+        result = client.post(
+            path=reverse('api.currency_conversion_batch'),
+            data={'from': ['USD', 'BTC'], 'to': ['BRL'], 'amount': [1.0, 2.0]},
+            format='json',
+        )
+        assert result.status_code == status.HTTP_400_BAD_REQUEST
+        assert result.json() == {
+            'error': 'The `from`, `to` and `amount` arrays must have the same size.'}
+
+    def test_post_conversion_batch__too_large(self, settings) -> None:
+        settings.BATCH_CONVERSION_MAX_SIZE = 2
+        result = client.post(
+            path=reverse('api.currency_conversion_batch'),
+            data={'from': ['USD'] * 3, 'to': ['BRL'] * 3, 'amount': [1.0] * 3},
+            format='json',
+        )
+        assert result.status_code == status.HTTP_400_BAD_REQUEST
+        assert result.json() == {'error': 'The batch size is limited to 2.'}
+
+    def test_post_conversion_batch__body_too_large(self, settings) -> None:
+        settings.BATCH_CONVERSION_MAX_BODY_SIZE = 100
+        result = client.post(
+            path=reverse('api.currency_conversion_batch'),
+            data={'from': ['USD'] * 10, 'to': ['BRL'] * 10, 'amount': [1.0] * 10},
+            format='json',
+        )
+        assert result.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        assert result.json() == {'error': 'The request body is limited to 100 bytes.'}
+
+
+class TestConversionFile:
+    # ----------------------------------------------------------------------------------------------
+    #   /conversion/file endpoint (POST) and `convert_file` command
+    # ----------------------------------------------------------------------------------------------
+    @pytest.fixture(autouse=True)
+    def published_snapshot(self, exchange_api_result: dict[str, Any]) -> None:
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+
+    @pytest.fixture
+    def csv_input(self) -> str:
+        return 'from,to,amount\nUSD,BRL,2.0\nINEXISTENT,BRL,1\nETH,USD,4\nUSD,EUR,invalid\n'
+
+    @pytest.fixture
+    def expected_csv_output(self) -> str:
+        return (
+            'from,to,amount,converted_value,error\r\n'
+            'USD,BRL,2.0,10.026532,\r\n'
+            'INEXISTENT,BRL,1,,The currency [INEXISTENT] is not available for conversion.\r\n'
+            'ETH,USD,4,14252.759868789093,\r\n'
+            'USD,EUR,invalid,,The amount [invalid] is a invalid value.\r\n'
+        )
+
+    @pytest.mark.parametrize('chunk_size', [1, 3, 10_000])
+    def test_post_conversion_file__csv(
+        self,
+        settings,
+        csv_input: str,
+        expected_csv_output: str,
+        chunk_size: int,
+    ) -> None:
+        settings.FILE_CONVERSION_CHUNK_SIZE = chunk_size
+        result = client.post(
+            path=reverse('api.currency_conversion_file'),
+            data=csv_input,
+            content_type='text/csv',
+        )
+        assert result.status_code == status.HTTP_200_OK
+        assert result.streaming
+        assert result['Content-Type'] == 'text/csv'
+        assert b''.join(result.streaming_content).decode() == expected_csv_output
+
+    def test_post_conversion_file__jsonl(self) -> None:
+        jsonl_input = '{"from": "USD", "to": "BRL", "amount": 2.0}\ninvalid json\n\n[1]\n'
+        result = client.post(
+            path=reverse('api.currency_conversion_file') + '?input_format=jsonl',
+            data=jsonl_input,
+            content_type='application/x-ndjson',
+        )
+        assert result.status_code == status.HTTP_200_OK
+
+        output_rows = [
+            json.loads(line) for line in b''.join(result.streaming_content).decode().splitlines()
+        ]
+        assert output_rows[0] == {
+            'from': 'USD', 'to': 'BRL', 'amount': 2.0, 'converted_value': 10.026532, 'error': None}
+        assert output_rows[1]['converted_value'] is None
+        assert 'Invalid JSON' in output_rows[1]['error']
+        assert output_rows[2]['error'] == 'Invalid row: a JSON object is required.'
+        assert len(output_rows) == 3
+
+    def test_post_conversion_file__jsonl_huge_integer_amount(self) -> None:
+        huge_amount = '1' + '0' * 400
+        jsonl_input = (
+            f'{{"from": "USD", "to": "BRL", "amount": {huge_amount}}}\n'
+            '{"from": "USD", "to": "BRL", "amount": 2.0}\n'
+        )
+        result = client.post(
+            path=reverse('api.currency_conversion_file') + '?input_format=jsonl',
+            data=jsonl_input,
+            content_type='application/x-ndjson',
+        )
+        assert result.status_code == status.HTTP_200_OK
+
+        output_rows = [
+            json.loads(line) for line in b''.join(result.streaming_content).decode().splitlines()
+        ]
+        assert output_rows[0]['converted_value'] is None
+        assert output_rows[0]['error'] == f'The amount [{huge_amount}] is a invalid value.'
+        assert output_rows[1]['converted_value'] == 10.026532
+
+    def test_post_conversion_file__failed_chunk(self) -> None:
+        convert_batch = logic.convert_batch
+
+        def convert_batch_failing_on_boom(**kwargs) -> logic.OutputStatus:
+            if 'boom' in kwargs['amounts']:
+                raise RuntimeError('Unexpected amount.')
+            return convert_batch(**kwargs)
+
+        csv_input = 'from,to,amount\nUSD,BRL,2.0\nUSD,BRL,boom\nUSD,BRL,1.0\n'
+        with mock.patch.object(
+            target=files, attribute='convert_batch', side_effect=convert_batch_failing_on_boom):
+            result = client.post(
+                path=reverse('api.currency_conversion_file'),
+                data=csv_input,
+                content_type='text/csv',
+            )
+            output_rows = list(csv.DictReader(
+                b''.join(result.streaming_content).decode().splitlines()))
+
+        assert [row['converted_value'] for row in output_rows] == ['10.026532', '', '5.013266']
+        assert output_rows[1]['error'] == 'Invalid row: it could not be converted.'
+
+    def test_post_conversion_file__jsonl_nested_values(self) -> None:
+        jsonl_input = (
+            '{"from": ["USD"], "to": "BRL", "amount": 2.0}\n'
+            '{"from": "USD", "to": "BRL", "amount": [1, 2]}\n'
+        )
+        result = client.post(
+            path=reverse('api.currency_conversion_file') + '?input_format=jsonl',
+            data=jsonl_input,
+            content_type='application/x-ndjson',
+        )
+        assert result.status_code == status.HTTP_200_OK
+
+        output_rows = [
+            json.loads(line) for line in b''.join(result.streaming_content).decode().splitlines()
+        ]
+        assert [row['converted_value'] for row in output_rows] == [None, None]
+        assert output_rows[0]['error'] == "The currency [['USD']] is not available for conversion."
+        assert output_rows[1]['error'] == 'The amount [[1, 2]] is a invalid value.'
+
+    def test_post_conversion_file__invalid_format(self) -> None:
+        result = client.post(
+            path=reverse('api.currency_conversion_file') + '?output_format=xlsx',
+            data='',
+            content_type='text/csv',
+        )
+        assert result.status_code == status.HTTP_400_BAD_REQUEST
+        assert result.json() == {'error': 'The file format [xlsx] is not supported.'}
+
+    def test_post_conversion_file__empty(self) -> None:
+        result = client.post(
+            path=reverse('api.currency_conversion_file'),
+            data='',
+            content_type='text/csv',
+            CONTENT_LENGTH='0',
+        )
+        assert result.status_code == status.HTTP_200_OK
+        assert b''.join(result.streaming_content) == b'from,to,amount,converted_value,error\r\n'
+
+    def test_post_conversion_file__length_required(self, csv_input: str) -> None:
+        result = client.post(
+            path=reverse('api.currency_conversion_file'),
+            data=csv_input,
+            content_type='text/csv',
+            CONTENT_LENGTH='',
+        )
+        assert result.status_code == status.HTTP_411_LENGTH_REQUIRED
+        assert result.json() == {'error': 'The Content-Length header is required.'}
+
+    def test_convert_file_command(
+        self,
+        tmp_path,
+        csv_input: str,
+        expected_csv_output: str,
+    ) -> None:
+        input_path = tmp_path / 'input.csv'
+        input_path.write_text(csv_input)
+        output_path = tmp_path / 'output.jsonl'
+
+        call_command('convert_file', str(input_path), str(output_path), '--chunk-size', '2')
+
+        output_rows = [json.loads(line) for line in output_path.read_text().splitlines()]
+        assert [row['converted_value'] for row in output_rows] == [
+            10.026532, None, 14252.759868789093, None]
+
+
+class TestRatesMatrix:
+    # ----------------------------------------------------------------------------------------------
+    #   /rates/matrix endpoint (GET)
+    # ----------------------------------------------------------------------------------------------
+    @pytest.fixture(autouse=True)
+    def published_snapshot(self) -> None:
+        publish_snapshot(
+            last_update='2024-03-28T21:19:45.133000+00:00',
+            rates={'USD': 1.0, 'BRL': 5.0, 'EUR': 0.8},
+        )
+
+    def test_get_rates_matrix__full_matrix(self) -> None:
+        result = client.get(path=reverse('api.currency_rates_matrix'))
+        assert result.status_code == status.HTTP_200_OK
+
+        expected_result = {
+            'currencies': ['USD', 'BRL', 'EUR'],
+            'matrix': [
+                [1.0, 5.0, 0.8],
+                [0.2, 1.0, 0.16],
+                [1.25, 6.25, 1.0],
+            ],
+            'last_update': '2024-03-28T21:19:45.133000+00:00',
+        }
+        assert result.json() == expected_result
+
+    def test_get_rates_matrix__row(self) -> None:
+        result = client.get(path=reverse('api.currency_rates_matrix'), data={'from': 'EUR'})
+        assert result.status_code == status.HTTP_200_OK
+
+        expected_result = {
+            'from_currency': 'EUR',
+            'rates': {'USD': 1.25, 'BRL': 6.25, 'EUR': 1.0},
+            'last_update': '2024-03-28T21:19:45.133000+00:00',
+        }
+        assert result.json() == expected_result
+
+    def test_get_rates_matrix__column(self) -> None:
+        result = client.get(path=reverse('api.currency_rates_matrix'), data={'to': 'BRL'})
+        assert result.status_code == status.HTTP_200_OK
+
+        expected_result = {
+            'to_currency': 'BRL',
+            'rates': {'USD': 5.0, 'BRL': 1.0, 'EUR': 6.25},
+            'last_update': '2024-03-28T21:19:45.133000+00:00',
+        }
+        assert result.json() == expected_result
+
+    def test_get_rates_matrix__pair(self) -> None:
+        result = client.get(
+            path=reverse('api.currency_rates_matrix'),
+            data={'from': 'BRL', 'to': 'EUR'},
+        )
+        assert result.status_code == status.HTTP_200_OK
+        assert result.json()['rate'] == 0.16
+
+    def test_get_rates_matrix__inexistent_currency(self) -> None:
+        result = client.get(
+            path=reverse('api.currency_rates_matrix'),
+            data={'from': 'INEXISTENT'},
+        )
+        assert result.status_code == status.HTTP_400_BAD_REQUEST
+        assert result.json() == {
+            'error': 'The currency [INEXISTENT] is not available for conversion.'}
+
+
+class TestAsyncConversion:
+    # ----------------------------------------------------------------------------------------------
+    #   /conversion/async endpoint (GET)
+    # ----------------------------------------------------------------------------------------------
+    def test_get_async_conversion__general_case(
+        self,
+        exchange_api_result: dict[str, Any],
+        httpx_get_request: httpx.Request,
+    ) -> None:
+        with mock.patch.object(
+            target=httpx.AsyncClient,
+            attribute='get',
+            new_callable=mock.AsyncMock,
+        ) as mock_get_api:
+            mock_get_api.return_value = httpx.Response(
+                json=exchange_api_result,
+                status_code=status.HTTP_200_OK,
+                request=httpx_get_request,
+            )
+
+            result = async_to_sync(async_client.get)(
+                path=reverse('api.currency_conversion_async'),
+                data={'from': 'USD', 'to': 'BRL', 'amount': 2.0},
+            )
+            assert result.status_code == status.HTTP_200_OK
+
+            expected_result = {
+                'from_currency': 'USD',
+                'to_currency': 'BRL',
+                'amount': 2.0,
+                'converted_value': 10.026532,
+                'last_update': exchange_api_result['lastupdate'],
+            }
+            assert result.json() == expected_result
+            assert get_snapshot() is not None
+
+    def test_get_async_conversion__published_snapshot(
+        self,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+        with mock.patch.object(
+            target=httpx.AsyncClient,
+            attribute='get',
+            new_callable=mock.AsyncMock,
+        ) as mock_get_api:
+            result = async_to_sync(async_client.get)(
+                path=reverse('api.currency_conversion_async'),
+                data={'from': 'ETH', 'to': 'USD', 'amount': 4.0},
+            )
+            assert result.status_code == status.HTTP_200_OK
+            assert result.json()['converted_value'] == 14252.759868789093
+
+            mock_get_api.assert_not_called()
+
+    def test_get_async_conversion__missing_parameters(self) -> None:
+        result = async_to_sync(async_client.get)(
+            path=reverse('api.currency_conversion_async'),
+            data={'from': 'USD', 'to': 'BRL'},
+        )
+        assert result.status_code == status.HTTP_400_BAD_REQUEST
+        assert result.json() == {'error': 'There are missing parameters on query string.'}
+
+    def test_get_async_conversion__external_api_error(
+        self,
+        httpx_get_request: httpx.Request,
+    ) -> None:
+        with mock.patch.object(
+            target=httpx.AsyncClient,
+            attribute='get',
+            new_callable=mock.AsyncMock,
+        ) as mock_get_api:
+            mock_get_api.return_value = httpx.Response(
+                content='invalid json',
+                status_code=status.HTTP_200_OK,
+                request=httpx_get_request,
+            )
+
+            result = async_to_sync(async_client.get)(
+                path=reverse('api.currency_conversion_async'),
+                data={'from': 'USD', 'to': 'BRL', 'amount': 1.0},
+            )
+            assert result.status_code == status.HTTP_400_BAD_REQUEST
+            assert 'Invalid JSON' in result.json()['error']
+
+
+# ==================================================================================================
+#   Live rates streams
+# ==================================================================================================
+def _parse_event(event: bytes) -> tuple[str, dict[str, Any]]:
+    """Server-Sent Event name and (JSON) data."""
+    fields = dict(line.split(': ', 1) for line in event.decode().strip().split('\n'))
+    return fields['event'], json.loads(fields['data'])
+
+
+class TestRatesStream:
+    # ----------------------------------------------------------------------------------------------
+    #   Rates streams
+    # ----------------------------------------------------------------------------------------------
+    def test_stream_rates__snapshot_and_deltas(
+        self,
+        settings,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        settings.RATES_STREAM_POLL_INTERVAL = 0.01
+        rates = exchange_api_result['rates']
+        publish_snapshot(last_update=exchange_api_result['lastupdate'], rates=rates)
+
+        async def receive_events() -> list[bytes]:
+            stream = stream_rates(currencies=['BRL', 'EUR'])
+            events = [await anext(stream)]
+            # Unchanged rates of the streamed currencies don't produce events
+            await apublish_snapshot(
+                last_update=exchange_api_result['lastupdate'], rates={**rates, 'AUD': 1.6})
+            await apublish_snapshot(
+                last_update=exchange_api_result['lastupdate'], rates={**rates, 'BRL': 5.1})
+            events.append(await anext(stream))
+            await stream.aclose()
+            return events
+
+        (snapshot_event, snapshot_data), (delta_event, delta_data) = map(
+            _parse_event, async_to_sync(receive_events)())
+        assert snapshot_event == 'snapshot'
+        assert snapshot_data['rates'] == {'BRL': rates['BRL'], 'EUR': rates['EUR']}
+        assert snapshot_data['last_update'] == exchange_api_result['lastupdate']
+        assert delta_event == 'delta'
+        assert delta_data['rates'] == {'BRL': 5.1}
+        assert delta_data['version'] == snapshot_data['version'] + 2
+
+    def test_stream_rates__base_currency(self, exchange_api_result: dict[str, Any]) -> None:
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+
+        async def receive_event() -> bytes:
+            stream = stream_rates(currencies=['USD', 'BRL'], base='BRL')
+            event = await anext(stream)
+            await stream.aclose()
+            return event
+
+        event, data = _parse_event(async_to_sync(receive_event)())
+        assert event == 'snapshot'
+        assert data['rates'] == {'USD': 1 / 5.013266, 'BRL': 1.0}
+
+    def test_stream_rates__keepalive(
+        self,
+        settings,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        settings.RATES_STREAM_KEEPALIVE_INTERVAL = 0.01
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+
+        async def receive_events() -> list[bytes]:
+            stream = stream_rates()
+            events = [await anext(stream), await anext(stream)]
+            await stream.aclose()
+            return events
+
+        snapshot_event, keepalive_event = async_to_sync(receive_events)()
+        assert _parse_event(snapshot_event)[0] == 'snapshot'
+        assert keepalive_event == b': keep-alive\n\n'
+
+    def test_stream_rates__failed_poll(
+        self,
+        settings,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        settings.RATES_STREAM_POLL_INTERVAL = 0.01
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+        lookups = []
+
+        async def failing_once(*args, **kwargs) -> Any:
+            lookups.append(True)
+            if len(lookups) == 1:
+                raise RedisConnectionError('Connection refused.')
+            return await logic.aget_rates_snapshot(*args, **kwargs)
+
+        async def receive_event() -> bytes:
+            stream = stream_rates()
+            event = await asyncio.wait_for(anext(stream), timeout=5)
+            await stream.aclose()
+            return event
+
+        with mock.patch.object(
+            target=streams, attribute='aget_rates_snapshot', side_effect=failing_once):
+            event, data = _parse_event(async_to_sync(receive_event)())
+
+        assert len(lookups) == 2
+        assert event == 'snapshot'
+        assert data['rates']['BRL'] == exchange_api_result['rates']['BRL']
+
+    def test_stream_rates__shared_poll(self, exchange_api_result: dict[str, Any]) -> None:
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+
+        async def receive_events() -> tuple[int, int]:
+            streams = [stream_rates() for _ in range(100)]
+            for stream in streams:
+                await anext(stream)
+            broadcaster = get_rates_broadcaster()
+            subscribers = broadcaster.subscribers
+            for stream in streams:
+                await stream.aclose()
+            return subscribers, broadcaster.subscribers
+
+        with mock.patch.object(
+            target=logic,
+            attribute='aget_snapshot',
+            wraps=logic.aget_snapshot,
+        ) as mock_aget_snapshot:
+            assert async_to_sync(receive_events)() == (100, 0)
+            assert mock_aget_snapshot.call_count == 1
+
+    # ----------------------------------------------------------------------------------------------
+    #   /rates/stream endpoint (GET)
+    # ----------------------------------------------------------------------------------------------
+    def test_get_rates_stream__general_case(self, exchange_api_result: dict[str, Any]) -> None:
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+
+        async def receive_event() -> tuple[Any, bytes]:
+            result = await async_client.get(
+                path=reverse('api.currency_rates_stream'),
+                data={'currencies': 'BTC,ETH'},
+            )
+            stream = aiter(result.streaming_content)
+            event = await anext(stream)
+            await stream.aclose()
+            return result, event
+
+        result, event = async_to_sync(receive_event)()
+        assert result.status_code == status.HTTP_200_OK
+        assert result['Content-Type'] == 'text/event-stream'
+        assert result['Cache-Control'] == 'no-cache'
+        assert _parse_event(event)[1]['rates'] == {
+            'BTC': exchange_api_result['rates']['BTC'],
+            'ETH': exchange_api_result['rates']['ETH'],
+        }
+
+    def test_get_rates_stream__wsgi(self) -> None:
+        result = client.get(path=reverse('api.currency_rates_stream'))
+        assert result.status_code == status.HTTP_501_NOT_IMPLEMENTED
+        assert result.json() == {'error': 'The rates stream is only available on the ASGI server.'}
+
+    def test_get_rates_stream__invalid_currency(self) -> None:
+        result = async_to_sync(async_client.get)(
+            path=reverse('api.currency_rates_stream'),
+            data={'currencies': 'BRL,XXX'},
+        )
+        assert result.status_code == status.HTTP_400_BAD_REQUEST
+        assert result.json() == {'error': 'The currency [XXX] is not available for conversion.'}
+
+
+# ==================================================================================================
+#   JSON rendering
+# ==================================================================================================
+class TestORJSONRenderer:
+    @pytest.mark.parametrize(
+        argnames='data',
+        argvalues=[
+            {'from_currency': 'BTC', 'amount': 1e-05, 'converted_value': 196705.82579210727},
+            {'converted_values': [1e16, 0.1, None], 'errors': [{'index': 2, 'error': 'Invalid'}]},
+            {'rates': [1.4135743e-05, 0.000099, 0.0001, 2.5e-10, 5e-324, 1e-07]},
+            {'rates': [1e15, 123456789012345.6, 1.5e16, 1e22, 1.7976931348623157e308, -1e-05]},
+            {'converted_value': 10.026532, 'amount': 2, 'text': 'rate 1e5 0.00001'},
+            {'last_update': datetime.datetime(2024, 3, 28, 21, 19, 45, 133000, datetime.UTC)},
+            {'amount': decimal.Decimal('1.25'), 1: 'int key', 'text': 'ação\u2028'},
+            [gettext_lazy('This field is required.')],
+        ],
+    )
+    def test_render__same_as_json_renderer(self, data: Any) -> None:
+        rendered = ORJSONRenderer().render(data=data)
+
+        assert rendered == JSONRenderer().render(data=data)
+        assert b'\xe2\x80\xa8' not in rendered
+
+    @pytest.mark.parametrize(
+        argnames='data',
+        argvalues=[
+            {'converted_value': float('nan')},
+            {'converted_values': [1.0, None, float('inf')]},
+            [{'rates': [-float('inf')]}],
+        ],
+    )
+    def test_render__non_finite_floats(self, data: Any) -> None:
+        with pytest.raises(ValueError, match='Out of range float values'):
+            JSONRenderer().render(data=data)
+        with pytest.raises(ValueError, match='Out of range float values'):
+            ORJSONRenderer().render(data=data)
+
+    def test_render__orjson_floats(self) -> None:
+        data = {'rates': [1.534728, 5.013266, 0.926861, None], 'amount': 1e15}
+
+        with mock.patch.object(target=JSONRenderer, attribute='render') as mock_render:
+            assert ORJSONRenderer().render(data=data) == (
+                b'{"rates":[1.534728,5.013266,0.926861,null],"amount":1000000000000000.0}')
+            mock_render.assert_not_called()
+
+    def test_render__indent(self) -> None:
+        data = {'amount': 1.0, 'currencies': ['USD', 'BRL']}
+
+        assert (
+            ORJSONRenderer().render(data=data, accepted_media_type='application/json; indent=4') ==
+            JSONRenderer().render(data=data, accepted_media_type='application/json; indent=4')
+        )
+
+    def test_get_conversion__rendered_with_orjson(
+        self,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+
+        with mock.patch.object(target=orjson, attribute='dumps', wraps=orjson.dumps) as mock_dumps:
+            result = client.get(
+                path=reverse('api.currency_conversion'),
+                data={'from': 'USD', 'to': 'BRL', 'amount': 2.0},
+            )
+
+        assert result.status_code == status.HTTP_200_OK
+        assert result.content == (
+            b'{"from_currency":"USD","amount":2.0,"to_currency":"BRL",'
+            b'"converted_value":10.026532,"last_update":"2024-03-28T21:19:45.133000+00:00"}'
+        )
+        mock_dumps.assert_called_once()
+
+
+# ==================================================================================================
+#   Cache invalidation
+# ==================================================================================================
+class TestCacheInvalidation:
+    def test_cache_clear__scope(
+        self,
+        django_assert_num_queries,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+        Currency.cached_acronyms_list()
+        rates_version = rates_namespace.version()
+
+        result = client.post(path=f'{reverse("api.cache_clear")}?scope=rates')
+        assert result.status_code == status.HTTP_200_OK
+        assert result.json() == {'cache_cleared': True, 'versions': {'rates': rates_version + 1}}
+
+        assert get_snapshot() is None
+        with django_assert_num_queries(0):
+            Currency.cached_acronyms_list()
+
+    def test_cache_clear__all_scopes(self, django_assert_num_queries) -> None:
+        Currency.cached_acronyms_list()
+
+        result = client.post(path=reverse('api.cache_clear'))
+        assert result.status_code == status.HTTP_200_OK
+        assert list(result.json()['versions']) == ['currencies', 'rates', 'responses']
+
+        with django_assert_num_queries(1):
+            Currency.cached_acronyms_list()
+
+    def test_cache_clear__invalid_scope(self) -> None:
+        result = client.post(path=f'{reverse("api.cache_clear")}?scope=everything')
+        assert result.status_code == status.HTTP_400_BAD_REQUEST
+        assert result.json() == {'error': 'The cache scope [everything] is not available.'}
+
+    def test_cache_clear__rewarm(self) -> None:
+        with mock.patch.object(
+            target=views, attribute='invalidate_cache_in_background') as mock_invalidate:
+            result = client.post(path=f'{reverse("api.cache_clear")}?scope=rates&rewarm=true')
+            assert result.status_code == status.HTTP_202_ACCEPTED
+            mock_invalidate.assert_called_once_with(scopes=['rates'])
+
+    def test_cache_clear__responses_etag(self, exchange_api_result: dict[str, Any]) -> None:
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+        data = {'from': 'USD', 'to': 'BRL', 'amount': 2.0}
+        etag = client.get(path=reverse('api.currency_conversion'), data=data)['ETag']
+
+        client.post(path=f'{reverse("api.cache_clear")}?scope=responses')
+
+        result = client.get(
+            path=reverse('api.currency_conversion'), data=data, HTTP_IF_NONE_MATCH=etag)
+        assert result.status_code == status.HTTP_200_OK
+        assert result['ETag'] != etag
+
+    def test_invalidate_cache__rewarm(
+        self,
+        exchange_api_result: dict[str, Any],
+        expected_rates: dict[str, Any],
+    ) -> None:
+        snapshot = publish_snapshot(last_update='2024-03-27T10:00:00+00:00', rates={'USD': 1.0})
+
+        def warm_rates() -> None:
+            # Warmed on the next version while the current snapshot is still served
+            with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get:
+                mock_get.return_value.content = json.dumps(exchange_api_result).encode()
+                logic._warm_rates()
+            assert get_snapshot().rates == expected_rates
+            assert get_snapshot_on_other_thread() == snapshot
+
+        def get_snapshot_on_other_thread() -> RatesSnapshot | None:
+            result = []
+            thread = threading.Thread(target=lambda: result.append(get_snapshot()))
+            thread.start()
+            thread.join()
+            return result[0]
+
+        with mock.patch.dict(in_dict=logic.CACHE_WARMERS, values={'rates': warm_rates}):
+            logic.invalidate_cache(scopes=['rates'], rewarm=True)
+
+        warmed_snapshot = get_snapshot()
+        assert warmed_snapshot.rates == expected_rates
+        assert warmed_snapshot.version > snapshot.version
+
+    def test_invalidate_cache__last_known_good(
+        self,
+        exchange_api_result: dict[str, Any],
+        expected_rates: dict[str, Any],
+        last_known_good_file: Path,
+    ) -> None:
+        snapshot = publish_snapshot(last_update='2024-03-27T10:00:00+00:00', rates={'USD': 1.0})
+        save_last_known_good(snapshot=snapshot)
+
+        client.post(path=f'{reverse("api.cache_clear")}?scope=rates')
+        assert not last_known_good_file.exists()
+
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
+            snapshot_status = get_rates_snapshot()
+
+        assert snapshot_status.status == 'ok'
+        assert snapshot_status.data['snapshot'].rates == expected_rates
+        assert load_last_known_good() == snapshot_status.data['snapshot']
+
+    def test_namespace__check_interval(self, settings) -> None:
+        other_worker_namespace = CacheNamespace(name='rates')
+        version = other_worker_namespace.version()
+
+        rates_namespace.invalidate()
+        assert other_worker_namespace.version() == version
+
+        settings.CACHE_NAMESPACE_CHECK_INTERVAL = 0
+        assert other_worker_namespace.version() == version + 1
+
+    def test_namespace__cache_unavailable(self, settings) -> None:
+        settings.CACHE_NAMESPACE_CHECK_INTERVAL = 0
+        other_worker_namespace = CacheNamespace(name='rates')
+        version = other_worker_namespace.version()
+
+        unavailable_cache = RedisCache(server='redis://127.0.0.1:1', params={})
+        with mock.patch.object(
+            target=namespaces, attribute='caches', new={'default': unavailable_cache}):
+            assert other_worker_namespace.version() == version
+            assert async_to_sync(other_worker_namespace.aversion)() == version
+
+
+# ==================================================================================================
+#   Admission control
+# ==================================================================================================
+class TestAdmissionControl:
+    @pytest.fixture
+    def redis_cache(self) -> Any:
+        """Redis default cache (never connected) with a mocked token buckets script."""
+        redis_cache = RedisCache(server='redis://127.0.0.1:1', params={})
+        with (
+            mock.patch.object(target=admission, attribute='caches', new={'default': redis_cache}),
+            mock.patch.object(target=admission, attribute='_token_buckets_script') as mock_script,
+        ):
+            yield mock_script.return_value
+
+    def test_conversion__concurrency_shed(self, settings) -> None:
+        settings.ADMISSION_MAX_CONCURRENCY = 0
+        admission_rejections.clear()
+
+        result = client.get(
+            path=reverse('api.currency_conversion'),
+            data={'from': 'USD', 'to': 'BRL', 'amount': 1.0},
+        )
+        assert result.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert result['Retry-After'] == '1'
+
+        result = async_to_sync(async_client.get)(
+            path=reverse('api.currency_conversion_async'),
+            data={'from': 'USD', 'to': 'BRL', 'amount': 1.0},
+        )
+        assert result.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert admission_rejections.value(reason='concurrency') == 2
+
+    def test_conversion__disabled(
+        self,
+        settings,
+        redis_cache: mock.Mock,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        settings.ADMISSION_ENABLED = False
+        settings.ADMISSION_MAX_CONCURRENCY = 0
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+
+        result = client.get(
+            path=reverse('api.currency_conversion'),
+            data={'from': 'USD', 'to': 'BRL', 'amount': 1.0},
+        )
+        assert result.status_code == status.HTTP_200_OK
+
+        result = async_to_sync(async_client.get)(
+            path=reverse('api.currency_conversion_async'),
+            data={'from': 'USD', 'to': 'BRL', 'amount': 1.0},
+        )
+        assert result.status_code == status.HTTP_200_OK
+        redis_cache.assert_not_called()
+
+    def test_conversion__client_rate_limited(self, redis_cache: mock.Mock) -> None:
+        redis_cache.return_value = [0, b'1.2', 1]
+
+        result = client.get(
+            path=reverse('api.currency_conversion'),
+            data={'from': 'USD', 'to': 'BRL', 'amount': 1.0},
+            REMOTE_ADDR='10.0.0.1',
+        )
+        assert result.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert result['Retry-After'] == '2'
+        assert result.json() == {'error': 'Too many requests, try again later.'}
+
+        keys = redis_cache.call_args.kwargs['keys']
+        assert keys[0].endswith(':10.0.0.1')
+        assert len(keys) == 2
+
+    def test_conversion__global_rate_limited(self, redis_cache: mock.Mock) -> None:
+        redis_cache.return_value = [0, b'0.01', 2]
+
+        result = async_to_sync(async_client.get)(
+            path=reverse('api.currency_conversion_async'),
+            data={'from': 'USD', 'to': 'BRL', 'amount': 1.0},
+        )
+        assert result.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert result['Retry-After'] == '1'
+
+    def test_conversion__admitted(
+        self,
+        redis_cache: mock.Mock,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+        redis_cache.return_value = [1, b'0', 0]
+
+        result = client.get(
+            path=reverse('api.currency_conversion'),
+            data={'from': 'USD', 'to': 'BRL', 'amount': 1.0},
+        )
+        assert result.status_code == status.HTTP_200_OK
+        redis_cache.assert_called_once()
+
+        # Redis failures don't reject requests
+        redis_cache.side_effect = RedisConnectionError
+        result = client.get(
+            path=reverse('api.currency_conversion'),
+            data={'from': 'USD', 'to': 'BRL', 'amount': 1.0},
+        )
+        assert result.status_code == status.HTTP_200_OK
+
+    def test_conversion_file__in_flight_until_closed(
+        self,
+        exchange_api_result: dict[str, Any],
+    ) -> None:
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+        in_flight = admission._in_flight
+
+        result = client.post(
+            path=reverse('api.currency_conversion_file') + '?input_format=jsonl',
+            data='{"from": "USD", "to": "BRL", "amount": 2.0}\n',
+            content_type='application/x-ndjson',
+        )
+        assert result.status_code == status.HTTP_200_OK
+        # The file is converted while the response is sent
+        assert admission._in_flight == in_flight + 1
+
+        assert b'10.026532' in b''.join(result.streaming_content)
+        assert admission._in_flight == in_flight
+
+        # The client disconnects before the file is sent
+        result = client.post(
+            path=reverse('api.currency_conversion_file') + '?input_format=jsonl',
+            data='{"from": "USD", "to": "BRL", "amount": 2.0}\n',
+            content_type='application/x-ndjson',
+        )
+        assert admission._in_flight == in_flight + 1
+        result.close()
+        assert admission._in_flight == in_flight
+
+    # ----------------------------------------------------------------------------------------------
+    #   Token buckets script
+    # ----------------------------------------------------------------------------------------------
+    @pytest.mark.parametrize(
+        argnames='buckets,expected_result,expected_tokens',
+        argvalues=[
+            # Missing (full) buckets
+            ([None, None], [1, b'0', 0], [4.0, 9.0]),
+            # Refilled up to the burst
+            ([(0.0, 0.0), (0.0, 0.0)], [1, b'0', 0], [4.0, 9.0]),
+            # Updated by a clock ahead of the Redis one (nothing is refilled)
+            ([(1.5, 4e9), (0.5, 4e9)], [0, b'0.5', 2], [1.5, 0.5]),
+            # The longest wait is returned and no token is taken
+            ([(0.5, 4e9), (0.0, 4e9)], [0, b'1', 2], [0.5, 0.0]),
+            ([(0.0, 4e9), (5.0, 4e9)], [0, b'0.5', 1], [0.0, 5.0]),
+        ],
+    )
+    def test_token_buckets_script(
+        self,
+        fake_redis_cache: RedisCache,
+        buckets: list[tuple[float, float] | None],
+        expected_result: list,
+        expected_tokens: list[float],
+    ) -> None:
+        redis_client = fake_redis_cache._cache.get_client(write=True)
+        keys = ['client_bucket', 'global_bucket']
+        for key, bucket in zip(keys, buckets):
+            if bucket is not None:
+                redis_client.hset(key, mapping={'tokens': bucket[0], 'updated': bucket[1]})
+
+        # Client bucket: 2 tokens/s up to 5, global bucket: 1 token/s up to 10
+        result = admission._token_buckets_script(cache=fake_redis_cache)(
+            keys=keys, args=[2, 5, 1, 10])
+
+        assert result == expected_result
+        assert [float(redis_client.hget(key, 'tokens')) for key in keys] == expected_tokens
+        if result[0]:
+            assert 0 < redis_client.ttl('client_bucket') <= 4
+
+    def test_token_buckets_script__refill(self, fake_redis_cache: RedisCache) -> None:
+        redis_client = fake_redis_cache._cache.get_client(write=True)
+        redis_client.hset('client_bucket', mapping={'tokens': 0, 'updated': time.time() - 1})
+
+        admitted, _, _ = admission._token_buckets_script(cache=fake_redis_cache)(
+            keys=['client_bucket'], args=[2, 5])
+
+        assert admitted == 1
+        assert float(redis_client.hget('client_bucket', 'tokens')) == pytest.approx(1, abs=0.1)
+
+    def test_take_tokens__client_rate_limited(self, settings, fake_redis_cache: RedisCache) -> None:
+        settings.ADMISSION_CLIENT_RATE = 1
+        settings.ADMISSION_CLIENT_BURST = 2
+
+        with mock.patch.object(
+            target=admission, attribute='caches', new={'default': fake_redis_cache}):
+            admissions = [admission.take_tokens(client_id='10.0.0.1') for _ in range(3)]
+            other_client_admission = admission.take_tokens(client_id='10.0.0.2')
+
+        assert [admission.admitted for admission in admissions] == [True, True, False]
+        assert admissions[2].reason == 'client_rate'
+        assert admissions[2].status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert 0 < admissions[2].retry_after <= 1
+        assert other_client_admission.admitted
+
+
+# ==================================================================================================
+#   Metrics
+# ==================================================================================================
+class TestMetrics:
+    def test_histogram__render(self) -> None:
+        histogram = Histogram(
+            name='test_duration_seconds',
+            documentation='Test duration.',
+            labelnames=('view',),
+            buckets=(0.1, 1.0),
+        )
+        histogram.observe(0.05, view='conversion')
+        histogram.observe(0.1, view='conversion')
+        histogram.observe(5, view='conversion')
+
+        assert histogram.render() == '\n'.join([
+            '# HELP test_duration_seconds Test duration.',
+            '# TYPE test_duration_seconds histogram',
+            'test_duration_seconds_bucket{view="conversion",le="0.1"} 2',
+            'test_duration_seconds_bucket{view="conversion",le="1.0"} 2',
+            'test_duration_seconds_bucket{view="conversion",le="+Inf"} 3',
+            'test_duration_seconds_sum{view="conversion"} 5.15',
+            'test_duration_seconds_count{view="conversion"} 3',
+        ])
+
+    def test_counter__render(self) -> None:
+        counter = Counter(
+            name='test_statuses_total',
+            documentation='Test statuses.',
+            labelnames=('status',),
+        )
+        counter.inc(status='ok')
+        counter.inc(status='ok')
+        counter.inc(status='api_access_error')
+
+        assert counter.render() == '\n'.join([
+            '# HELP test_statuses_total Test statuses.',
+            '# TYPE test_statuses_total counter',
+            'test_statuses_total{status="api_access_error"} 1.0',
+            'test_statuses_total{status="ok"} 2.0',
+        ])
+
+    def test_get_metrics__conversion(self, exchange_api_result: dict[str, Any]) -> None:
+        conversions_count = conversion_duration.count(view='conversion')
+        snapshot_misses = cache_requests.value(cache='rates_snapshot', result='miss')
+        snapshot_hits = cache_requests.value(cache='rates_snapshot', result='hit')
+        fetches_count = upstream_fetch_duration.count(provider='moeda.info')
+        ok_conversions = output_statuses.value(operation='conversion', status='ok')
+
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
+            for _ in range(2):
+                client.get(
+                    path=reverse('api.currency_conversion'),
+                    data={'from': 'USD', 'to': 'BRL', 'amount': 2.0},
+                )
+
+        assert conversion_duration.count(view='conversion') == conversions_count + 2
+        assert cache_requests.value(cache='rates_snapshot', result='miss') == snapshot_misses + 1
+        assert cache_requests.value(cache='rates_snapshot', result='hit') == snapshot_hits + 1
+        assert upstream_fetch_duration.count(provider='moeda.info') == fetches_count + 1
+        assert output_statuses.value(operation='conversion', status='ok') == ok_conversions + 2
+
+        result = client.get(path=reverse('metrics'))
+        assert result.status_code == status.HTTP_200_OK
+        assert result['Content-Type'] == 'text/plain; version=0.0.4; charset=utf-8'
+
+        metrics = result.content.decode()
+        assert '# TYPE api_conversion_duration_seconds histogram' in metrics
+        assert 'api_conversion_duration_seconds_count{view="conversion"}' in metrics
+        assert 'api_rates_snapshot_age_seconds ' in metrics
+        assert 'api_output_status_total{operation="exchange_rates",status="ok"}' in metrics
+
+    def test_get_metrics__cache_unavailable(self) -> None:
+        with mock.patch.object(
+                target=metrics, attribute='get_snapshot', side_effect=RedisConnectionError):
+            result = client.get(path=reverse('metrics'))
+
+        assert result.status_code == status.HTTP_200_OK
+
+        metrics_lines = result.content.decode().splitlines()
+        assert '# TYPE api_rates_snapshot_age_seconds gauge' in metrics_lines
+        assert not any(line.startswith('api_rates_snapshot_age_seconds ') for line in metrics_lines)
+
+    def test_get_metrics__without_trailing_slash(self) -> None:
+        result = client.get(path='/metrics')
+        assert result.status_code == status.HTTP_301_MOVED_PERMANENTLY
+        assert result['Location'] == reverse('metrics')
+
+    def test_get_metrics__api_access_error(self, httpx_get_request: httpx.Request) -> None:
+        access_errors = output_statuses.value(
+            operation='exchange_rates', status='api_access_error')
+
+        with mock.patch.object(target=httpx.Client, attribute='get') as mock_get_api:
+            mock_get_api.return_value = httpx.Response(
+                status_code=status.HTTP_404_NOT_FOUND,
+                request=httpx_get_request,
+            )
+            ExchangeApi().get_exchange_rates()
+
+        assert output_statuses.value(
+            operation='exchange_rates', status='api_access_error') == access_errors + 1
+
+
+# ==================================================================================================
+#   Production server
+# ==================================================================================================
+class TestServe:
+    def test_warm_up(
+        self,
+        exchange_api_result: dict[str, Any],
+        django_assert_num_queries,
+    ) -> None:
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
+
+            warm_up_status = logic.warm_up()
+
+        assert not warm_up_status.error
+        assert get_snapshot() == warm_up_status.data['snapshot']
+        with django_assert_num_queries(0):
+            currency_registry.index()
+
+    def test_post_worker_init__warm_up(self, exchange_api_result: dict[str, Any]) -> None:
+        worker = mock.Mock()
+        with mock.patch.object(target=httpx.Client, attribute='get', autospec=True) as mock_get_api:
+            mock_get_api.return_value.content = json.dumps(exchange_api_result).encode()
+
+            serve.post_worker_init(worker=worker)
+
+        assert get_snapshot() is not None
+        worker.log.info.assert_called_once()
+        worker.log.warning.assert_not_called()
+
+    def test_serve_command__options(self) -> None:
+        with mock.patch.object(
+            target=serve.ServeApplication, attribute='run', autospec=True) as mock_run:
+            call_command('serve', '--workers', '3', '--threads', '2', '--asgi')
+
+        application = mock_run.call_args.args[0]
+        assert application.cfg.workers == 3
+        assert application.cfg.threads == 2
+        assert application.cfg.worker_class_str == serve.ASGI_WORKER_CLASS
+        assert application.cfg.preload_app
+        assert application.cfg.post_worker_init is serve.post_worker_init
+        assert application.load() is data_stone.asgi.application
+
+
+# ==================================================================================================
+#   API-only settings
+# ==================================================================================================
+class TestSettingsApi:
+    @pytest.fixture(autouse=True)
+    def settings_api(self) -> Iterator[None]:
+        """Use the `data_stone.settings_api` profile."""
+        with override_settings(
+            INSTALLED_APPS=data_stone.settings_api.INSTALLED_APPS,
+            MIDDLEWARE=data_stone.settings_api.MIDDLEWARE,
+            ROOT_URLCONF=data_stone.settings_api.ROOT_URLCONF,
+            REST_FRAMEWORK=data_stone.settings_api.REST_FRAMEWORK,
+            TEMPLATES=data_stone.settings_api.TEMPLATES,
+        ):
+            yield
+
+    def test_settings_api__urls(self) -> None:
+        assert 'django.contrib.admin' not in data_stone.settings_api.INSTALLED_APPS
+        assert reverse('api.currency_conversion') == '/api/currency/conversion/'
+        assert resolve(path='/api/currency/conversion/').func.view_class is Conversion
+        assert resolve(path='/metrics/').url_name == 'metrics'
+        with pytest.raises(Resolver404):
+            resolve(path='/admin/')
+
+    def test_settings_api__conversion(self, exchange_api_result: dict[str, Any]) -> None:
+        publish_snapshot(
+            last_update=exchange_api_result['lastupdate'],
+            rates=exchange_api_result['rates'],
+        )
+        result = APIClient().get(
+            path=reverse('api.currency_conversion'),
+            data={'from': 'USD', 'to': 'BRL', 'amount': 2.0},
+        )
+        assert result.status_code == status.HTTP_200_OK
+        assert result.json()['converted_value'] == 10.026532
@@ -9,5 +9,31 @@ from . import views
 
 urlpatterns = [
     path('currency/conversion/', views.Conversion.as_view(), name='api.currency_conversion'),
+    path(
+        'currency/conversion/async/',
+        views.AsyncConversion.as_view(),
+        name='api.currency_conversion_async',
+    ),
+    path(
+        'currency/conversion/batch/',
+        views.ConversionBatch.as_view(),
+        name='api.currency_conversion_batch',
+    ),
+    path(
+        'currency/conversion/file/',
+        views.ConversionFile.as_view(),
+        name='api.currency_conversion_file',
+    ),
+    path('currency/rates/matrix/', views.RatesMatrix.as_view(), name='api.currency_rates_matrix'),
+    path(
+        'currency/rates/history/',
+        views.RatesHistory.as_view(),
+        name='api.currency_rates_history',
+    ),
+    path(
+        'currency/rates/stream/',
+        views.RatesStream.as_view(),
+        name='api.currency_rates_stream',
+    ),
     path('cache/clear/', views.CacheClear.as_view(), name='api.cache_clear'),
 ]
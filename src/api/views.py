@@ -1,48 +1,263 @@
+import codecs
+
 import rest_framework.status as status
 from django.conf import settings
-from django.core.cache import caches
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
-from rest_framework.renderers import JSONRenderer
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views import View
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .logic import ExchangeApi
+from .admission import admission_control
+from .files import FILE_FORMATS, convert_file
+from .history import RatesTimeSeries, parse_interval
+from .http_caching import conditional_response, patch_rates_age, patch_snapshot_cache_headers
+from .logic import (
+    aget_historical_snapshot,
+    aget_rates_snapshot,
+    convert_amount,
+    convert_batch,
+    get_historical_snapshot,
+    get_rates_snapshot,
+    invalidate_cache,
+    invalidate_cache_in_background,
+    parse_timestamp,
+)
+from .metrics import conversion_duration, metrics_registry
+from .namespaces import CACHE_NAMESPACES, responses_namespace
+from .registry import currency_registry
+from .streams import stream_rates
+
+
+REQUIRED_PARAMETERS = ['from', 'to', 'amount']
 
 
 class Conversion(APIView):
     """Conversion resource."""
 
-    @method_decorator(
-        cache_page(
-            timeout=settings.EXCHANGE_RATES_CACHE_TIMEOUT,
-            key_prefix='api_conversion_get'
-        )
-    )
+    @admission_control
+    @conversion_duration.time(view='conversion')
     def get(self, request):
         """Get currency conversion."""
-        # Fix class `renderer_classes` being tampered by `cache_page` decorator
-        self.__class__.renderer_classes = [JSONRenderer]
-
-        required_parameters = ['from', 'to', 'amount']
-        if not all([param in request.query_params for param in required_parameters]):
+        if not all([param in request.query_params for param in REQUIRED_PARAMETERS]):
             return Response(
                 data={'error': 'There are missing parameters on query string.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        exchange_api = ExchangeApi()
-        exchange_rates_status = exchange_api.get_exchange_rates()
+        currency_names = (request.query_params['from'], request.query_params['to'])
+        if 'at' in request.query_params:
+            timestamp_status = parse_timestamp(timestamp_str=request.query_params['at'])
+            if timestamp_status.error:
+                return Response(data=timestamp_status.data, status=status.HTTP_400_BAD_REQUEST)
+            snapshot_status = get_historical_snapshot(timestamp=timestamp_status.data['timestamp'])
+        else:
+            snapshot_status = get_rates_snapshot(currency_names=currency_names)
 
-        if exchange_rates_status.error:
-            return Response(data=exchange_rates_status.data, status=status.HTTP_400_BAD_REQUEST)
+        if snapshot_status.error:
+            return Response(data=snapshot_status.data, status=status.HTTP_400_BAD_REQUEST)
 
-        exchange_rates = exchange_rates_status.data.get('exchange_rates')
-        last_update = exchange_rates_status.data.get('updated')
+        snapshot = snapshot_status.data['snapshot']
+        responses_version = responses_namespace.version()
+        conversion_status = convert_amount(
+            snapshot=snapshot,
+            from_currency_name=request.query_params.get('from'),
+            to_currency_name=request.query_params.get('to'),
+            amount_str=request.query_params.get('amount'),
+        )
+
+        if conversion_status.error:
+            return Response(data=conversion_status.data, status=status.HTTP_400_BAD_REQUEST)
+
+        # Only valid parameters have a response to validate (invalid ones aren't `Not Modified`)
+        not_modified_response = conditional_response(
+            request=request,
+            snapshot=snapshot,
+            responses_version=responses_version,
+            currency_names=currency_names,
+        )
+        if not_modified_response is not None:
+            return not_modified_response
 
+        return patch_snapshot_cache_headers(
+            response=Response(data=conversion_status.data),
+            snapshot=snapshot,
+            responses_version=responses_version,
+            currency_names=currency_names,
+        )
+
+
+class AsyncConversion(View):
+    """Conversion resource (native async, to be served over ASGI)."""
+
+    @admission_control
+    @conversion_duration.time(view='async_conversion')
+    async def get(self, request):
+        """Get currency conversion."""
+        if not all([param in request.GET for param in REQUIRED_PARAMETERS]):
+            return JsonResponse(
+                data={'error': 'There are missing parameters on query string.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        currency_names = (request.GET['from'], request.GET['to'])
+        if 'at' in request.GET:
+            timestamp_status = parse_timestamp(timestamp_str=request.GET['at'])
+            if timestamp_status.error:
+                return JsonResponse(data=timestamp_status.data, status=status.HTTP_400_BAD_REQUEST)
+            snapshot_status = await aget_historical_snapshot(
+                timestamp=timestamp_status.data['timestamp'])
+        else:
+            snapshot_status = await aget_rates_snapshot(currency_names=currency_names)
+
+        if snapshot_status.error:
+            return JsonResponse(data=snapshot_status.data, status=status.HTTP_400_BAD_REQUEST)
+
+        snapshot = snapshot_status.data['snapshot']
+        responses_version = await responses_namespace.aversion()
+        conversion_status = convert_amount(
+            snapshot=snapshot,
+            from_currency_name=request.GET.get('from'),
+            to_currency_name=request.GET.get('to'),
+            amount_str=request.GET.get('amount'),
+        )
+
+        if conversion_status.error:
+            return JsonResponse(data=conversion_status.data, status=status.HTTP_400_BAD_REQUEST)
+
+        # Only valid parameters have a response to validate (invalid ones aren't `Not Modified`)
+        not_modified_response = conditional_response(
+            request=request,
+            snapshot=snapshot,
+            responses_version=responses_version,
+            currency_names=currency_names,
+        )
+        if not_modified_response is not None:
+            return not_modified_response
+
+        return patch_snapshot_cache_headers(
+            response=JsonResponse(data=conversion_status.data),
+            snapshot=snapshot,
+            responses_version=responses_version,
+            currency_names=currency_names,
+        )
+
+
+class ConversionBatch(APIView):
+    """Batch conversion resource."""
+
+    @admission_control
+    @conversion_duration.time(view='batch_conversion')
+    def post(self, request):
+        """Convert a batch of amounts (`from`, `to` and `amount` arrays on request body)."""
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        if content_length > settings.BATCH_CONVERSION_MAX_BODY_SIZE:
+            return Response(
+                data={
+                    'error': 'The request body is limited to '
+                             f'{settings.BATCH_CONVERSION_MAX_BODY_SIZE} bytes.'
+                },
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        batch = request.data
+        if not isinstance(batch, dict) or not all(
+            isinstance(batch.get(param), list) for param in REQUIRED_PARAMETERS
+        ):
+            return Response(
+                data={'error': 'The `from`, `to` and `amount` arrays are required.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        batch_size = len(batch['amount'])
+        if len(batch['from']) != batch_size or len(batch['to']) != batch_size:
+            return Response(
+                data={'error': 'The `from`, `to` and `amount` arrays must have the same size.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if batch_size > settings.BATCH_CONVERSION_MAX_SIZE:
+            return Response(
+                data={
+                    'error': f'The batch size is limited to {settings.BATCH_CONVERSION_MAX_SIZE}.'
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        snapshot_status = get_rates_snapshot()
+
+        if snapshot_status.error:
+            return Response(data=snapshot_status.data, status=status.HTTP_400_BAD_REQUEST)
+
+        snapshot = snapshot_status.data['snapshot']
+        conversion_status = convert_batch(
+            snapshot=snapshot,
+            from_currencies=batch['from'],
+            to_currencies=batch['to'],
+            amounts=batch['amount'],
+        )
+        return patch_rates_age(response=Response(data=conversion_status.data), snapshot=snapshot)
+
+
+class ConversionFile(APIView):
+    """Bulk file conversion resource."""
+
+    @admission_control
+    def post(self, request):
+        """Convert the file on the request body (CSV or JSON lines), streaming the result."""
+        input_format = request.query_params.get('input_format', 'csv')
+        output_format = request.query_params.get('output_format', input_format)
+        for file_format in [input_format, output_format]:
+            if file_format not in FILE_FORMATS:
+                return Response(
+                    data={'error': f'The file format [{file_format}] is not supported.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        # Without `Content-Length` (e.g. a chunked upload) DRF has no request stream
+        if request.stream is None and not request.META.get('CONTENT_LENGTH'):
+            return Response(
+                data={'error': 'The Content-Length header is required.'},
+                status=status.HTTP_411_LENGTH_REQUIRED
+            )
+
+        snapshot_status = get_rates_snapshot()
+
+        if snapshot_status.error:
+            return Response(data=snapshot_status.data, status=status.HTTP_400_BAD_REQUEST)
+
+        snapshot = snapshot_status.data['snapshot']
+        lines = codecs.iterdecode(request.stream or [], encoding='utf-8')
+        response = StreamingHttpResponse(
+            streaming_content=convert_file(
+                lines=lines,
+                snapshot=snapshot,
+                input_format=input_format,
+                output_format=output_format,
+                chunk_size=settings.FILE_CONVERSION_CHUNK_SIZE,
+            ),
+            content_type='text/csv' if output_format == 'csv' else 'application/x-ndjson',
+        )
+        response['X-Rates-Last-Update'] = snapshot.last_update
+        return patch_rates_age(response=response, snapshot=snapshot)
+
+
+class RatesMatrix(APIView):
+    """Cross rates matrix resource."""
+
+    def get(self, request):
+        """Get the cross rates matrix, one of its rows (`from`) or columns (`to`)."""
+        snapshot_status = get_rates_snapshot()
+
+        if snapshot_status.error:
+            return Response(data=snapshot_status.data, status=status.HTTP_400_BAD_REQUEST)
+
+        snapshot = snapshot_status.data['snapshot']
+        responses_version = responses_namespace.version()
         from_currency_name = request.query_params.get('from')
         to_currency_name = request.query_params.get('to')
+
         for currency_name in [from_currency_name, to_currency_name]:
-            if currency_name not in exchange_rates:
+            if currency_name is not None and currency_name not in snapshot.currency_index:
                 return Response(
                     data={
                         'error': f'The currency [{currency_name}] is not available for conversion.'
@@ -50,35 +265,184 @@ class Conversion(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-        from_currency = exchange_rates[from_currency_name]
-        to_currency = exchange_rates[to_currency_name]
+        not_modified_response = conditional_response(
+            request=request, snapshot=snapshot, responses_version=responses_version)
+        if not_modified_response is not None:
+            return not_modified_response
 
-        amount_str = request.query_params.get('amount')
-        try:
-            amount = float(amount_str)
-        except ValueError:
+        matrix = snapshot.cross_rates_matrix
+        response = {'last_update': snapshot.last_update}
+        if from_currency_name is not None and to_currency_name is not None:
+            response.update(
+                from_currency=from_currency_name,
+                to_currency=to_currency_name,
+                rate=snapshot.cross_rate(from_currency_name, to_currency_name),
+            )
+        elif from_currency_name is not None:
+            row = matrix[snapshot.currency_index[from_currency_name]].tolist()
+            response.update(
+                from_currency=from_currency_name,
+                rates=dict(zip(snapshot.currencies, row)),
+            )
+        elif to_currency_name is not None:
+            column = matrix[:, snapshot.currency_index[to_currency_name]].tolist()
+            response.update(
+                to_currency=to_currency_name,
+                rates=dict(zip(snapshot.currencies, column)),
+            )
+        else:
+            response.update(currencies=snapshot.currencies, matrix=matrix.tolist())
+
+        return patch_snapshot_cache_headers(
+            response=Response(data=response),
+            snapshot=snapshot,
+            responses_version=responses_version,
+        )
+
+
+class RatesHistory(APIView):
+    """Historical cross rates time series resource."""
+
+    def get(self, request):
+        """Stream the cross rate OHLC and mean of a currencies pair per time interval."""
+        if not all([param in request.query_params for param in ['from', 'to', 'start', 'end']]):
+            return Response(
+                data={'error': 'There are missing parameters on query string.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        from_currency_name = request.query_params.get('from')
+        to_currency_name = request.query_params.get('to')
+        acronyms = currency_registry.acronyms()
+        for currency_name in [from_currency_name, to_currency_name]:
+            if currency_name not in acronyms:
                 return Response(
-                    data={'error': f'The amount [{amount_str}] is a invalid value.'},
+                    data={
+                        'error': f'The currency [{currency_name}] is not available for conversion.'
+                    },
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-        converted_value = amount * to_currency / from_currency
+        timestamps = []
+        for timestamp_str in [request.query_params['start'], request.query_params['end']]:
+            timestamp_status = parse_timestamp(timestamp_str=timestamp_str)
+            if timestamp_status.error:
+                return Response(data=timestamp_status.data, status=status.HTTP_400_BAD_REQUEST)
+            timestamps.append(timestamp_status.data['timestamp'])
+        start, end = timestamps
+
+        interval_str = request.query_params.get('interval', '1h')
+        interval = parse_interval(interval_str=interval_str)
+        if interval is None:
+            return Response(
+                data={'error': f'The interval [{interval_str}] is a invalid value.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        window = end - start
+        if window.total_seconds() <= 0 or window.days >= settings.RATES_HISTORY_MAX_WINDOW_DAYS:
+            return Response(
+                data={
+                    'error': (
+                        'The end must be after the start and the time window is limited to '
+                        f'{settings.RATES_HISTORY_MAX_WINDOW_DAYS} days.'
+                    )
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if window / interval > settings.RATES_HISTORY_MAX_INTERVALS:
+            return Response(
+                data={
+                    'error': (
+                        'The number of intervals is limited to '
+                        f'{settings.RATES_HISTORY_MAX_INTERVALS}.'
+                    )
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        time_series = RatesTimeSeries(
+            from_currency_name=from_currency_name,
+            to_currency_name=to_currency_name,
+            start=start,
+            end=end,
+            interval=interval,
+        )
+        return StreamingHttpResponse(
+            streaming_content=time_series.stream_json(),
+            content_type='application/json',
+        )
+
+
+class RatesStream(View):
+    """Live rates stream resource (Server-Sent Events, to be served over ASGI)."""
+
+    async def get(self, request):
+        """Stream the rates (optionally `currencies` only, in `base` units) on each update."""
+        if not isinstance(request, ASGIRequest):
+            # WSGI servers would consume the (endless) stream before sending it
+            return JsonResponse(
+                data={'error': 'The rates stream is only available on the ASGI server.'},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+
+        currencies = None
+        if request.GET.get('currencies'):
+            currencies = request.GET['currencies'].split(',')
+        base = request.GET.get('base') or None
+
+        acronyms = await currency_registry.aindex()
+        for currency_name in [*(currencies or []), *([base] if base else [])]:
+            if currency_name not in acronyms:
+                return JsonResponse(
+                    data={
+                        'error': f'The currency [{currency_name}] is not available for conversion.'
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
-        response = {
-            'from_currency': from_currency_name,
-            'amount': amount,
-            'to_currency': to_currency_name,
-            'converted_value': converted_value,
-            'last_update': last_update,
-        }
-        return Response(data=response)
+        response = StreamingHttpResponse(
+            streaming_content=stream_rates(currencies=currencies, base=base),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
 
 
 class CacheClear(APIView):
     """Cache clear utility"""
 
     def post(self, request):
-        """Clear Django cache for manual tests purpose."""
-        cache = caches['default']
-        result = cache.clear()
-        return Response(data={'cache_cleared': result})
+        """Invalidate the cached data of the `scope` namespaces (all of them by default).
+
+        With `rewarm`, the data is re-warmed on background before the invalidation.
+        """
+        scopes = request.query_params.getlist('scope') or list(CACHE_NAMESPACES)
+        for scope in scopes:
+            if scope not in CACHE_NAMESPACES:
+                return Response(
+                    data={'error': f'The cache scope [{scope}] is not available.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        if request.query_params.get('rewarm', '').lower() in ['1', 'true']:
+            invalidate_cache_in_background(scopes=scopes)
+            return Response(
+                data={'cache_cleared': False, 'rewarming': scopes},
+                status=status.HTTP_202_ACCEPTED,
+            )
+
+        versions = invalidate_cache(scopes=scopes)
+        return Response(data={'cache_cleared': True, 'versions': versions})
+
+
+class Metrics(View):
+    """Metrics resource (Prometheus text format)."""
+
+    def get(self, request):
+        """Get the metrics of the process."""
+        return HttpResponse(
+            content=metrics_registry.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
@@ -0,0 +1,6 @@
+# ==================================================================================================
+#   Benchmarks
+# ==================================================================================================
+# Performance measurements, executed from the project directory (where `manage.py` is), e.g.:
+#
+#   python -m benchmarks.asgi_vs_wsgi --help
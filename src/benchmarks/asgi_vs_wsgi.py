@@ -0,0 +1,58 @@
+# ==================================================================================================
+#   ASGI (async) vs WSGI (sync) conversion benchmark
+# ==================================================================================================
+# Both applications are served by the production server (`serve`, gunicorn) with the same number
+# of workers, threaded sync workers for WSGI and uvicorn workers for ASGI, so only the application
+# interface differs. Start both servers (without admission control, since the benchmark is a
+# single client) before running the benchmark, e.g.:
+#
+#   APP_ADMISSION_DISABLED=1 python manage.py serve --bind 0.0.0.0:8000 --workers 4
+#   APP_ADMISSION_DISABLED=1 python manage.py serve --bind 0.0.0.0:8001 --workers 4 --asgi
+#
+#   python -m benchmarks.asgi_vs_wsgi --requests 5000 --concurrency 200
+
+import argparse
+
+from .common import run_load, save_results
+
+
+CONVERSION_PARAMS = {'from': 'BTC', 'to': 'EUR', 'amount': 123.45}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='ASGI vs WSGI conversion benchmark.')
+    parser.add_argument('--wsgi-url', default='http://localhost:8000')
+    parser.add_argument('--asgi-url', default='http://localhost:8001')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--output', help='Save the results to this JSON file.')
+    args = parser.parse_args()
+
+    scenarios = [
+        ('wsgi conversion', f'{args.wsgi_url}/api/currency/conversion/'),
+        ('asgi async conversion', f'{args.asgi_url}/api/currency/conversion/async/'),
+    ]
+
+    results = []
+    for name, url in scenarios:
+        result = run_load(
+            name=name,
+            url=url,
+            params=CONVERSION_PARAMS,
+            requests=args.requests,
+            concurrency=args.concurrency,
+        )
+        print(result)
+        results.append(result)
+
+    if args.output:
+        save_results(
+            args.output,
+            results,
+            requests=args.requests,
+            concurrency=args.concurrency,
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+# ==================================================================================================
+#   Benchmarks common utilities
+# ==================================================================================================
+
+import asyncio
+import json
+import math
+import os
+import time
+import timeit
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable
+
+import httpx
+
+
+def setup_django() -> None:
+    """Configure Django (for the benchmarks running the project code in process)."""
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'data_stone.settings')
+    # The benchmarks are a single client, which the admission control would rate limit
+    os.environ.setdefault('APP_ADMISSION_DISABLED', '1')
+    django.setup()
+
+
+# --------------------------------------------------------------------------------------------------
+#   Statistics
+# --------------------------------------------------------------------------------------------------
+def percentile(sorted_values: list[float], percent: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return math.nan
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+@dataclass
+class LoadResult:
+    """Load test measurements (latencies in milliseconds)."""
+    name: str
+    requests: int
+    errors: int
+    duration: float
+    requests_per_second: float
+    p50: float
+    p95: float
+    p99: float
+
+    @classmethod
+    def from_latencies(
+        cls,
+        name: str,
+        latencies: list[float],
+        errors: int,
+        duration: float,
+    ) -> 'LoadResult':
+        """Summarize the latencies (seconds) of a load test."""
+        sorted_latencies = sorted(latency * 1000 for latency in latencies)
+        requests = len(latencies)
+        return cls(
+            name=name,
+            requests=requests,
+            errors=errors,
+            duration=duration,
+            requests_per_second=requests / duration if duration else math.nan,
+            p50=percentile(sorted_latencies, 50),
+            p95=percentile(sorted_latencies, 95),
+            p99=percentile(sorted_latencies, 99),
+        )
+
+    def __str__(self) -> str:
+        return (
+            f'{self.name:<30} {self.requests_per_second:>10.1f} req/s  '
+            f'p50 {self.p50:>8.2f} ms  p95 {self.p95:>8.2f} ms  p99 {self.p99:>8.2f} ms  '
+            f'errors {self.errors}'
+        )
+
+
+@dataclass
+class MicroResult:
+    """Microbenchmark measurements (times per call in microseconds)."""
+    name: str
+    number: int
+    repeat: int
+    best: float
+    median: float
+
+    def __str__(self) -> str:
+        return (
+            f'{self.name:<40} best {self.best:>10.2f} us  median {self.median:>10.2f} us  '
+            f'({self.repeat} x {self.number} calls)'
+        )
+
+
+def run_micro(name: str, function: Callable, number: int, repeat: int = 5) -> MicroResult:
+    """Time `function` calls (best and median of `repeat` rounds of `number` calls)."""
+    timings = sorted(
+        timing / number * 1_000_000
+        for timing in timeit.repeat(function, number=number, repeat=repeat)
+    )
+    return MicroResult(
+        name=name,
+        number=number,
+        repeat=repeat,
+        best=timings[0],
+        median=timings[len(timings) // 2],
+    )
+
+
+def save_results(path: str | Path, results: list, **metadata) -> None:
+    """Save benchmark results (dataclasses) as JSON, so different runs can be compared."""
+    Path(path).write_text(
+        json.dumps(
+            {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                **metadata,
+                'results': [asdict(result) for result in results],
+            },
+            indent=4,
+        )
+    )
+
+
+# --------------------------------------------------------------------------------------------------
+#   Load driver
+# --------------------------------------------------------------------------------------------------
+async def arun_load(
+    name: str,
+    url: str,
+    params: dict,
+    requests: int,
+    concurrency: int,
+) -> LoadResult:
+    """Async version of `run_load()`."""
+    latencies: list[float] = []
+    errors = 0
+    pending = iter(range(requests))
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        for _ in pending:
+            start = time.perf_counter()
+            try:
+                response = await client.get(url, params=params)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        duration = time.perf_counter() - start
+
+    return LoadResult.from_latencies(
+        name=name, latencies=latencies, errors=errors, duration=duration)
+
+
+def run_load(
+    name: str,
+    url: str,
+    params: dict,
+    requests: int,
+    concurrency: int,
+) -> LoadResult:
+    """Run a closed-loop load test against `url`."""
+    return asyncio.run(
+        arun_load(name=name, url=url, params=params, requests=requests, concurrency=concurrency)
+    )
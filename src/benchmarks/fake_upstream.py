@@ -0,0 +1,108 @@
+# ==================================================================================================
+#   Fake exchange rates external API
+# ==================================================================================================
+# Local stand-in for `cdn.moeda.info`, with configurable latency, error rate, payload size and
+# update interval (answering conditional requests with `304 Not Modified` between updates).
+# Start it and point the application to it through environment (with the admission control
+# disabled, since the benchmarks are a single client), e.g.:
+#
+#   python -m benchmarks.fake_upstream --port 9000 --latency 0.05 --error-rate 0.01
+#   EXCHANGE_RATES_API_URL=http://localhost:9000/api/latest.json APP_ADMISSION_DISABLED=1 \
+#       python manage.py runserver
+
+import argparse
+import datetime
+import json
+import random
+import string
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+LAST_UPDATE_PLACEHOLDER = b'__LASTUPDATE__'
+
+
+def build_payload(currencies: int, last_update: str = '2024-03-28T21:19:45.133000+00:00') -> bytes:
+    """Upstream-like payload with `currencies` rates (the application ones included)."""
+    random_generator = random.Random(0)
+    acronyms = ['USD', 'BRL', 'EUR', 'BTC', 'ETH']
+    while len(acronyms) < currencies:
+        acronym = ''.join(random_generator.choices(string.ascii_uppercase, k=3))
+        if acronym not in acronyms:
+            acronyms.append(acronym)
+
+    return json.dumps({
+        'table': 'latest',
+        'rates': {acronym: random_generator.uniform(0.00001, 20000) for acronym in acronyms},
+        'lastupdate': last_update,
+    }).encode()
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    """Answer every GET with the rates payload (after `latency`, failing at `error_rate`)."""
+    payload: bytes
+    latency: float
+    jitter: float
+    error_rate: float
+    update_interval: int
+
+    def do_GET(self) -> None:
+        time.sleep(max(self.latency + random.uniform(-self.jitter, self.jitter), 0))
+
+        if random.random() < self.error_rate:
+            self.send_response(HTTPStatus.SERVICE_UNAVAILABLE)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        updated_at = int(time.time()) // self.update_interval * self.update_interval
+        etag = f'"{updated_at}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        last_update = datetime.datetime.fromtimestamp(updated_at, datetime.UTC).isoformat()
+        body = self.payload.replace(LAST_UPDATE_PLACEHOLDER, last_update.encode())
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Fake exchange rates external API.')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--latency', type=float, default=0.05, help='Response latency (seconds).')
+    parser.add_argument('--jitter', type=float, default=0.01, help='Latency jitter (seconds).')
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of 503 responses.')
+    parser.add_argument('--currencies', type=int, default=170, help='Rates on the payload.')
+    parser.add_argument(
+        '--update-interval', type=int, default=1, help='Seconds between rates updates.')
+    args = parser.parse_args()
+
+    handler = type('Handler', (FakeUpstreamHandler,), {
+        'payload': build_payload(
+            currencies=args.currencies,
+            last_update=LAST_UPDATE_PLACEHOLDER.decode(),
+        ),
+        'latency': args.latency,
+        'jitter': args.jitter,
+        'error_rate': args.error_rate,
+        'update_interval': max(args.update_interval, 1),
+    })
+    with ThreadingHTTPServer((args.host, args.port), handler) as server:
+        print(f'Fake exchange rates API on http://{args.host}:{args.port}/api/latest.json')
+        server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
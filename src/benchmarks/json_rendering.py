@@ -0,0 +1,66 @@
+# ==================================================================================================
+#   JSON rendering benchmark
+# ==================================================================================================
+# Compares DRF `JSONRenderer` with `ORJSONRenderer` rendering conversion responses (a single
+# conversion and a batch one), reporting the time per response, throughput and response size:
+#
+#   python -m benchmarks.json_rendering --batch-size 10000
+
+import argparse
+import random
+
+from .common import run_micro, save_results, setup_django
+
+
+CONVERSION_DATA = {
+    'from_currency': 'BTC',
+    'amount': 123.45,
+    'to_currency': 'EUR',
+    'converted_value': 24283342.19402831,
+    'last_update': '2024-03-28T21:19:45.133000+00:00',
+}
+
+
+def batch_conversion_data(batch_size: int) -> dict:
+    """Batch conversion response with `batch_size` converted values."""
+    random_generator = random.Random(0)
+    return {
+        'converted_values': [random_generator.uniform(0, 100000) for _ in range(batch_size)],
+        'errors': [],
+        'last_update': CONVERSION_DATA['last_update'],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='JSON rendering benchmark.')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--number', type=int, default=2000)
+    parser.add_argument('--output', help='Save the results to this JSON file.')
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.renderers import JSONRenderer
+
+    from api.renderers import ORJSONRenderer
+
+    scenarios = [
+        ('conversion', CONVERSION_DATA, args.number),
+        (f'batch conversion ({args.batch_size})', batch_conversion_data(args.batch_size),
+         max(args.number // 100, 1)),
+    ]
+
+    results = []
+    for scenario_name, data, number in scenarios:
+        for renderer in [JSONRenderer(), ORJSONRenderer()]:
+            name = f'{scenario_name} {type(renderer).__name__}'
+            result = run_micro(name=name, function=lambda: renderer.render(data), number=number)
+            size = len(renderer.render(data))
+            print(f'{result}  {1_000_000 / result.median:>10.0f} responses/s  {size} bytes')
+            results.append(result)
+
+    if args.output:
+        save_results(args.output, results, batch_size=args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
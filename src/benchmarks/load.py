@@ -0,0 +1,151 @@
+# ==================================================================================================
+#   Conversion load benchmark
+# ==================================================================================================
+# Throughput and latency percentiles of the conversion endpoint on three scenarios:
+#
+#   - cold: the cache is cleared and `concurrency` requests arrive at once (repeated `rounds`);
+#   - warm: the rates snapshot is already published;
+#   - refresh: warm, while the snapshot is refreshed in background (`refresh_rates --once`).
+#
+# Run the application pointing to `benchmarks.fake_upstream` (see it), then, e.g.:
+#
+#   python -m benchmarks.load --requests 5000 --concurrency 100 --output load.json
+
+import argparse
+import asyncio
+import sys
+import time
+
+import httpx
+
+from .common import LoadResult, arun_load, save_results
+
+
+CONVERSION_PATH = '/api/currency/conversion/'
+CACHE_CLEAR_PATH = '/api/cache/clear/'
+CONVERSION_PARAMS = {'from': 'BTC', 'to': 'EUR', 'amount': 123.45}
+
+
+async def cold_cache(url: str, rounds: int, concurrency: int) -> LoadResult:
+    """Bursts of `concurrency` simultaneous requests, each one right after a cache clear."""
+    latencies: list[float] = []
+    errors = 0
+
+    async def timed_get(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            response = await client.get(f'{url}{CONVERSION_PATH}', params=CONVERSION_PARAMS)
+            if response.status_code != 200:
+                errors += 1
+        except httpx.HTTPError:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    duration = 0.0
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        for _ in range(rounds):
+            (await client.post(f'{url}{CACHE_CLEAR_PATH}')).raise_for_status()
+            start = time.perf_counter()
+            await asyncio.gather(*(timed_get(client) for _ in range(concurrency)))
+            duration += time.perf_counter() - start
+
+    return LoadResult.from_latencies(
+        name='cold cache', latencies=latencies, errors=errors, duration=duration)
+
+
+async def warm_cache(url: str, requests: int, concurrency: int) -> LoadResult:
+    """Load with the snapshot already published."""
+    async with httpx.AsyncClient(timeout=60) as client:
+        (await client.get(f'{url}{CONVERSION_PATH}', params=CONVERSION_PARAMS)).raise_for_status()
+
+    return await arun_load(
+        name='warm cache',
+        url=f'{url}{CONVERSION_PATH}',
+        params=CONVERSION_PARAMS,
+        requests=requests,
+        concurrency=concurrency,
+    )
+
+
+async def refresh_under_load(
+    url: str,
+    requests: int,
+    concurrency: int,
+    refresh_interval: float,
+) -> LoadResult:
+    """Warm cache load while the snapshot is refreshed every `refresh_interval` seconds."""
+    async def refresher() -> None:
+        while True:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, 'manage.py', 'refresh_rates', '--once',
+                stdout=asyncio.subprocess.DEVNULL,
+            )
+            await process.wait()
+            await asyncio.sleep(refresh_interval)
+
+    refresher_task = asyncio.create_task(refresher())
+    try:
+        result = await warm_cache(url=url, requests=requests, concurrency=concurrency)
+    finally:
+        refresher_task.cancel()
+
+    result.name = 'refresh under load'
+    return result
+
+
+async def run_scenarios(args: argparse.Namespace) -> list[LoadResult]:
+    """Run the selected scenarios, in order."""
+    scenarios = {
+        'cold': lambda: cold_cache(
+            url=args.url, rounds=args.rounds, concurrency=args.concurrency),
+        'warm': lambda: warm_cache(
+            url=args.url, requests=args.requests, concurrency=args.concurrency),
+        'refresh': lambda: refresh_under_load(
+            url=args.url,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            refresh_interval=args.refresh_interval,
+        ),
+    }
+
+    results = []
+    for scenario in args.scenarios:
+        result = await scenarios[scenario]()
+        print(result)
+        results.append(result)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Conversion load benchmark.')
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument(
+        '--scenarios',
+        nargs='+',
+        choices=['cold', 'warm', 'refresh'],
+        default=['cold', 'warm', 'refresh'],
+    )
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=20, help='Cold cache rounds.')
+    parser.add_argument('--refresh-interval', type=float, default=1.0)
+    parser.add_argument('--output', help='Save the results to this JSON file.')
+    args = parser.parse_args()
+
+    results = asyncio.run(run_scenarios(args))
+
+    if args.output:
+        save_results(
+            args.output,
+            results,
+            url=args.url,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            rounds=args.rounds,
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# ==================================================================================================
+#   Microbenchmarks
+# ==================================================================================================
+# In process measurements of the exchange rates processing (`ExchangeApi`) and of the conversion
+# view (`Conversion.get`, with a published snapshot), using the configured cache:
+#
+#   python -m benchmarks.micro --currencies 170 --output micro.json
+
+import argparse
+
+import httpx
+import orjson
+
+from .common import run_micro, save_results, setup_django
+from .fake_upstream import build_payload
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Exchange rates and conversion microbenchmarks.')
+    parser.add_argument('--currencies', type=int, default=170, help='Rates on the API payload.')
+    parser.add_argument('--number', type=int, default=2000)
+    parser.add_argument('--output', help='Save the results to this JSON file.')
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.test import APIRequestFactory
+
+    from api.logic import ExchangeApi, convert_amount, get_rates_snapshot
+    from api.snapshots import publish_snapshot
+    from api.views import Conversion
+
+    content = build_payload(currencies=args.currencies)
+    response = httpx.Response(status_code=200, content=content)
+    payload_rates = orjson.loads(content)['rates']
+    currencies = ['USD', 'BRL', 'EUR', 'BTC', 'ETH']
+    currency_index = {currency_name: index for index, currency_name in enumerate(currencies)}
+
+    exchange_api = ExchangeApi()
+    provider = exchange_api.providers[0]
+    validation_status = exchange_api._validate_result(
+        result=response, currency_index=currency_index, provider=provider)
+
+    snapshot = publish_snapshot(
+        last_update='2024-03-28T21:19:45.133000+00:00',
+        rates={currency_name: payload_rates[currency_name] for currency_name in currency_index},
+    )
+    conversion_view = Conversion.as_view()
+    conversion_request = APIRequestFactory().get(
+        '/api/currency/conversion/', {'from': 'BTC', 'to': 'EUR', 'amount': '123.45'})
+
+    def validate_result() -> None:
+        exchange_api._validate_result(
+            result=response, currency_index=currency_index, provider=provider)
+
+    def process_data() -> None:
+        exchange_api._process_data(data=validation_status.data)
+
+    def conversion_get() -> None:
+        conversion_view(conversion_request).render()
+
+    benchmarks = [
+        ('ExchangeApi._validate_result', validate_result, args.number),
+        ('ExchangeApi._process_data', process_data, args.number * 10),
+        ('get_rates_snapshot (warm)', get_rates_snapshot, args.number),
+        ('convert_amount', lambda: convert_amount(
+            snapshot=snapshot,
+            from_currency_name='BTC',
+            to_currency_name='EUR',
+            amount_str='123.45',
+        ), args.number * 10),
+        ('Conversion.get (warm)', conversion_get, args.number),
+    ]
+
+    results = []
+    for name, function, number in benchmarks:
+        result = run_micro(name=name, function=function, number=number)
+        print(result)
+        results.append(result)
+
+    if args.output:
+        save_results(args.output, results, currencies=args.currencies)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# ==================================================================================================
+#   Settings profiles benchmark
+# ==================================================================================================
+# Compares the full settings with the lean API-only profile (`data_stone.settings_api`): the
+# startup time (Django setup and WSGI application loading, on a fresh interpreter) and the time
+# of a conversion request through the WSGI handler (middleware included), e.g.:
+#
+#   python -m benchmarks.settings_profiles --runs 10 --output profiles.json
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+
+from .common import save_results
+
+
+# Executed on a fresh interpreter per run, printing its measurements as JSON
+PROFILE_SCRIPT = '''
+import json, os, sys, time, timeit
+
+start = time.perf_counter()
+os.environ['DJANGO_SETTINGS_MODULE'] = sys.argv[1]
+os.environ['APP_ADMISSION_DISABLED'] = '1'
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+startup = time.perf_counter() - start
+
+from django.test import RequestFactory
+from api.snapshots import publish_snapshot
+
+publish_snapshot(
+    last_update='2024-03-28T21:19:45.133000+00:00',
+    rates={'USD': 1, 'BRL': 5.013266, 'EUR': 0.926861, 'BTC': 0.000014135743},
+)
+environ = RequestFactory().get(
+    '/api/currency/conversion/', {'from': 'BTC', 'to': 'EUR', 'amount': '123.45'}).environ
+environ['SERVER_NAME'] = 'localhost'
+
+def request():
+    response = application(dict(environ), lambda status, headers: None)
+    b''.join(response)
+    response.close()
+
+number = int(sys.argv[2])
+request()
+print(json.dumps({
+    'startup': startup,
+    'request': min(timeit.repeat(request, number=number, repeat=5)) / number,
+    'modules': len(sys.modules),
+}))
+'''
+
+
+@dataclass
+class ProfileResult:
+    """Settings profile measurements (times in milliseconds)."""
+    name: str
+    startup: float
+    request: float
+    modules: int
+
+    def __str__(self) -> str:
+        return (
+            f'{self.name:<30} startup {self.startup:>8.1f} ms  request {self.request:>8.3f} ms  '
+            f'modules {self.modules}'
+        )
+
+
+def measure(settings_module: str, runs: int, number: int) -> ProfileResult:
+    """Median measurements of `runs` fresh interpreters using `settings_module`."""
+    measurements = [
+        json.loads(subprocess.run(
+            [sys.executable, '-c', PROFILE_SCRIPT, settings_module, str(number)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout)
+        for _ in range(runs)
+    ]
+    return ProfileResult(
+        name=settings_module,
+        startup=statistics.median(measurement['startup'] for measurement in measurements) * 1000,
+        request=statistics.median(measurement['request'] for measurement in measurements) * 1000,
+        modules=measurements[0]['modules'],
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Settings profiles benchmark.')
+    parser.add_argument(
+        '--settings',
+        nargs='+',
+        default=['data_stone.settings', 'data_stone.settings_api'],
+        help='Settings modules to compare.',
+    )
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--number', type=int, default=500, help='Requests per timing.')
+    parser.add_argument('--output', help='Save the results to this JSON file.')
+    args = parser.parse_args()
+
+    results = []
+    for settings_module in args.settings:
+        result = measure(settings_module=settings_module, runs=args.runs, number=args.number)
+        print(result)
+        results.append(result)
+
+    if args.output:
+        save_results(args.output, results, runs=args.runs, number=args.number)
+
+
+if __name__ == '__main__':
+    main()
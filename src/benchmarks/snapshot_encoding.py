@@ -0,0 +1,71 @@
+# ==================================================================================================
+#   Cached snapshot encoding benchmark
+# ==================================================================================================
+# Compares the size and the decoding time (until the cross rates matrix is available) of a snapshot
+# cached as a pickled dict (the previous format) and in the binary format (`encode_snapshot()`),
+# both as stored by the Django cache (pickled), for a snapshot with all the upstream currencies.
+# The binary snapshot is decoded once per process, so both its first and repeated decodes are timed:
+#
+#   python -m benchmarks.snapshot_encoding --currencies 170
+
+import argparse
+import pickle
+from dataclasses import asdict
+
+import orjson
+
+from .common import run_micro, save_results, setup_django
+from .fake_upstream import build_payload
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Cached snapshot encoding benchmark.')
+    parser.add_argument('--currencies', type=int, default=170)
+    parser.add_argument('--number', type=int, default=2000)
+    parser.add_argument('--output', help='Save the results to this JSON file.')
+    args = parser.parse_args()
+
+    setup_django()
+    from api import snapshots
+    from api.snapshots import RatesSnapshot, _new_snapshot, decode_snapshot, encode_snapshot
+
+    payload = orjson.loads(build_payload(currencies=args.currencies))
+    snapshot = _new_snapshot(
+        version=1,
+        last_update=payload['lastupdate'],
+        rates=payload['rates'],
+        provider='moeda.info',
+        validators={'ETag': '"1711660785"'},
+    )
+    # The Django cache (Redis or local memory) pickles the values
+    pickled_dict = pickle.dumps(asdict(snapshot), protocol=pickle.HIGHEST_PROTOCOL)
+    pickled_binary = pickle.dumps(
+        encode_snapshot(snapshot=snapshot), protocol=pickle.HIGHEST_PROTOCOL)
+
+    def decode_pickled_dict() -> None:
+        RatesSnapshot(**pickle.loads(pickled_dict)).cross_rates_matrix
+
+    def decode_binary_first() -> None:
+        snapshots._decoded_snapshot = None
+        decode_snapshot(data=pickle.loads(pickled_binary)).cross_rates_matrix
+
+    def decode_binary() -> None:
+        decode_snapshot(data=pickle.loads(pickled_binary)).cross_rates_matrix
+
+    results = [
+        run_micro(name='pickled dict', function=decode_pickled_dict, number=args.number),
+        run_micro(name='binary (first decode)', function=decode_binary_first, number=args.number),
+        run_micro(name='binary', function=decode_binary, number=args.number),
+    ]
+    sizes = {'pickled dict': len(pickled_dict), 'binary': len(pickled_binary)}
+    print(f'sizes: {sizes["pickled dict"]} bytes (pickled dict), {sizes["binary"]} bytes (binary)')
+    for result in results:
+        print(result)
+    print(f'decode speedup: {results[0].median / results[-1].median:.1f}x')
+
+    if args.output:
+        save_results(args.output, results, currencies=args.currencies, sizes=sizes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# ==================================================================================================
+#   External API payload parsing and validation benchmark
+# ==================================================================================================
+# Compares the `result.json()` + `ExchangeApiInputSerializer` path with the `orjson` +
+# `ExchangeApiInputValidator` one, using a payload with all the upstream currencies:
+#
+#   python -m benchmarks.upstream_parsing --currencies 170 --tracked 5
+
+import argparse
+import json
+
+import httpx
+import orjson
+
+from .common import run_micro, save_results, setup_django
+from .fake_upstream import build_payload
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='External API payload parsing benchmark.')
+    parser.add_argument('--currencies', type=int, default=170)
+    parser.add_argument('--tracked', type=int, default=5)
+    parser.add_argument('--number', type=int, default=2000)
+    parser.add_argument('--output', help='Save the results to this JSON file.')
+    args = parser.parse_args()
+
+    setup_django()
+    from api.serializers import ExchangeApiInputSerializer, ExchangeApiInputValidator
+
+    content = build_payload(currencies=args.currencies)
+    response = httpx.Response(status_code=200, content=content)
+    tracked_currencies = list(orjson.loads(content)['rates'])[:args.tracked]
+
+    def serializer_path() -> None:
+        serializer = ExchangeApiInputSerializer(data=json.loads(response.content))
+        assert serializer.is_valid()
+
+    def validator_path() -> None:
+        validator = ExchangeApiInputValidator(
+            data=orjson.loads(response.content),
+            currencies=tracked_currencies,
+        )
+        assert validator.is_valid()
+
+    results = [
+        run_micro(name='json + serializer', function=serializer_path, number=args.number),
+        run_micro(name='orjson + validator', function=validator_path, number=args.number),
+    ]
+    for result in results:
+        print(result)
+    print(f'speedup: {results[0].median / results[1].median:.1f}x')
+
+    if args.output:
+        save_results(
+            args.output,
+            results,
+            currencies=args.currencies,
+            tracked=args.tracked,
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,48 @@
 # ==================================================================================================
 #   Pytest fixtures
 # ==================================================================================================
-from typing import Any
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Iterator
+from unittest import mock
 
+import fakeredis
 import httpx
 import pytest
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
 
 from api.models import Currency
+from api.logic import REFRESH_LOCK_CACHE_KEY
+from api.namespaces import CACHE_NAMESPACES, rates_namespace
+from api.registry import currency_registry
+from api.snapshots import SNAPSHOT_CACHE_KEY
+
+@pytest.fixture(autouse=True)
+def clear_rates_snapshot() -> None:
+    """Remove the published rates snapshot, so each test starts with a cold cache."""
+    for namespace in CACHE_NAMESPACES.values():
+        namespace.clear()
+    caches['default'].delete(key=SNAPSHOT_CACHE_KEY, version=rates_namespace.version())
+    caches['default'].delete(key=REFRESH_LOCK_CACHE_KEY)
+    currency_registry.clear()
+
+@pytest.fixture(autouse=True)
+def last_known_good_file(settings, tmp_path: Path) -> Path:
+    """Last known good snapshot file of the test (none is saved yet)."""
+    settings.EXCHANGE_RATES_LAST_KNOWN_GOOD_FILE = str(tmp_path / 'rates_snapshot.bin')
+    return tmp_path / 'rates_snapshot.bin'
+
+@pytest.fixture
+def fake_redis_cache() -> Iterator[RedisCache]:
+    """Redis cache backed by an in-memory Redis server (`fakeredis`, Lua scripts included)."""
+    redis_cache = RedisCache(server='redis://127.0.0.1:1', params={})
+    redis_client = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+    with mock.patch.object(
+        target=redis_cache._cache, attribute='get_client', return_value=redis_client):
+        yield redis_cache
 
 @pytest.fixture
 def currency_list() -> list[str]:
@@ -41,3 +77,33 @@ def expected_rates(exchange_api_result: dict[str, Any], currency_list: list[str]
         currency: rate for currency, rate in exchange_api_result['rates'].items() # type: ignore[attr-defined]
         if currency in currency_list
     }
+
+@pytest.fixture
+def stub_server() -> Iterator[Callable[..., str]]:
+    """Start local HTTP servers answering every GET with a fixed (optionally delayed) response."""
+    servers = []
+
+    def start(content: bytes, status_code: int = 200, delay: float = 0) -> str:
+        class StubHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                time.sleep(delay)
+                self.send_response(status_code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        threading.Thread(
+            target=server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True).start()
+        servers.append(server)
+        return f'http://127.0.0.1:{server.server_port}/'
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -57,7 +57,7 @@ ROOT_URLCONF = "data_stone.urls"
 
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.renderers.ORJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -151,13 +151,152 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # This simple exchange rates API that doesn't uses an API key
 # (usually they're paid and untransferable even if free).
-EXCHANGE_RATES_API_URL = 'https://cdn.moeda.info/api/latest.json'
+# It can be replaced through environment, e.g. by the `benchmarks.fake_upstream` server.
+EXCHANGE_RATES_API_URL = os.getenv(
+    'EXCHANGE_RATES_API_URL', 'https://cdn.moeda.info/api/latest.json')
+
+# Exchange rates external APIs (providers), in preference order, each one with the adapter of its
+# payload (see `api.providers`). They should have USD based rates of all available currencies.
+EXCHANGE_RATES_PROVIDERS = [
+    {
+        'name': 'moeda.info',
+        'adapter': 'api.providers.MoedaInfoProvider',
+        'url': EXCHANGE_RATES_API_URL,
+    },
+]
+
+# Delay before requesting the next provider (a hedged request) while the previous ones don't
+# answer (seconds). Failed providers are replaced by the next one right away (failover).
+EXCHANGE_RATES_HEDGE_DELAY = 1.0
 
 # Exchange rates external API requests timeout (seconds).
 EXCHANGE_RATES_API_TIMEOUT = 5
 
+# Exchange rates external API connection establishment and response reading timeouts (seconds).
+EXCHANGE_RATES_API_CONNECT_TIMEOUT = 2
+EXCHANGE_RATES_API_READ_TIMEOUT = EXCHANGE_RATES_API_TIMEOUT
+
+# Exchange rates external API connection pool (shared by the whole process).
+EXCHANGE_RATES_API_MAX_CONNECTIONS = 20
+EXCHANGE_RATES_API_MAX_KEEPALIVE_CONNECTIONS = 10
+EXCHANGE_RATES_API_KEEPALIVE_EXPIRY = 30
+
+# Use HTTP/2 with the exchange rates external API (requires `httpx[http2]`).
+EXCHANGE_RATES_API_HTTP2 = False
+
+# Exchange rates external API retries on transient errors and their backoff (seconds),
+# each retry waits a random (jitter) time up to the exponential backoff.
+EXCHANGE_RATES_API_RETRIES = 2
+EXCHANGE_RATES_API_RETRY_BACKOFF = 0.2
+EXCHANGE_RATES_API_RETRY_BACKOFF_MAX = 2
+
 # Exchange rates external API cache retention time (seconds).
 EXCHANGE_RATES_CACHE_TIMEOUT = 30 * 60
 
+# Shorter cache retention time of the volatile currencies rates (seconds): conversions with them
+# refresh the snapshot sooner and the refresher doesn't wait longer than that between refreshes.
+EXCHANGE_RATES_VOLATILE_CACHE_TIMEOUTS = {'BTC': 5 * 60, 'ETH': 5 * 60}
+
 # Acronyms list cache retention time (seconds).
 ACRONYMS_LIST_CACHE_TIMEOUT = 10 * 60
+
+# Interval between checks of the currencies registry version on the cache (seconds),
+# each process reloads its in-memory currencies when they're changed by any worker.
+CURRENCY_REGISTRY_CHECK_INTERVAL = 5
+
+# Interval between checks of the cache namespaces versions (seconds), the invalidation of a
+# namespace (e.g. `POST /api/cache/clear/?scope=rates`) has effect on every process within it.
+CACHE_NAMESPACE_CHECK_INTERVAL = 1
+
+# Background exchange rates refresh interval (seconds), see `manage.py refresh_rates`.
+EXCHANGE_RATES_REFRESH_INTERVAL = 10 * 60
+
+# Adapt the refresh interval to the external API update cadence (learned from the `lastupdate`
+# changes), refreshing right after the expected update, but not sooner than the minimum interval.
+EXCHANGE_RATES_REFRESH_ADAPTIVE = True
+EXCHANGE_RATES_REFRESH_MIN_INTERVAL = 60
+
+# Maximum retention of the last published exchange rates snapshot (seconds).
+# Stale snapshots are still served (while being refreshed) until this time is reached.
+EXCHANGE_RATES_SNAPSHOT_RETENTION = 24 * 60 * 60
+
+# Last known good rates snapshot file, rewritten (atomically) on each refresh and served when there
+# is no published snapshot (cold start) or both the cache and the external API are unavailable
+# (empty to disable). Shared by the containers mounting the application directory.
+EXCHANGE_RATES_LAST_KNOWN_GOOD_FILE = os.getenv(
+    'APP_LAST_KNOWN_GOOD_FILE', str(BASE_DIR / 'var' / 'rates_snapshot.bin'))
+
+# Lease of the lock held by the worker refreshing the exchange rates snapshot (seconds),
+# it must be longer than a refresh (see `EXCHANGE_RATES_API_TIMEOUT`).
+EXCHANGE_RATES_REFRESH_LOCK_LEASE = 30
+
+# Maximum time waiting for the snapshot being refreshed by another worker (seconds).
+EXCHANGE_RATES_REFRESH_LOCK_WAIT = 5
+
+# Maximum number of conversions on a single batch conversion request.
+BATCH_CONVERSION_MAX_SIZE = 500_000
+
+# Maximum body size (bytes) of a batch conversion request, checked before it's parsed (large enough
+# for `BATCH_CONVERSION_MAX_SIZE` conversions, unlike the site-wide `DATA_UPLOAD_MAX_MEMORY_SIZE`).
+BATCH_CONVERSION_MAX_BODY_SIZE = 64 * 1024 * 1024
+
+# Historical rates time series limits: time window (days) and number of intervals per request.
+RATES_HISTORY_MAX_WINDOW_DAYS = 366
+RATES_HISTORY_MAX_INTERVALS = 10_000
+
+# Historical rates fetched from database (and aggregated) at once by the time series.
+RATES_HISTORY_CHUNK_SIZE = 2000
+
+# Rows converted at once (with the same rates snapshot) by the bulk file conversion.
+FILE_CONVERSION_CHUNK_SIZE = 10_000
+
+# Interval between checks for new snapshots by the live rates streams of each worker (seconds).
+RATES_STREAM_POLL_INTERVAL = 1
+
+# Idle live rates streams send a comment after this time, keeping the connection open (seconds).
+RATES_STREAM_KEEPALIVE_INTERVAL = 15
+
+
+#===================================================================================================
+#   Admission control
+#===================================================================================================
+
+# Rate limiting and load shedding of the conversion requests, which can be disabled through
+# environment (e.g. to benchmark the application from a single client).
+ADMISSION_ENABLED = 'APP_ADMISSION_DISABLED' not in os.environ
+
+# Conversion requests token buckets (Redis): rate (requests per second) and burst (bucket size)
+# of each client and of all the clients. Without Redis as the default cache requests are admitted.
+ADMISSION_CLIENT_RATE = 50
+ADMISSION_CLIENT_BURST = 100
+ADMISSION_GLOBAL_RATE = 5000
+ADMISSION_GLOBAL_BURST = 10_000
+
+# Request `META` key identifying the client (e.g. `HTTP_X_FORWARDED_FOR` behind a reverse proxy).
+ADMISSION_CLIENT_META_KEY = 'REMOTE_ADDR'
+
+# Conversion requests handled at once by a worker process, above which new ones are shed (503).
+ADMISSION_MAX_CONCURRENCY = 64
+
+
+#===================================================================================================
+#   Production server (`manage.py serve`)
+#===================================================================================================
+
+# Address the server listens on.
+SERVER_BIND = os.getenv('APP_SERVER_BIND', '0.0.0.0:8000')
+
+# Worker processes (forked from the server master process) and threads per worker (WSGI).
+SERVER_WORKERS = int(os.getenv('APP_SERVER_WORKERS', 2 * (os.cpu_count() or 1) + 1))
+SERVER_THREADS = int(os.getenv('APP_SERVER_THREADS', 4))
+
+# Serve the ASGI application (uvicorn workers) instead of the WSGI one (threaded workers).
+SERVER_ASGI = 'APP_SERVER_ASGI' in os.environ
+
+# Requests served by a worker before it's recycled (plus a random jitter, so they don't restart
+# together), 0 to disable.
+SERVER_MAX_REQUESTS = 10_000
+SERVER_MAX_REQUESTS_JITTER = 1000
+
+# Workers silent for longer than this time are killed and restarted (seconds).
+SERVER_TIMEOUT = 30
@@ -0,0 +1,41 @@
+"""
+Lean API-only Django settings for data_stone project.
+
+Same settings of `data_stone.settings` without the admin, sessions, messages, static files and
+templates (and their middleware), which the API doesn't use. Select it to serve only the API, e.g.:
+
+    DJANGO_SETTINGS_MODULE=data_stone.settings_api ./manage.py serve
+
+Database migrations and the admin still use the full settings.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+
+INSTALLED_APPS = [
+    "rest_framework",
+    'api',
+]
+
+MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "django.middleware.common.CommonMiddleware",
+]
+
+ROOT_URLCONF = "data_stone.urls_api"
+
+# No `django.contrib.auth`: API requests are anonymous and unauthenticated.
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,  # noqa: F405
+    'DEFAULT_AUTHENTICATION_CLASSES': [],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.AllowAny',
+    ],
+    'UNAUTHENTICATED_USER': None,
+}
+
+TEMPLATES = []
+
+AUTH_PASSWORD_VALIDATORS = []
+
+USE_I18N = False
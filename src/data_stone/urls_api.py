@@ -0,0 +1,13 @@
+"""
+API-only URL configuration for data_stone project (see `data_stone.settings_api`).
+"""
+
+from django.urls import include, path
+
+from api.views import Metrics
+
+
+urlpatterns = [
+    path('api/', include('api.urls')),
+    path('metrics/', Metrics.as_view(), name='metrics'),
+]